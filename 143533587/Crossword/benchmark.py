@@ -0,0 +1,100 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from crossword import *
+from generate import CrosswordCreator
+
+# Letters weighted roughly by how often they appear in English words
+LETTERS = "EEEEEEEEEEEEAAAAAAAAARRRRRRRIIIIIIIIIOOOOOOOOTTTTTTTNNNNNNNSSSSSS" \
+          "LLLLLCCCCUUUUDDDPPPMMMHHHGGBBFFYYWKVXZJQ"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark node and arc consistency on random crossword "
+                    "structures and dictionaries."
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[9, 15, 25],
+        help="heights and widths of the square structures"
+    )
+    parser.add_argument(
+        "--words", type=int, nargs="+", default=[2000, 10000, 100000],
+        help="numbers of words in the dictionaries"
+    )
+    parser.add_argument(
+        "--pairwise-limit", type=int, default=10000,
+        help="largest dictionary to compare words pairwise on"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"  {'size':>5}{'words':>8}{'variables':>11}{'method':>10}"
+          f"{'seconds':>9}{'domain':>9}{'consistent':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            for count in args.words:
+                structure = os.path.join(directory, "structure.txt")
+                words = os.path.join(directory, "words.txt")
+                write_puzzle(structure, words, size, count, args.seed)
+                crossword = Crossword(structure, words)
+                methods = [("bitsets", CrosswordCreator)]
+                if count <= args.pairwise_limit:
+                    methods.append(("pairwise", PairwiseCreator))
+                for name, method in methods:
+                    creator = method(crossword)
+                    start = time.perf_counter()
+                    creator.enforce_node_consistency()
+                    consistent = creator.ac3()
+                    seconds = time.perf_counter() - start
+                    domain = sum(map(len, creator.domains.values()))
+                    variables = len(crossword.variables)
+                    print(f"  {size:>5}{count:>8}{variables:>11}"
+                          f"{name:>10}{seconds:>9.3f}{domain:>9}"
+                          f"{str(consistent):>12}")
+
+
+class PairwiseCreator(CrosswordCreator):
+    """
+    A creator that revises domains by comparing every pair of words, as
+    `CrosswordCreator.revise` did before it used bits, to check and time
+    the bits against.
+    """
+
+    def revise(self, x, y):
+        i, j = self.crossword.overlaps[x, y]
+        revision = False
+        for word in self.domains[x].copy():
+            if not any(word[i] == each[j] for each in self.domains[y]):
+                self.domains[x].remove(word)
+                revision = True
+        return revision
+
+
+def write_puzzle(structure_file, words_file, size, count, seed=0):
+    """
+    Write a `size` by `size` crossword structure, with words along every
+    other row and column broken up by random blocks, and a dictionary of
+    `count` random words of 2 to `size` letters.
+    """
+    generator = random.Random(seed)
+    with open(structure_file, "w") as f:
+        for i in range(size):
+            f.write("".join(
+                "_" if (i % 2 == 0 or j % 2 == 0)
+                and generator.random() > 0.08 else "#"
+                for j in range(size)
+            ) + "\n")
+    words = set()
+    while len(words) < count:
+        length = generator.randint(2, size)
+        words.add("".join(generator.choices(LETTERS, k=length)))
+    with open(words_file, "w") as f:
+        f.write("\n".join(sorted(words)) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import sys
+from collections import deque
 
 from crossword import *
 
@@ -15,6 +16,22 @@ class CrosswordCreator():
             for var in self.crossword.variables
         }
 
+        # Words of each length in order, so that a set of them can be kept
+        # as an int with bit k set for the k-th word, and for each length,
+        # position and letter, the bits of the words with that letter there
+        self.words_by_length = dict()
+        for word in sorted(self.crossword.words):
+            self.words_by_length.setdefault(len(word), []).append(word)
+        self.letter_bits = {
+            length: letter_bits(words)
+            for length, words in self.words_by_length.items()
+        }
+
+        # Bits of each variable's domain, which `revise` works on and keeps
+        # `self.domains` in step with; any other change to a domain must be
+        # followed by `update_bits`
+        self.bits = dict()
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -100,9 +117,10 @@ class CrosswordCreator():
          constraints; in this case, the length of the word.)
         """
         for var in self.domains:
-            for word in self.domains[var].copy():
-                if len(word) != var.length:
-                    self.domains[var].remove(word)
+            self.domains[var].intersection_update(
+                self.words_by_length.get(var.length, [])
+            )
+            self.update_bits(var)
 
 
     def revise(self, x, y):
@@ -114,17 +132,53 @@ class CrosswordCreator():
         Return True if a revision was made to the domain of `x`; return
         False if no revision was made.
         """
-        revision = False
-        for word in self.domains[x].copy():
-            consistent = False
-            for each in self.domains[y]:
-                i,j = self.crossword.overlaps[x, y]
-                if word[i] == each[j]:
-                    consistent = True
-            if consistent == False:
-                self.domains[x].remove(word)
-                revision = True
-        return revision
+        i, j = self.crossword.overlaps[x, y]
+        x_bits = self.domain_bits(x)
+        y_bits = self.domain_bits(y)
+
+        # Keep the words of x with a letter at i that some word of y has at j
+        x_letters = self.letter_bits.get(x.length, [{}] * x.length)[i]
+        y_letters = self.letter_bits.get(y.length, [{}] * y.length)[j]
+        supported = 0
+        for letter, bits in y_letters.items():
+            if letter in x_letters and bits & y_bits:
+                supported |= x_letters[letter]
+        revised = x_bits & supported
+        if revised == x_bits:
+            return False
+
+        words = self.words_by_length[x.length]
+        self.domains[x].difference_update(
+            words[k] for k in bit_indexes(x_bits ^ revised)
+        )
+        self.bits[x] = revised
+        return True
+
+    def domain_bits(self, var):
+        """
+        Return the bits of the words in the domain of `var`, making them
+        from `self.domains[var]` the first time.
+        """
+        bits = self.bits.get(var)
+        if bits is None:
+            bits = self.update_bits(var)
+        return bits
+
+    def update_bits(self, var):
+        """
+        Make the bits of the words in `self.domains[var]` that have the
+        length of `var` again, as must be done after changing the domain
+        other than through `revise`, and return them.
+        """
+        words = self.words_by_length.get(var.length, [])
+        numbers = {word: k for k, word in enumerate(words)}
+        flags = bytearray(len(words) // 8 + 1)
+        for word in self.domains[var]:
+            k = numbers.get(word)
+            if k is not None:
+                flags[k >> 3] |= 1 << (k & 7)
+        bits = self.bits[var] = int.from_bytes(flags, "little")
+        return bits
 
 
     def ac3(self, arcs=None):
@@ -136,21 +190,25 @@ class CrosswordCreator():
         Return True if arc consistency is enforced and no domains are empty;
         return False if one or more domains end up empty.
         """
+        neighbors = {
+            var: self.crossword.neighbors(var) for var in self.domains
+        }
         if arcs == None:
-            arcs = []
-            for word in self.domains:
-                for neighbors in self.crossword.neighbors(word):
-                    arcs.append((word,neighbors))
-        while arcs:
-            node = arcs[0]
-            x,y = node
-            arcs.remove(node)
-            if self.revise(x,y):
-                for neighbors in self.crossword.neighbors(x):
-                    arcs.append((x,neighbors))
-                    arcs.append((neighbors,x))
+            arcs = [(x, y) for x in self.domains for y in neighbors[x]]
+
+        # Arcs waiting to be revised, each at most once at a time
+        queue = deque(dict.fromkeys(arcs))
+        queued = set(queue)
+        while queue:
+            x, y = queue.popleft()
+            queued.remove((x, y))
+            if self.revise(x, y):
                 if not self.domains[x]:
                     return False
+                for z in neighbors[x]:
+                    if z != y and (z, x) not in queued:
+                        queue.append((z, x))
+                        queued.add((z, x))
 
         return True
 
@@ -229,7 +287,7 @@ class CrosswordCreator():
         Choose the variable with the minimum number of remaining values
         in its domain. If there is a tie, choose the variable with the highest
         degree. If there is a tie, any of the tied variables are acceptable
-        return values.
+        return values. Return None if every variable is already assigned.
         """
         unassigned_var = {}
         unassigned_domain = {}
@@ -253,6 +311,8 @@ class CrosswordCreator():
                 sorted3 = sorted(neigh)
                 sorted2.append(neigh[sorted3[0]])
 
+        if not sorted2:
+            return None
         return sorted2[0]
 
 
@@ -271,6 +331,8 @@ class CrosswordCreator():
             return assignment
 
         var = self.select_unassigned_variable(assignment)
+        if var is None:
+            return None
         domain_values = self.order_domain_values(var, assignment)#idk
         for each in domain_values:
             new_assignment = assignment.copy()
@@ -284,6 +346,38 @@ class CrosswordCreator():
 
 
 
+def letter_bits(words):
+    """
+    Return, for each position in `words` (a list of words of one length),
+    a dictionary from each letter to the bits of the words (bit k for the
+    k-th word) with that letter at that position.
+    """
+    flags = [dict() for _ in range(len(words[0]))]
+    for k, word in enumerate(words):
+        for position, letter in enumerate(word):
+            if letter not in flags[position]:
+                flags[position][letter] = bytearray(len(words) // 8 + 1)
+            flags[position][letter][k >> 3] |= 1 << (k & 7)
+    return [
+        {
+            letter: int.from_bytes(bits, "little")
+            for letter, bits in position.items()
+        }
+        for position in flags
+    ]
+
+
+def bit_indexes(bits):
+    """
+    Yield the index of each bit set in `bits`, from the lowest.
+    """
+    digits = bin(bits)[:1:-1]
+    k = digits.find("1")
+    while k >= 0:
+        yield k
+        k = digits.find("1", k + 1)
+
+
 def main():
 
     # Check usage
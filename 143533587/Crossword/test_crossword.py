@@ -0,0 +1,90 @@
+import pytest
+
+from benchmark import PairwiseCreator, write_puzzle
+from crossword import Crossword
+from generate import CrosswordCreator, bit_indexes, letter_bits
+
+STRUCTURE = """\
+#___#
+#_##_
+#_##_
+#_##_
+#____
+"""
+WORDS = ["one", "two", "three", "four", "five", "six", "seven", "eight",
+         "nine", "ten", "lion", "rose", "tent", "oven"]
+
+
+@pytest.fixture
+def crossword(tmp_path):
+    (tmp_path / "structure.txt").write_text(STRUCTURE)
+    (tmp_path / "words.txt").write_text("\n".join(WORDS) + "\n")
+    return Crossword(tmp_path / "structure.txt", tmp_path / "words.txt")
+
+
+def test_letter_bits_and_bit_indexes():
+    bits = letter_bits(["CAT", "COT", "DOG"])
+    assert bits[0] == {"C": 0b011, "D": 0b100}
+    assert bits[1] == {"A": 0b001, "O": 0b110}
+    assert list(bit_indexes(0b101001)) == [0, 3, 5]
+    assert list(bit_indexes(0)) == []
+    assert list(bit_indexes(1 << 200)) == [200]
+
+
+def test_revise_matches_pairwise(crossword):
+    for x, y in crossword.overlaps:
+        if crossword.overlaps[x, y] is None:
+            continue
+        creator = CrosswordCreator(crossword)
+        pairwise = PairwiseCreator(crossword)
+        for each in (creator, pairwise):
+            each.enforce_node_consistency()
+        assert creator.revise(x, y) == pairwise.revise(x, y)
+        assert creator.domains == pairwise.domains
+
+        # Changing a domain by hand is seen once its bits are updated
+        creator.domains[y] = {"LION"} & creator.domains[y]
+        creator.update_bits(y)
+        pairwise.domains[y] = set(creator.domains[y])
+        assert creator.revise(x, y) == pairwise.revise(x, y)
+        assert creator.domains == pairwise.domains
+
+
+def test_revise_sees_domain_of_same_size(crossword):
+    x, y = next(
+        (x, y) for (x, y), overlap in crossword.overlaps.items()
+        if overlap is not None and x.length == 3 and y.length == 5
+    )
+    creator = CrosswordCreator(crossword)
+    creator.enforce_node_consistency()
+    creator.domains[y] = {"EIGHT"}
+    creator.domain_bits(y)
+
+    # A different domain of the same size must not reuse the old bits
+    creator.domains[y] = {"SEVEN"}
+    creator.update_bits(y)
+    creator.revise(x, y)
+    assert creator.domains[x] == {"SIX"}
+
+
+@pytest.mark.parametrize("size, count", [(7, 300), (11, 1000)])
+def test_ac3_matches_pairwise(tmp_path, size, count):
+    structure, words = tmp_path / "structure.txt", tmp_path / "words.txt"
+    write_puzzle(structure, words, size, count, seed=size)
+    crossword = Crossword(structure, words)
+    creator = CrosswordCreator(crossword)
+    pairwise = PairwiseCreator(crossword)
+    for each in (creator, pairwise):
+        each.enforce_node_consistency()
+    consistent = creator.ac3()
+    assert consistent == pairwise.ac3()
+    if consistent:
+        assert creator.domains == pairwise.domains
+
+
+def test_solve(crossword):
+    creator = CrosswordCreator(crossword)
+    assignment = creator.solve()
+    assert assignment is not None
+    assert creator.consistent(assignment)
+    assert creator.assignment_complete(assignment)
@@ -0,0 +1,484 @@
+import argparse
+import os
+import random
+import time
+import tracemalloc
+
+import numpy as np
+
+from crawler import crawl_graph
+from incremental import IncrementalPageRank
+from matrix import LinkMatrix, matrix_pagerank
+from pagerank import (
+    DAMPING, ConvergenceLog, crawl, iterate_pagerank, sample_pagerank,
+    transition_model
+)
+from personalized import (
+    EPSILON, personalized_pagerank, push_pagerank, top_columns, top_pages
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark PageRank on synthetic power-law corpora."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    iterate = commands.add_parser(
+        "iterate", help="compare iterate_pagerank with sparse power iteration"
+    )
+    iterate.add_argument(
+        "--sizes", type=int, nargs="+", default=[10**4, 10**5, 10**6]
+    )
+    add_corpus_arguments(iterate)
+    iterate.add_argument(
+        "--dict-limit", type=int, default=10**5,
+        help="largest size to build a corpus dictionary and run "
+             "matrix_pagerank at"
+    )
+    iterate.add_argument(
+        "--iterate-limit", type=int, default=10**4,
+        help="largest size to run iterate_pagerank at, which links every "
+             "dangling page to every page"
+    )
+    iterate.add_argument("--tolerance", type=float, default=1e-8)
+
+    convergence = commands.add_parser(
+        "convergence", help="report the time each iteration engine takes "
+                            "to reach each tolerance"
+    )
+    convergence.add_argument(
+        "--sizes", type=int, nargs="+", default=[10**3, 10**4, 10**5]
+    )
+    add_corpus_arguments(convergence)
+    convergence.add_argument(
+        "--tolerances", type=float, nargs="+",
+        default=[1e-2, 1e-4, 1e-6, 1e-8, 1e-10]
+    )
+    convergence.add_argument(
+        "--iterate-limit", type=int, default=10**4,
+        help="largest size to run iterate_pagerank at"
+    )
+    convergence.add_argument(
+        "--trace", action="store_true",
+        help="also print every iteration of each engine"
+    )
+
+    sample = commands.add_parser(
+        "sample", help="compare sample_pagerank with many surfers at once"
+    )
+    sample.add_argument("--pages", type=int, default=10**4)
+    add_corpus_arguments(sample)
+    sample.add_argument(
+        "--samples", type=int, nargs="+", default=[10**5, 10**6, 10**7]
+    )
+    sample.add_argument("--surfers", type=int, default=1000)
+    sample.add_argument(
+        "--python-limit", type=int, default=10**6,
+        help="most samples to run sample_pagerank for"
+    )
+
+    crawling = commands.add_parser(
+        "crawl", help="compare crawl with the parallel crawler"
+    )
+    crawling.add_argument(
+        "directory", nargs="?",
+        help="corpus directory (a synthetic corpus is generated if omitted)"
+    )
+    crawling.add_argument("--pages", type=int, default=10**5)
+    add_corpus_arguments(crawling)
+    crawling.add_argument(
+        "--workers", type=int, nargs="+", default=[0, 1, 2, 4]
+    )
+
+    incremental = commands.add_parser(
+        "incremental", help="time warm-started updates after small edits"
+    )
+    incremental.add_argument("--pages", type=int, default=10**5)
+    add_corpus_arguments(incremental)
+    incremental.add_argument(
+        "--batches", type=int, nargs="+", default=[1, 10, 100, 1000],
+        help="numbers of edits to apply per update"
+    )
+    incremental.add_argument("--rounds", type=int, default=5)
+    incremental.add_argument("--tolerance", type=float, default=1e-8)
+
+    personalized = commands.add_parser(
+        "personalized", help="time batched and local-push personalized "
+                             "PageRank"
+    )
+    personalized.add_argument("--pages", type=int, default=10**5)
+    add_corpus_arguments(personalized)
+    personalized.add_argument(
+        "--seed-sets", type=int, default=32,
+        help="number of single-page seed sets"
+    )
+    personalized.add_argument("--top", type=int, default=20)
+    personalized.add_argument("--epsilon", type=float, default=EPSILON)
+
+    args = parser.parse_args()
+    if args.command == "iterate":
+        benchmark_iteration(args)
+    elif args.command == "convergence":
+        benchmark_convergence(args)
+    elif args.command == "sample":
+        benchmark_sampling(args)
+    elif args.command == "personalized":
+        benchmark_personalized(args)
+    elif args.command == "incremental":
+        benchmark_incremental(args)
+    elif args.command == "crawl":
+        directory = args.directory
+        if directory is None:
+            directory = os.path.join(
+                "synthetic",
+                f"{args.pages}-{args.links:g}-{args.exponent:g}-{args.seed}"
+            )
+            if not os.path.exists(directory):
+                print(f"Generating {directory}...")
+                sources, targets = power_law_links(
+                    args.pages, args.links, args.seed, args.exponent
+                )
+                write_corpus(directory, sources, targets, args.pages)
+        benchmark_crawlers(directory, args.workers)
+
+
+def add_corpus_arguments(parser):
+    """
+    Add the arguments that shape the synthetic corpus to `parser`.
+    """
+    parser.add_argument(
+        "--links", type=float, default=8, help="mean links per page"
+    )
+    parser.add_argument(
+        "--exponent", type=float, default=1.0,
+        help="power-law exponent of the popularity of link targets"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def benchmark_iteration(args):
+    """
+    Time sparse power iteration and iterate_pagerank at each size, with
+    the L1 error of each against a tightly converged result.
+    """
+    print(f"  {'pages':>9}{'links':>11}{'method':>20}{'seconds':>10}"
+          f"{'L1 error':>12}")
+    for size in args.sizes:
+        sources, targets = power_law_links(
+            size, args.links, args.seed, args.exponent
+        )
+        pages = [f"{i}.html" for i in range(size)]
+
+        start = time.perf_counter()
+        links = LinkMatrix.from_links(pages, sources, targets)
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        reference = links.pagerank(DAMPING, args.tolerance)
+        iterated = time.perf_counter() - start
+        row(size, len(sources), "matrix (build)", built, None)
+        row(size, len(sources), "matrix (iterate)", iterated, 0)
+
+        if size > args.dict_limit:
+            continue
+        corpus = to_corpus(pages, sources, targets)
+        methods = [("matrix_pagerank", matrix_pagerank)]
+        if size <= args.iterate_limit:
+            methods.append(("iterate_pagerank", iterate_pagerank))
+        for name, method in methods:
+            start = time.perf_counter()
+            ranks = method(corpus, DAMPING)
+            seconds = time.perf_counter() - start
+            error = np.abs(
+                np.array([ranks[page] for page in pages]) - reference
+            ).sum()
+            row(size, len(sources), name, seconds, error)
+
+
+def benchmark_convergence(args):
+    """
+    Record every iteration of each engine at each size, and print the
+    iterations and seconds it took to reach each tolerance ("-" if it
+    stopped before reaching it).
+    """
+    header = "".join(f"{tolerance:>14.0e}" for tolerance in args.tolerances)
+    print(f"  {'pages':>9}{'engine':>18}{header}")
+    for size in args.sizes:
+        sources, targets = power_law_links(
+            size, args.links, args.seed, args.exponent
+        )
+        pages = [f"{i}.html" for i in range(size)]
+        corpus = to_corpus(pages, sources, targets)
+        engines = [("matrix_pagerank", lambda callback: matrix_pagerank(
+            corpus, DAMPING, min(args.tolerances), callback=callback
+        ))]
+        if size <= args.iterate_limit:
+            engines.append(("iterate_pagerank", lambda callback: (
+                iterate_pagerank(corpus, DAMPING, callback)
+            )))
+        for name, engine in engines:
+            log = ConvergenceLog()
+            engine(log)
+            cells = []
+            for tolerance in args.tolerances:
+                iterations = log.iterations_to(tolerance)
+                if iterations is None:
+                    cells.append(f"{'-':>14}")
+                else:
+                    seconds = log.time_to(tolerance)
+                    cells.append(f"{iterations:>5} {seconds:>8.3f}")
+            print(f"  {size:>9}{name:>18}{''.join(cells)}")
+            if args.trace:
+                print(log.report())
+
+
+def benchmark_sampling(args):
+    """
+    Time sample_pagerank and batched surfers at each number of samples,
+    with the L1 error of each against power iteration, and estimate the
+    cost of sampling with a full transition_model per step.
+    """
+    sources, targets = power_law_links(
+        args.pages, args.links, args.seed, args.exponent
+    )
+    pages = [f"{i}.html" for i in range(args.pages)]
+    corpus = to_corpus(pages, sources, targets)
+    links = LinkMatrix.from_corpus(corpus)
+    reference = links.pagerank(DAMPING, 1e-10)
+
+    # Sampling used to build the whole transition model for every step
+    steps = 100
+    start = time.perf_counter()
+    for page in pages[:steps]:
+        transition_model(corpus, page, DAMPING)
+    per_step = (time.perf_counter() - start) / steps
+    print(f"{args.pages} pages: transition_model takes {per_step * 1e3:.2f} "
+          f"ms per step, {per_step * 10**6 / 60:.0f} minutes for 10^6 samples")
+
+    print(f"  {'samples':>10}{'method':>20}{'seconds':>10}"
+          f"{'samples/s':>12}{'L1 error':>12}")
+    random.seed(args.seed)
+    for n in args.samples:
+        methods = [
+            (f"{args.surfers} surfers", lambda: links.sample(
+                DAMPING, n, args.surfers, args.seed
+            )),
+        ]
+        if n <= args.python_limit:
+            methods.insert(0, ("sample_pagerank", lambda: np.array(
+                list(sample_pagerank(corpus, DAMPING, n).values())
+            )))
+        for name, method in methods:
+            start = time.perf_counter()
+            ranks = method()
+            seconds = time.perf_counter() - start
+            error = np.abs(ranks - reference).sum()
+            print(f"  {n:>10}{name:>20}{seconds:>10.3f}"
+                  f"{n / seconds:>12.0f}{error:>12.2e}")
+
+
+def benchmark_personalized(args):
+    """
+    Time personalized PageRank for random single-page seed sets, one at a
+    time, batched, and by local push, with the pages each push reached
+    and how many of its top pages are the true top pages.
+    """
+    sources, targets = power_law_links(
+        args.pages, args.links, args.seed, args.exponent
+    )
+    pages = [f"{i}.html" for i in range(args.pages)]
+    links = LinkMatrix.from_links(pages, sources, targets)
+
+    # Build the out-links for local push before timing anything
+    links.out_degrees
+    rng = random.Random(args.seed)
+    seed_sets = [[page] for page in rng.sample(pages, args.seed_sets)]
+    print(f"{args.pages} pages, {len(sources)} links, "
+          f"{len(seed_sets)} seed sets")
+
+    start = time.perf_counter()
+    for seeds in seed_sets:
+        personalized_pagerank(links, [seeds], DAMPING)
+    one_by_one = time.perf_counter() - start
+    start = time.perf_counter()
+    ranks = personalized_pagerank(links, seed_sets, DAMPING)
+    batched = time.perf_counter() - start
+
+    start = time.perf_counter()
+    estimates = [
+        push_pagerank(links, seeds, DAMPING, args.epsilon)
+        for seeds in seed_sets
+    ]
+    pushed = time.perf_counter() - start
+
+    reached = sum(map(len, estimates))
+    found = 0
+    for i, seeds in enumerate(seed_sets):
+        top = {page for page, rank in top_pages(
+            links, seeds, DAMPING, args.top, args.epsilon
+        )}
+        exact = {page for page, rank in top_columns(
+            links, ranks[:, i], args.top
+        )}
+        found += len(top & exact)
+
+    count = len(seed_sets)
+    print(f"  one at a time:  {one_by_one / count * 1e3:8.2f} ms per seed set")
+    print(f"  batched:        {batched / count * 1e3:8.2f} ms per seed set")
+    print(f"  local push:     {pushed / count * 1e3:8.2f} ms per seed set, "
+          f"{reached / count:.0f} pages reached, "
+          f"{found / (count * args.top):.0%} of the top {args.top} found")
+
+
+def benchmark_incremental(args):
+    """
+    Apply batches of random link and page edits to a synthetic corpus,
+    updating after each batch, and compare the iterations and time of the
+    warm-started updates with solving from scratch. Removed links are
+    picked from the links there are, so that every removal is an edit.
+    """
+    sources, targets = power_law_links(
+        args.pages, args.links, args.seed, args.exponent
+    )
+    pages = [f"{i}.html" for i in range(args.pages)]
+    start = time.perf_counter()
+    ranker = IncrementalPageRank.from_corpus(
+        to_corpus(pages, sources, targets), DAMPING, args.tolerance
+    )
+    print(f"{args.pages} pages, {len(sources)} links: cold start took "
+          f"{ranker.iterations} iterations, "
+          f"{time.perf_counter() - start:.3f} seconds")
+
+    rng = random.Random(args.seed)
+    added = 0
+    print(f"  {'edits':>7}{'iterations':>12}{'seconds':>10}{'edits/s':>10}")
+    for batch in args.batches:
+        iterations = 0
+        seconds = 0
+        for _ in range(args.rounds):
+            columns = ranker.links.tocsc()
+            for _ in range(batch):
+                source, target = rng.sample(ranker.pages, 2)
+                if rng.random() < 0.01:
+                    added += 1
+                    ranker.add_page(f"new{added}.html", [target])
+                elif rng.random() < 0.5:
+                    ranker.add_link(source, target)
+                else:
+                    ranker.remove_link(*existing_link(ranker, columns, rng))
+            start = time.perf_counter()
+            ranker.update(args.tolerance)
+            seconds += time.perf_counter() - start
+            iterations += ranker.iterations
+        print(f"  {batch:>7}{iterations / args.rounds:>12.1f}"
+              f"{seconds / args.rounds:>10.3f}"
+              f"{batch * args.rounds / seconds:>10.0f}")
+
+
+def existing_link(ranker, columns, rng):
+    """
+    Returns a random (source, target) link of `ranker` as of its last
+    update, given its links as a CSC matrix (a column of targets for each
+    source).
+    """
+    while True:
+        number = rng.randrange(columns.shape[1])
+        start, end = columns.indptr[number], columns.indptr[number + 1]
+        if start < end:
+            link = columns.indices[rng.randrange(start, end)]
+            return ranker.pages[number], ranker.pages[link]
+
+
+def benchmark_crawlers(directory, workers):
+    """
+    Time crawl and crawl_graph with each number of workers, with the peak
+    memory allocated in this process while crawling.
+    """
+    crawlers = [("crawl", crawl)] + [
+        (f"crawl_graph ({n} workers)",
+         lambda directory, n=n: crawl_graph(directory, n))
+        for n in workers
+    ]
+    print(f"  {'crawler':<28}{'seconds':>10}{'peak MB':>10}")
+    expected = None
+    for name, crawler in crawlers:
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = crawler(directory)
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  {name:<28}{seconds:>10.3f}{peak / 2**20:>10.1f}")
+
+        corpus = result if isinstance(result, dict) else result.to_corpus()
+        if expected is None:
+            expected = corpus
+        elif corpus != expected:
+            raise Exception(f"{name} found different links")
+
+
+def row(pages, links, method, seconds, error):
+    error = "" if error is None else f"{error:.2e}"
+    print(f"  {pages:>9}{links:>11}{method:>20}{seconds:>10.3f}{error:>12}")
+
+
+def power_law_links(num_pages, mean_links, seed=0, exponent=1.0):
+    """
+    Returns arrays of the source and target page numbers of random links
+    between `num_pages` pages.
+
+    Out-degrees are geometric with mean `mean_links` (so some pages have
+    no links), and links point at page i with probability proportional to
+    1 / (i + 1) ** `exponent`, so that a few pages collect most links, as
+    on the web. Self-links are dropped; repeated links are kept.
+    """
+    rng = np.random.default_rng(seed)
+    out_degrees = rng.geometric(1 / (mean_links + 1), size=num_pages) - 1
+    sources = np.repeat(np.arange(num_pages), out_degrees)
+
+    weights = 1 / np.arange(1, num_pages + 1) ** exponent
+    cumulative = np.cumsum(weights)
+    draws = rng.random(len(sources)) * cumulative[-1]
+    targets = np.searchsorted(cumulative, draws, side="right")
+
+    # Shuffle page numbers so popularity is unrelated to position
+    permutation = rng.permutation(num_pages)
+    targets = permutation[np.minimum(targets, num_pages - 1)]
+    keep = sources != targets
+    return sources[keep], targets[keep]
+
+
+def to_corpus(pages, sources, targets):
+    """
+    Returns a corpus dictionary, as returned by `crawl`, from the arrays of
+    link sources and targets of `power_law_links`.
+    """
+    corpus = {page: set() for page in pages}
+    for source, target in zip(sources.tolist(), targets.tolist()):
+        corpus[pages[source]].add(pages[target])
+    return corpus
+
+
+def write_corpus(directory, sources, targets, num_pages):
+    """
+    Writes a directory of HTML pages with the links of `power_law_links`.
+    """
+    os.makedirs(directory, exist_ok=True)
+    order = np.argsort(sources, kind="stable")
+    sources, targets = sources[order], targets[order]
+    bounds = np.searchsorted(sources, np.arange(num_pages + 1))
+    for page in range(num_pages):
+        links = "\n".join(
+            f'    <li><a href="{target}.html">Page {target}</a></li>'
+            for target in targets[bounds[page]:bounds[page + 1]].tolist()
+        )
+        with open(os.path.join(directory, f"{page}.html"), "w") as f:
+            f.write(
+                f"<!DOCTYPE html>\n<html>\n<head>\n<title>{page}</title>\n"
+                f"</head>\n<body>\n<h1>{page}</h1>\n<ul>\n{links}\n</ul>\n"
+                f"</body>\n</html>\n"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import multiprocessing
+import os
+import re
+from array import array
+
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Maps page names to page numbers in worker processes, set by `initialize`
+index = {}
+
+
+class LinkGraph():
+    """
+    The links between the pages of a corpus, with pages numbered in the
+    order of `pages`. Links are stored CSR-style: page p links to
+    `targets[offsets[p]:offsets[p + 1]]`, in increasing order.
+    """
+
+    def __init__(self, pages, offsets, targets):
+        self.pages = pages
+        self.offsets = offsets
+        self.targets = targets
+
+    def __len__(self):
+        return len(self.pages)
+
+    def links(self, page):
+        """Returns the numbers of the pages that page `page` links to."""
+        return self.targets[self.offsets[page]:self.offsets[page + 1]]
+
+    def to_corpus(self):
+        """
+        Returns the links as a corpus dictionary, as returned by `crawl`.
+        """
+        return {
+            name: {self.pages[link] for link in self.links(page)}
+            for page, name in enumerate(self.pages)
+        }
+
+
+def crawl_graph(directory, workers=None, chunksize=64):
+    """
+    Parse a directory of HTML pages into a `LinkGraph` of the links between
+    them, like `crawl` but without holding the contents of the pages or
+    their links as strings in memory.
+
+    Files are parsed by a pool of `workers` processes (by default one per
+    CPU; with 0, in this process), each reading one file at a time, and
+    their links are appended to the graph in page order as they arrive.
+    """
+    pages = sorted(
+        entry.name for entry in os.scandir(directory)
+        if entry.name.endswith(".html")
+    )
+    numbers = {page: i for i, page in enumerate(pages)}
+    paths = (os.path.join(directory, page) for page in pages)
+
+    if workers == 0:
+        initialize(numbers)
+        results = map(extract_links, paths)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(
+            workers, initializer=initialize, initargs=(numbers,)
+        )
+        results = pool.imap(extract_links, paths, chunksize)
+
+    offsets, targets = array("q", [0]), array("i")
+    try:
+        for page, links in enumerate(results):
+            targets.extend(link for link in links if link != page)
+            offsets.append(len(targets))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return LinkGraph(pages, offsets, targets)
+
+
+def initialize(numbers):
+    """Sets the page numbers used by `extract_links` in this process."""
+    global index
+    index = numbers
+
+
+def extract_links(path):
+    """
+    Returns the sorted numbers of the pages in the corpus that the HTML
+    file at `path` links to.
+    """
+    with open(path, encoding="utf-8", errors="replace") as f:
+        contents = f.read()
+    links = {index.get(link) for link in LINK.findall(contents)}
+    links.discard(None)
+    return array("i", sorted(links))
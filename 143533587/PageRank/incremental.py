@@ -0,0 +1,300 @@
+import argparse
+import os
+
+import numpy as np
+from scipy import sparse
+
+from matrix import LinkMatrix, TOLERANCE, MAX_ITERATIONS
+from pagerank import DAMPING, crawl
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Update the saved PageRank of a corpus after it changes."
+    )
+    parser.add_argument("corpus")
+    parser.add_argument(
+        "--state", default="pagerank.npz", metavar="FILE",
+        help="where the ranks and links are kept between runs "
+             "(default: pagerank.npz)"
+    )
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    corpus = crawl(args.corpus)
+    if os.path.exists(args.state):
+        ranker = IncrementalPageRank.load(args.state)
+        edits = ranker.sync(corpus)
+        ranker.update(args.tolerance)
+        print(f"Applied {edits} edits in {ranker.iterations} iterations")
+    else:
+        ranker = IncrementalPageRank.from_corpus(
+            corpus, DAMPING, args.tolerance
+        )
+        print(f"Ranked {len(ranker)} pages in {ranker.iterations} iterations")
+    ranker.save(args.state)
+
+    ranks = ranker.to_dict()
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+class IncrementalPageRank():
+    """
+    PageRank values of a corpus that changes a few pages and links at a
+    time.
+
+    Edits are queued with `add_page`, `remove_page`, `add_link` and
+    `remove_link`, and applied together by `update`, which starts power
+    iteration from the previous ranks rather than from the uniform vector.
+    Since an edit only moves the ranks of the pages near it, this takes
+    far fewer iterations than starting over.
+
+    `links` is a sparse matrix with a 1 at [i, j] if page j links to page
+    i, with pages numbered in the order of `pages`.
+    """
+
+    def __init__(self, pages, links, ranks, damping_factor):
+        self.pages = list(pages)
+        self.index = {page: i for i, page in enumerate(self.pages)}
+        self.links = links.tocsr()
+        self.ranks = ranks
+        self.damping_factor = damping_factor
+
+        # Queued edits: new pages (in order, as dictionary keys), removed
+        # page numbers, and the wanted state of each edited
+        # (source, target) link, by page name
+        self.new_pages = {}
+        self.removed = set()
+        self.edits = {}
+
+        # The `LinkMatrix` of the last update, and its iterations
+        self.matrix = None
+        self.iterations = 0
+
+    @classmethod
+    def from_corpus(cls, corpus, damping_factor, tolerance=TOLERANCE,
+                    max_iterations=MAX_ITERATIONS):
+        """
+        Ranks a corpus dictionary, as returned by `crawl`, from scratch.
+        The corpus is not modified.
+        """
+        matrix = LinkMatrix.from_corpus(corpus)
+        links = matrix.matrix.copy()
+        links.data[:] = 1
+        ranker = cls(matrix.pages, links, None, damping_factor)
+        ranker.matrix = matrix
+        ranker.ranks = matrix.pagerank(damping_factor, tolerance,
+                                       max_iterations)
+        ranker.iterations = matrix.iterations
+        return ranker
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __contains__(self, page):
+        return self.known(page)
+
+    def known(self, page):
+        """
+        Returns True if `page` will be in the corpus once the queued edits
+        are applied.
+        """
+        if page in self.index:
+            return self.index[page] not in self.removed
+        return page in self.new_pages
+
+    def add_page(self, page, links=()):
+        """Queues a new page, with links to existing pages."""
+        if self.known(page):
+            raise ValueError(f"page already exists: {page}")
+        if page in self.index:
+            # Bring a removed page back, without its old links
+            number = self.index[page]
+            self.removed.discard(number)
+            for link in self.links_from(number):
+                self.edits[page, self.pages[link]] = False
+        else:
+            self.new_pages[page] = None
+        for link in links:
+            self.add_link(page, link)
+
+    def remove_page(self, page):
+        """Queues the removal of a page and of every link from or to it."""
+        if not self.known(page):
+            raise KeyError(page)
+        if page in self.index:
+            self.removed.add(self.index[page])
+        else:
+            del self.new_pages[page]
+        self.edits = {
+            (source, target): wanted
+            for (source, target), wanted in self.edits.items()
+            if page not in (source, target)
+        }
+
+    def add_link(self, source, target):
+        """Queues a link between two pages. Self-links are ignored."""
+        self.edit_link(source, target, True)
+
+    def remove_link(self, source, target):
+        """Queues the removal of a link, if there is one."""
+        self.edit_link(source, target, False)
+
+    def edit_link(self, source, target, wanted):
+        """Queues a link to be added if `wanted`, or removed if not."""
+        for page in (source, target):
+            if not self.known(page):
+                raise KeyError(page)
+        if source != target:
+            self.edits[source, target] = wanted
+
+    def links_from(self, number):
+        """Returns the numbers of the pages page `number` links to."""
+        return self.links[:, number].nonzero()[0]
+
+    def sync(self, corpus):
+        """
+        Queues the edits that turn the corpus as of the last update into
+        `corpus`, a dictionary as returned by `crawl`, and returns how many
+        pages and links were added or removed.
+        """
+        edits = 0
+        for page in self.pages:
+            if page not in corpus:
+                self.remove_page(page)
+                edits += 1
+        for page in corpus:
+            if page not in self.index:
+                self.add_page(page)
+                edits += 1
+
+        # Compare links page by page, reading columns from a CSC copy
+        columns = self.links.tocsc()
+        for page, links in corpus.items():
+            number = self.index.get(page)
+            if number is None:
+                old = set()
+            else:
+                start, end = columns.indptr[number], columns.indptr[number + 1]
+                old = {self.pages[i] for i in columns.indices[start:end]}
+            for link in links - old:
+                self.add_link(page, link)
+            for link in old - links:
+                if link in corpus:
+                    self.remove_link(page, link)
+            edits += len(links ^ old)
+        return edits
+
+    @property
+    def pending(self):
+        """The number of queued edits."""
+        return len(self.new_pages) + len(self.removed) + len(self.edits)
+
+    def update(self, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+        """
+        Applies the queued edits and recomputes the ranks, starting from
+        the previous ranks (new pages start at 1 / N).
+        """
+        if self.matrix is not None and not self.pending:
+            return
+
+        # Number the new pages after the existing ones
+        n = len(self.pages) + len(self.new_pages)
+        for page in self.new_pages:
+            self.index[page] = len(self.pages)
+            self.pages.append(page)
+        links = self.links.copy()
+        links.resize((n, n))
+        ranks = np.full(n, 1 / n)
+        if self.ranks is not None:
+            ranks[:len(self.ranks)] = self.ranks
+
+        # Set the edited entries of the matrix, all in one go
+        if self.edits:
+            edits = np.array([
+                (self.index[target], self.index[source], wanted)
+                for (source, target), wanted in self.edits.items()
+            ]).T
+            rows, columns, wanted = edits
+            changes = sparse.csr_matrix(
+                (np.ones(len(rows)), (rows, columns)), shape=(n, n)
+            )
+            links = links - links.multiply(changes)
+            links = links + sparse.csr_matrix(
+                (wanted.astype(float), (rows, columns)), shape=(n, n)
+            )
+            links.eliminate_zeros()
+
+        # Drop removed pages, renumbering the rest in order
+        if self.removed:
+            keep = np.ones(n, dtype=bool)
+            keep[list(self.removed)] = False
+            links = links[keep][:, keep]
+            ranks = ranks[keep]
+            self.pages = [page for page, kept in zip(self.pages, keep) if kept]
+            self.index = {page: i for i, page in enumerate(self.pages)}
+            n = len(self.pages)
+
+        self.links = links.tocsr()
+        self.new_pages, self.removed, self.edits = {}, set(), {}
+        if n == 0:
+            self.ranks, self.matrix, self.iterations = np.zeros(0), None, 0
+            return
+
+        # Warm start from the old ranks, renormalized after the new pages
+        # got their share and the removed pages lost theirs
+        ranks /= ranks.sum()
+        self.matrix = LinkMatrix.from_adjacency(self.pages, self.links)
+        self.ranks = self.matrix.pagerank(
+            self.damping_factor, tolerance, max_iterations, ranks
+        )
+        self.iterations = self.matrix.iterations
+
+    def to_dict(self):
+        """
+        Returns the ranks of the last update as a dictionary by page name.
+        """
+        return dict(zip(self.pages, self.ranks.tolist()))
+
+    def save(self, path):
+        """
+        Saves the pages, links and ranks of the last update to `path`, an
+        .npz file. There must be no queued edits.
+        """
+        if self.pending:
+            raise ValueError("update before saving")
+        temporary = f"{path}.{os.getpid()}.tmp.npz"
+        try:
+            np.savez(
+                temporary,
+                pages=np.array(self.pages, dtype=str),
+                indptr=self.links.indptr,
+                indices=self.links.indices,
+                ranks=self.ranks,
+                damping_factor=self.damping_factor,
+            )
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    @classmethod
+    def load(cls, path):
+        """Loads the state saved by `save` from `path`."""
+        with np.load(path) as data:
+            pages = data["pages"].tolist()
+            n = len(pages)
+            links = sparse.csr_matrix(
+                (np.ones(len(data["indices"])), data["indices"],
+                 data["indptr"]),
+                shape=(n, n)
+            )
+            ranker = cls(pages, links, data["ranks"],
+                         float(data["damping_factor"]))
+        ranker.matrix = LinkMatrix.from_adjacency(ranker.pages, ranker.links)
+        return ranker
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+import numpy as np
+from scipy import sparse
+
+TOLERANCE = 1e-8
+MAX_ITERATIONS = 1000
+
+
+class LinkMatrix():
+    """
+    The links of a corpus as a sparse matrix, with pages numbered in the
+    order of `pages`.
+
+    `matrix[i, j]` is 1 / (number of links on page j) if page j links to
+    page i, so multiplying it by the PageRank vector spreads the rank of
+    every page evenly over its links. Pages with no links are marked in
+    `dangling`; like `iterate_pagerank`, they are treated as linking to
+    every page in the corpus, themselves included.
+    """
+
+    def __init__(self, pages, matrix, dangling):
+        self.pages = pages
+        self.matrix = matrix
+        self.dangling = dangling
+        self._out_links = None
+        self._out_degrees = None
+        self._index = None
+        self._slots = None
+
+        # The number of iterations of the last call to `pagerank`
+        self.iterations = 0
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Builds the matrix of a corpus dictionary, as returned by `crawl`.
+        """
+        pages = list(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        out_degrees = np.fromiter(
+            (len(corpus[page]) for page in pages), dtype=np.int64,
+            count=len(pages)
+        )
+        targets = np.fromiter(
+            (index[link] for page in pages for link in corpus[page]),
+            dtype=np.int64, count=int(out_degrees.sum())
+        )
+        sources = np.repeat(np.arange(len(pages)), out_degrees)
+        return cls.from_links(pages, sources, targets)
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Builds the matrix of a `LinkGraph`, as returned by `crawl_graph`.
+        """
+        offsets = np.asarray(graph.offsets)
+        sources = np.repeat(np.arange(len(graph)), np.diff(offsets))
+        return cls.from_links(graph.pages, sources, np.asarray(graph.targets))
+
+    @classmethod
+    def from_links(cls, pages, sources, targets):
+        """
+        Builds the matrix from parallel arrays of the page numbers at the
+        start and end of each link. Repeated links count once.
+        """
+        n = len(pages)
+        links = sparse.csr_matrix(
+            (np.ones(len(sources)), (targets, sources)), shape=(n, n)
+        )
+        # Duplicates were summed by the constructor; count them once
+        links.data[:] = 1
+        return cls.from_adjacency(pages, links)
+
+    @classmethod
+    def from_adjacency(cls, pages, links):
+        """
+        Builds the matrix from a sparse matrix `links` with a 1 at [i, j]
+        if page j links to page i.
+        """
+        n = len(pages)
+        out_degrees = np.asarray(links.sum(axis=0)).ravel()
+        dangling = out_degrees == 0
+        scale = np.divide(
+            1, out_degrees, out=np.zeros(n), where=~dangling
+        )
+        matrix = links @ sparse.diags(scale)
+        return cls(pages, matrix.tocsr(), dangling)
+
+    def __len__(self):
+        return len(self.pages)
+
+    @property
+    def index(self):
+        """A dictionary of the number of each page, built on first use."""
+        if self._index is None:
+            self._index = {page: i for i, page in enumerate(self.pages)}
+        return self._index
+
+    @property
+    def out_links(self):
+        """
+        The links of each page, CSR-style, as a tuple (offsets, targets):
+        page p links to targets[offsets[p]:offsets[p + 1]].
+        """
+        if self._out_links is None:
+            links = self.matrix.T.tocsr()
+            self._out_links = links.indptr, links.indices
+        return self._out_links
+
+    @property
+    def out_degrees(self):
+        """A list of the number of links on each page, built on first use."""
+        if self._out_degrees is None:
+            offsets, targets = self.out_links
+            self._out_degrees = np.diff(offsets).tolist()
+        return self._out_degrees
+
+    @property
+    def slots(self):
+        """
+        An array with a place for each page, all -1, built on first use,
+        for a computation that reaches few pages to number the ones it
+        reaches. Whatever uses it must set the places it used back to -1.
+        """
+        if self._slots is None:
+            self._slots = np.full(len(self.pages), -1, dtype=np.intp)
+        return self._slots
+
+    def step(self, ranks, damping_factor):
+        """
+        Returns the PageRank vector after one more iteration from `ranks`.
+        """
+        n = len(self.pages)
+        teleport = (1 - damping_factor) / n
+        dangling = damping_factor * ranks[self.dangling].sum() / n
+        return damping_factor * (self.matrix @ ranks) + (teleport + dangling)
+
+    def pagerank(self, damping_factor, tolerance=TOLERANCE,
+                 max_iterations=MAX_ITERATIONS, ranks=None, callback=None):
+        """
+        Returns the PageRank vector, iterating from `ranks` (by default
+        uniform) until the L1 distance between two iterations is at most
+        `tolerance`, or for at most `max_iterations` iterations.
+
+        If given, `callback` is called after every iteration with that L1
+        distance, such as by a `ConvergenceLog`.
+        """
+        n = len(self.pages)
+        if ranks is None:
+            ranks = np.full(n, 1 / n)
+        self.iterations = 0
+        while self.iterations < max_iterations:
+            previous, ranks = ranks, self.step(ranks, damping_factor)
+            self.iterations += 1
+
+            # Correct the rounding drift so the ranks keep summing to 1
+            ranks /= ranks.sum()
+            residual = np.abs(ranks - previous).sum()
+            if callback is not None:
+                callback(residual)
+            if residual <= tolerance:
+                break
+        return ranks
+
+    def sample(self, damping_factor, n, surfers=1000, seed=None):
+        """
+        Returns the fraction of `n` sampled pages that were each page, from
+        `surfers` independent random surfers, each starting at a random
+        page and taking steps of the random surfer model in lockstep.
+        """
+        size = len(self.pages)
+        rng = np.random.default_rng(seed)
+
+        # Count visits a block of steps at a time, in one bincount each
+        surfers = max(1, min(surfers, n))
+        block = max(1, 2**20 // surfers)
+        visits = np.empty((block, surfers), dtype=np.int64)
+        counts = np.zeros(size, dtype=np.int64)
+        pages = rng.integers(size, size=surfers)
+        remaining = n
+        while remaining > 0:
+            steps = min(block, -(-remaining // surfers))
+            for step in range(steps):
+                visits[step] = pages
+                pages = self.surf(pages, damping_factor, rng)
+            taken = visits[:steps].ravel()[:remaining]
+            counts += np.bincount(taken, minlength=size)
+            remaining -= len(taken)
+        return counts / n
+
+    def surf(self, pages, damping_factor, rng):
+        """
+        Returns the next page of each surfer at `pages`: with probability
+        `damping_factor` a random link of the page (if it has any), and
+        otherwise a random page.
+        """
+        offsets, targets = self.out_links
+        out_degrees = offsets[pages + 1] - offsets[pages]
+        following = np.flatnonzero(
+            (rng.random(len(pages)) < damping_factor)
+            & (out_degrees > 0)
+        )
+        choices = (
+            rng.random(len(following)) * out_degrees[following]
+        ).astype(np.int64)
+        next_pages = rng.integers(len(self.pages), size=len(pages))
+        next_pages[following] = targets[offsets[pages[following]] + choices]
+        return next_pages
+
+    def to_dict(self, ranks):
+        """Returns a vector of page values as a dictionary by page name."""
+        return dict(zip(self.pages, ranks.tolist()))
+
+
+def matrix_pagerank(corpus, damping_factor, tolerance=TOLERANCE,
+                    max_iterations=MAX_ITERATIONS, callback=None):
+    """
+    Return PageRank values for each page by power iteration over a sparse
+    link matrix, stopping once the values change by at most `tolerance`
+    in total (L1 distance) or after `max_iterations` iterations. If given,
+    `callback` is called after every iteration with that distance.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    links = LinkMatrix.from_corpus(corpus)
+    if len(links) == 0:
+        return {}
+    return links.to_dict(
+        links.pagerank(
+            damping_factor, tolerance, max_iterations, callback=callback
+        )
+    )
+
+
+def surf_pagerank(corpus, damping_factor, n, surfers=1000, seed=None):
+    """
+    Return PageRank values for each page by sampling `n` pages in total
+    from `surfers` random surfers moving at once, each starting with a
+    page at random.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    links = LinkMatrix.from_corpus(corpus)
+    if len(links) == 0:
+        return {}
+    return links.to_dict(links.sample(damping_factor, n, surfers, seed))
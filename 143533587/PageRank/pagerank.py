@@ -1,21 +1,89 @@
+import argparse
 import os
 import random
 import re
-import sys
+import time
 
 DAMPING = 0.85
 SAMPLES = 10000
 
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
-    print(f"PageRank Results from Sampling (n = {SAMPLES})")
+    parser = argparse.ArgumentParser(
+        description="Estimate the PageRank of a corpus of HTML pages."
+    )
+    parser.add_argument("corpus")
+    parser.add_argument(
+        "--samples", type=int, default=SAMPLES, metavar="N",
+        help=f"number of pages to sample (default: {SAMPLES})"
+    )
+    parser.add_argument(
+        "--surfers", type=int, metavar="N",
+        help="sample with N random surfers at once (requires numpy and scipy)"
+    )
+    parser.add_argument(
+        "--sparse", action="store_true",
+        help="iterate with a sparse link matrix (requires numpy and scipy)"
+    )
+    parser.add_argument(
+        "--tolerance", type=float,
+        help="with --sparse, stop once the ranks change by at most this "
+             "much in total (default: 1e-8)"
+    )
+    parser.add_argument(
+        "--max-iterations", type=int,
+        help="with --sparse, the most iterations to run (default: 1000)"
+    )
+    parser.add_argument(
+        "--trace", action="store_true",
+        help="print the residual and time of every iteration"
+    )
+    parser.add_argument(
+        "--workers", type=int, metavar="N",
+        help="parse the pages in N processes into a compact link graph "
+             "(0 for this process only)"
+    )
+    args = parser.parse_args()
+
+    if args.workers is None:
+        corpus = crawl(args.corpus)
+        graph = None
+    else:
+        from crawler import crawl_graph
+        graph = crawl_graph(args.corpus, args.workers)
+        corpus = None
+    if args.surfers is not None or args.sparse:
+        from matrix import LinkMatrix, TOLERANCE, MAX_ITERATIONS
+        if graph is None:
+            links = LinkMatrix.from_corpus(corpus)
+        else:
+            links = LinkMatrix.from_graph(graph)
+    if corpus is None and (args.surfers is None or not args.sparse):
+        corpus = graph.to_corpus()
+
+    if args.surfers is not None:
+        ranks = links.to_dict(
+            links.sample(DAMPING, args.samples, args.surfers)
+        )
+    else:
+        ranks = sample_pagerank(corpus, DAMPING, args.samples)
+    print(f"PageRank Results from Sampling (n = {args.samples})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
+    log = ConvergenceLog() if args.trace else None
+    if args.sparse:
+        ranks = links.to_dict(links.pagerank(
+            DAMPING,
+            TOLERANCE if args.tolerance is None else args.tolerance,
+            MAX_ITERATIONS if args.max_iterations is None
+            else args.max_iterations,
+            callback=log
+        ))
+    else:
+        ranks = iterate_pagerank(corpus, DAMPING, log)
+    if log is not None:
+        print(f"Converged in {len(log)} iterations")
+        print(log.report())
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
@@ -82,39 +150,92 @@ def sample_pagerank(corpus, damping_factor, n):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    pages = []
-    count = {}
-    for page in corpus:
-        pages.append(page)
-        count[page] = 0
+    # The transition model is a mixture: with probability
+    # `damping_factor` follow a random link (any page if there are none),
+    # otherwise jump to any page. Drawing from the mixture directly takes
+    # constant time per step instead of building the whole distribution.
+    pages = list(corpus)
+    links = {page: tuple(sorted(corpus[page])) for page in pages}
+    count = dict.fromkeys(pages, 0)
+    page = random.choice(pages)
     for i in range(n):
         if i != 0:
-            probs = transition_model(corpus,page,damping_factor)
-            wieght = []
-            for i in range(len(pages)):
-                wieght.append(probs[pages[i]])
-            page =random.choices(pages, weights=wieght, k=1)
-            page = page[0]
-        else:
-            page = random.choice(pages)
-        count[page] += 1/n
-    return count
+            if random.random() < damping_factor and links[page]:
+                page = random.choice(links[page])
+            else:
+                page = random.choice(pages)
+        count[page] += 1
+    return {page: visits / n for page, visits in count.items()}
+
 
+class ConvergenceLog():
+    """
+    Records the residual (the L1 distance between the old and new values)
+    and the duration of each iteration, when passed as the `callback` of
+    `iterate_pagerank` or `LinkMatrix.pagerank`. The first duration also
+    includes any setup since the log was created.
+    """
 
+    def __init__(self):
+        self.residuals = []
+        self.seconds = []
+        self.last = time.perf_counter()
 
-def iterate_pagerank(corpus, damping_factor):
+    def __call__(self, residual):
+        now = time.perf_counter()
+        self.residuals.append(float(residual))
+        self.seconds.append(now - self.last)
+        self.last = now
+
+    def __len__(self):
+        return len(self.residuals)
+
+    def iterations_to(self, tolerance):
+        """
+        Returns the number of iterations it took for the residual to reach
+        `tolerance`, or None if it never did.
+        """
+        for i, residual in enumerate(self.residuals):
+            if residual <= tolerance:
+                return i + 1
+        return None
+
+    def time_to(self, tolerance):
+        """
+        Returns the seconds it took for the residual to reach `tolerance`,
+        or None if it never did.
+        """
+        iterations = self.iterations_to(tolerance)
+        if iterations is None:
+            return None
+        return sum(self.seconds[:iterations])
+
+    def report(self):
+        """Returns a table of the iterations as a printable string."""
+        lines = [f"  {'iteration':>9}{'residual':>12}{'ms':>10}"]
+        for i, residual in enumerate(self.residuals):
+            milliseconds = self.seconds[i] * 1e3
+            lines.append(f"  {i + 1:>9}{residual:>12.3e}{milliseconds:>10.3f}")
+        return "\n".join(lines)
+
+
+def iterate_pagerank(corpus, damping_factor, callback=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
 
+    If given, `callback` is called after every iteration with the L1
+    distance between the old and new values, such as by a
+    `ConvergenceLog`.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    for page in corpus:
-        if corpus[page] == set():
-            for each in corpus:
-                corpus[page].add(each)
+    # A page with no links links to every page, including itself; share
+    # one set between them rather than changing the caller's corpus
+    everything = set(corpus)
+    corpus = {page: links or everything for page, links in corpus.items()}
     links_to_pages = {}
     prev = {}
     for page in corpus:
@@ -131,6 +252,8 @@ def iterate_pagerank(corpus, damping_factor):
             for every in links_to_pages[each]:#for every page that links to page
                 new += damping_factor * (prev[every]/len(corpus[every]))#prev
             probs[each] = new
+        if callback is not None:
+            callback(sum(abs(probs[each] - prev[each]) for each in prev))
 
         count = 0
         for each in prev:
@@ -0,0 +1,273 @@
+import argparse
+import heapq
+
+import numpy as np
+from scipy import sparse
+
+from matrix import LinkMatrix, TOLERANCE, MAX_ITERATIONS
+from pagerank import DAMPING, crawl
+
+TOP = 20
+EPSILON = 1e-6
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find the pages most relevant to sets of seed pages."
+    )
+    parser.add_argument("corpus")
+    parser.add_argument(
+        "--seeds", nargs="+", action="append", required=True, metavar="PAGE",
+        help="a seed set; repeat to rank several seed sets at once"
+    )
+    parser.add_argument("--top", type=int, default=TOP, metavar="K")
+    parser.add_argument(
+        "--push", action="store_true",
+        help="approximate each seed set by local push instead of iterating "
+             "over the whole corpus"
+    )
+    parser.add_argument("--epsilon", type=float, default=EPSILON)
+    args = parser.parse_args()
+
+    links = LinkMatrix.from_corpus(crawl(args.corpus))
+    if args.push:
+        results = [
+            top_pages(links, seeds, DAMPING, args.top, args.epsilon)
+            for seeds in args.seeds
+        ]
+    else:
+        ranks = personalized_pagerank(links, args.seeds, DAMPING)
+        results = [
+            top_columns(links, ranks[:, i], args.top)
+            for i in range(len(args.seeds))
+        ]
+    for seeds, top in zip(args.seeds, results):
+        print(f"Personalized PageRank for {', '.join(seeds)}")
+        for page, rank in top:
+            print(f"  {page}: {rank:.4f}")
+
+
+def teleport_matrix(links, seed_sets):
+    """
+    Returns a sparse matrix with a column for each seed set, spreading a
+    probability of 1 evenly over the pages of the set.
+    """
+    rows, columns, values = [], [], []
+    for column, seeds in enumerate(seed_sets):
+        numbers = seed_numbers(links, seeds)
+        rows.extend(numbers)
+        columns.extend([column] * len(numbers))
+        values.extend([1 / len(numbers)] * len(numbers))
+    return sparse.csc_matrix(
+        (values, (rows, columns)), shape=(len(links), len(seed_sets))
+    )
+
+
+def seed_numbers(links, seeds):
+    """
+    Returns the distinct page numbers of a seed set, raising KeyError for
+    pages not in the corpus and ValueError for an empty set.
+    """
+    numbers = sorted({links.index[page] for page in seeds})
+    if not numbers:
+        raise ValueError("a seed set needs at least one page")
+    return numbers
+
+
+def personalized_pagerank(links, seed_sets, damping_factor,
+                          tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+    """
+    Returns the personalized PageRank of every page for each seed set in
+    `seed_sets`, as the columns of an array, by power iteration of all
+    the sets at once over a `LinkMatrix`.
+
+    The random surfer follows a random link with probability
+    `damping_factor`, and otherwise jumps to a random page of the seed
+    set. A page with no links is treated as linking to every seed page,
+    so that with every page as seeds this is the usual PageRank.
+
+    Iteration stops once every column changes by at most `tolerance`
+    (L1 distance), or after `max_iterations` iterations.
+    """
+    teleport = teleport_matrix(links, seed_sets).tocoo()
+    ranks = teleport.toarray()
+    dangling = np.flatnonzero(links.dangling)
+
+    # Iterate the columns that have not converged yet, side by side in
+    # `current`; `active` holds their seed set numbers, and `seeds` the
+    # (page, position in `current`, probability) of their teleport entries
+    active = np.arange(len(seed_sets))
+    current = ranks.copy()
+    seeds = teleport.row, teleport.col, teleport.data
+    for _ in range(max_iterations):
+        previous = current
+        jump = 1 - damping_factor + damping_factor * (
+            previous[dangling].sum(axis=0)
+        )
+        current = links.matrix @ previous
+        current *= damping_factor
+        rows, columns, values = seeds
+        np.add.at(current, (rows, columns), values * jump[columns])
+
+        # The previous iteration is no longer needed, so work in place
+        np.subtract(current, previous, out=previous)
+        np.abs(previous, out=previous)
+        converged = previous.sum(axis=0) <= tolerance
+        if converged.any():
+            ranks[:, active[converged]] = current[:, converged]
+            kept = ~converged
+            active, current = active[kept], current[:, kept]
+            positions = np.cumsum(kept) - 1
+            seeds = (
+                rows[kept[columns]], positions[columns[kept[columns]]],
+                values[kept[columns]]
+            )
+            if len(active) == 0:
+                break
+    else:
+        ranks[:, active] = current
+
+    # Correct the rounding drift so each column sums to 1
+    ranks /= ranks.sum(axis=0)
+    return ranks
+
+
+def top_columns(links, ranks, k):
+    """
+    Returns the `k` (page, rank) pairs with the highest ranks in a vector,
+    best first.
+    """
+    k = min(k, len(ranks))
+    if k == 0:
+        return []
+    best = np.argpartition(-ranks, k - 1)[:k]
+    return sorted(
+        ((links.pages[i], float(ranks[i])) for i in best),
+        key=lambda item: (-item[1], item[0])
+    )
+
+
+def push_pagerank(links, seeds, damping_factor, epsilon=EPSILON):
+    """
+    Approximates the personalized PageRank of a seed set by local push,
+    and returns a dictionary of the estimates of the pages it reached.
+
+    Every page holds a residual of rank still to be placed, starting with
+    the seed distribution. Pushing a page settles 1 - `damping_factor` of
+    its residual as its own rank and passes the rest along its links (or
+    back to the seeds, for a page with no links). Only pages whose
+    residual is at least `epsilon` per link are pushed, so the work
+    depends on the seeds and `epsilon`, not on the size of the corpus.
+    The estimates are never too high, and what is left unplaced is less
+    than `epsilon` per link of each page.
+
+    All the pages due a push are pushed together in each round, with
+    NumPy, which gives the same guarantees as pushing them one by one.
+    Residuals and estimates are only kept for the pages reached so far,
+    numbered in the order they are reached through `links.slots`.
+    """
+    offsets, targets = links.out_links
+    numbers = np.array(seed_numbers(links, seeds))
+    share = 1 / len(numbers)
+    slots = links.slots
+
+    # The pages reached so far, with the residual and estimate of each at
+    # the same position, in arrays that grow as needed; `active` holds the
+    # positions to push
+    reached = numbers
+    slots[numbers] = np.arange(len(numbers))
+    residuals = np.full(len(numbers), share)
+    ranks = np.zeros(len(numbers))
+    active = np.arange(len(numbers))
+
+    # Scratch space to find the distinct positions of an array without
+    # sorting, as long as `residuals`
+    marks = np.empty(len(numbers), dtype=np.intp)
+    try:
+        while len(active):
+            pages = reached[active]
+            pushed = residuals[active]
+            residuals[active] = 0
+            ranks[active] += (1 - damping_factor) * pushed
+
+            # Spread each page's residual over its links: the receivers
+            # are the targets of every link of every pushed page, in turn
+            starts = offsets[pages]
+            degrees = offsets[pages + 1] - starts
+            ends = np.cumsum(degrees)
+            receivers = targets[
+                np.arange(ends[-1])
+                + np.repeat(starts - ends + degrees, degrees)
+            ]
+            amounts = np.repeat(
+                damping_factor * pushed / np.maximum(degrees, 1), degrees
+            )
+
+            # Pages with no links send their residual back to the seeds
+            lost = pushed[degrees == 0].sum()
+            if lost:
+                receivers = np.concatenate([receivers, numbers])
+                amounts = np.concatenate([
+                    amounts,
+                    np.full(len(numbers), damping_factor * lost * share)
+                ])
+
+            # Number the receivers not reached before, each once
+            new = receivers[slots[receivers] < 0]
+            if len(new):
+                new = new[distinct(slots, new)]
+                count = len(reached)
+                slots[new] = np.arange(count, count + len(new))
+                reached = np.concatenate([reached, new])
+                if len(reached) > len(residuals):
+                    size = max(2 * len(residuals), len(reached))
+                    residuals = enlarged(residuals, size)
+                    ranks = enlarged(ranks, size)
+                    marks = np.empty(size, dtype=np.intp)
+
+            positions = slots[receivers]
+            np.add.at(residuals, positions, amounts)
+            threshold = epsilon * np.maximum(
+                offsets[receivers + 1] - offsets[receivers], 1
+            )
+            due = positions[residuals[positions] >= threshold]
+            active = due[distinct(marks, due)]
+    finally:
+        slots[reached] = -1
+
+    pushed = np.flatnonzero(ranks)
+    return dict(zip(reached[pushed].tolist(), ranks[pushed].tolist()))
+
+
+def distinct(scratch, values):
+    """
+    Returns a mask of the last appearance of each value in `values`, an
+    array of indexes into `scratch`, which is overwritten where they point.
+    """
+    order = np.arange(len(values))
+    scratch[values] = order
+    return scratch[values] == order
+
+
+def enlarged(values, size):
+    """Returns `values` followed by zeros, to make `size` values."""
+    result = np.zeros(size)
+    result[:len(values)] = values
+    return result
+
+
+def top_pages(links, seeds, damping_factor, k=TOP, epsilon=EPSILON):
+    """
+    Returns the `k` pages with the highest personalized PageRank for a
+    seed set, as (page, estimated rank) pairs, best first, using
+    `push_pagerank`.
+    """
+    ranks = push_pagerank(links, seeds, damping_factor, epsilon)
+    best = heapq.nsmallest(
+        k, ranks.items(), key=lambda item: (-item[1], links.pages[item[0]])
+    )
+    return [(links.pages[page], rank) for page, rank in best]
+
+
+if __name__ == "__main__":
+    main()
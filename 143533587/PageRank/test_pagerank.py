@@ -0,0 +1,203 @@
+import random
+
+import pytest
+
+from benchmark import existing_link, power_law_links, to_corpus, write_corpus
+from crawler import crawl_graph
+from incremental import IncrementalPageRank
+from matrix import LinkMatrix, matrix_pagerank, surf_pagerank
+from pagerank import (
+    DAMPING, ConvergenceLog, crawl, iterate_pagerank, sample_pagerank
+)
+from personalized import personalized_pagerank, push_pagerank, top_pages
+
+CORPUS = {
+    "1.html": {"2.html"},
+    "2.html": {"1.html", "3.html"},
+    "3.html": {"2.html", "4.html"},
+    "4.html": {"2.html"},
+    "5.html": set(),
+}
+
+
+def copy(corpus):
+    return {page: set(links) for page, links in corpus.items()}
+
+
+def test_matrix_pagerank_matches_iteration():
+    corpus = copy(CORPUS)
+    expected = iterate_pagerank(corpus, DAMPING)
+    assert corpus == CORPUS
+    ranks = matrix_pagerank(copy(CORPUS), DAMPING)
+    assert ranks.keys() == expected.keys()
+    assert sum(ranks.values()) == pytest.approx(1)
+    for page in expected:
+        assert ranks[page] == pytest.approx(expected[page], abs=1e-3)
+
+
+def test_matrix_pagerank_converges():
+    sources, targets = power_law_links(500, 4, seed=1)
+    pages = [f"{i}.html" for i in range(500)]
+    corpus = to_corpus(pages, sources, targets)
+    links = LinkMatrix.from_corpus(corpus)
+    ranks = links.pagerank(DAMPING, tolerance=1e-12)
+
+    # The result is a fixed point of one more iteration
+    assert abs(links.step(ranks, DAMPING) - ranks).sum() < 1e-10
+    assert ranks.sum() == pytest.approx(1)
+
+    # A looser tolerance or a low iteration cap stops earlier
+    rough = matrix_pagerank(corpus, DAMPING, max_iterations=2)
+    assert sum(rough.values()) == pytest.approx(1)
+    assert sum(abs(rough[page] - rank) for page, rank in
+               zip(pages, ranks)) > 1e-6
+
+
+def test_convergence_log():
+    log = ConvergenceLog()
+    iterate_pagerank(CORPUS, DAMPING, log)
+    assert len(log) == len(log.seconds) > 1
+    assert log.residuals[-1] < log.residuals[0]
+
+    log = ConvergenceLog()
+    matrix_pagerank(copy(CORPUS), DAMPING, tolerance=1e-10, callback=log)
+    assert log.residuals[-1] <= 1e-10 < log.residuals[-2]
+    assert log.iterations_to(1e-10) == len(log)
+    assert log.iterations_to(1e-3) < len(log)
+    assert log.iterations_to(0) is None
+    assert log.time_to(1e-10) == pytest.approx(sum(log.seconds))
+    assert len(log.report().splitlines()) == len(log) + 1
+
+
+def test_sample_pagerank():
+    random.seed(0)
+    expected = matrix_pagerank(copy(CORPUS), DAMPING)
+    ranks = sample_pagerank(CORPUS, DAMPING, 20000)
+    assert ranks.keys() == expected.keys()
+    assert sum(ranks.values()) == pytest.approx(1)
+    for page in expected:
+        assert ranks[page] == pytest.approx(expected[page], abs=0.02)
+
+
+def test_surf_pagerank():
+    expected = matrix_pagerank(copy(CORPUS), DAMPING)
+    ranks = surf_pagerank(CORPUS, DAMPING, 200003, surfers=100, seed=0)
+    assert ranks.keys() == expected.keys()
+    assert sum(ranks.values()) == pytest.approx(1)
+    for page in expected:
+        assert ranks[page] == pytest.approx(expected[page], abs=0.01)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_crawl_graph(tmp_path, workers):
+    sources, targets = power_law_links(200, 4, seed=2)
+    write_corpus(str(tmp_path), sources, targets, 200)
+    (tmp_path / "7.html").write_text(
+        '<a href="7.html">me</a> <a class="x" href="missing.html">gone</a>'
+        ' <a href="3.html">3</a><a\nhref="3.html">again</a>'
+    )
+    (tmp_path / "notes.txt").write_text('<a href="1.html">1</a>')
+
+    graph = crawl_graph(str(tmp_path), workers)
+    corpus = crawl(str(tmp_path))
+    assert graph.to_corpus() == corpus
+    assert corpus["7.html"] == {"3.html"}
+
+    ranks = LinkMatrix.from_graph(graph).pagerank(DAMPING)
+    expected = matrix_pagerank(corpus, DAMPING)
+    for page, rank in zip(graph.pages, ranks):
+        assert rank == pytest.approx(expected[page])
+
+
+def test_incremental_pagerank(tmp_path):
+    sources, targets = power_law_links(300, 4, seed=3)
+    pages = [f"{i}.html" for i in range(300)]
+    corpus = to_corpus(pages, sources, targets)
+    ranker = IncrementalPageRank.from_corpus(corpus, DAMPING, 1e-10)
+    cold = ranker.iterations
+
+    corpus["0.html"].add("1.html")
+    ranker.add_link("0.html", "1.html")
+    link = next(iter(corpus["5.html"]))
+    corpus["5.html"].remove(link)
+    ranker.remove_link("5.html", link)
+    corpus["new.html"] = {"2.html", "3.html"}
+    corpus["4.html"].add("new.html")
+    ranker.add_page("new.html", ["2.html", "3.html"])
+    ranker.add_link("4.html", "new.html")
+    del corpus["9.html"]
+    for links in corpus.values():
+        links.discard("9.html")
+    ranker.remove_page("9.html")
+    ranker.update(1e-10)
+
+    assert ranker.iterations < cold
+    expected = matrix_pagerank(corpus, DAMPING, 1e-12)
+    ranks = ranker.to_dict()
+    assert ranks.keys() == expected.keys()
+    for page in expected:
+        assert ranks[page] == pytest.approx(expected[page], abs=1e-9)
+
+    path = str(tmp_path / "state.npz")
+    ranker.save(path)
+    loaded = IncrementalPageRank.load(path)
+    assert loaded.to_dict() == ranks
+
+    # Syncing with a changed corpus queues just the differences
+    corpus["1.html"] = {"2.html"}
+    del corpus["new.html"]
+    for links in corpus.values():
+        links.discard("new.html")
+    loaded.sync(corpus)
+    loaded.update(1e-10)
+    expected = matrix_pagerank(corpus, DAMPING, 1e-12)
+    for page, rank in loaded.to_dict().items():
+        assert rank == pytest.approx(expected[page], abs=1e-9)
+    assert len(loaded) == len(corpus)
+
+
+def test_existing_link():
+    pages = [f"{i}.html" for i in range(200)]
+    sources, targets = power_law_links(200, 4, seed=2)
+    corpus = to_corpus(pages, sources, targets)
+    ranker = IncrementalPageRank.from_corpus(corpus, DAMPING)
+    columns = ranker.links.tocsc()
+    rng = random.Random(0)
+    for _ in range(50):
+        source, target = existing_link(ranker, columns, rng)
+        assert target in corpus[source]
+
+
+def test_personalized_pagerank():
+    sources, targets = power_law_links(400, 4, seed=4)
+    pages = [f"{i}.html" for i in range(400)]
+    corpus = to_corpus(pages, sources, targets)
+    links = LinkMatrix.from_corpus(corpus)
+    linked = [page for page in pages if len(corpus[page]) >= 2]
+    seed_sets = [linked[:1], linked[1:4], pages]
+    ranks = personalized_pagerank(links, seed_sets, DAMPING, 1e-12)
+
+    # With every page as a seed, this is the usual PageRank
+    expected = links.pagerank(DAMPING, 1e-12)
+    assert abs(ranks[:, 2] - expected).sum() < 1e-9
+
+    # Each column is the same as ranking its seed set alone
+    for i, seeds in enumerate(seed_sets):
+        alone = personalized_pagerank(links, [seeds], DAMPING, 1e-12)
+        assert abs(ranks[:, i] - alone[:, 0]).sum() < 1e-9
+        assert ranks[:, i].sum() == pytest.approx(1)
+
+    # Local push only reaches part of the corpus, and finds the same top
+    for i, seeds in enumerate(seed_sets[:2]):
+        estimates = push_pagerank(links, seeds, DAMPING, 1e-6)
+        for page, estimate in estimates.items():
+            assert estimate <= ranks[page, i] + 1e-12
+        top = top_pages(links, seeds, DAMPING, 5, 1e-9)
+        exact = sorted(ranks[:, i], reverse=True)[:5]
+
+        # The pages found have the top true ranks (seed pages can tie, so
+        # tied pages may come in either order)
+        found = [ranks[links.index[page], i] for page, rank in top]
+        assert found == pytest.approx(exact, abs=1e-9)
+    assert len(push_pagerank(links, linked[:1], DAMPING, 1e-3)) < 400
+    assert (links.slots == -1).all()
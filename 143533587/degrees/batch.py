@@ -0,0 +1,196 @@
+import csv
+import json
+import multiprocessing
+import os
+import socketserver
+import sys
+import time
+
+import degrees
+from distances import SourceTableCache
+
+
+def serve(directory, options, search_options=None, input_file=None,
+          socket_path=None, workers=None, cache_options=None):
+    """
+    Keeps the dataset in `directory` loaded (with `load_data` options
+    `options`) and answers `source,target` queries from `input_file` ("-"
+    for stdin) and/or from clients of a Unix socket at `socket_path`,
+    writing one JSON line per query. Each query is answered by
+    `shortest_path` with keyword arguments `search_options`.
+
+    Queries are answered by a pool of `workers` processes (by default one
+    per CPU) that share the loaded graph; with 0 workers they are answered
+    in this process. Each process caches source tables in a
+    `SourceTableCache` built with keyword arguments `cache_options`.
+    """
+    initialize(directory, options, cache_options)
+
+    if workers == 0:
+        pool = None
+    else:
+        # Forked workers share the already loaded graph with this process;
+        # elsewhere each worker loads it (from the snapshot, if enabled)
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+            "fork" if "fork" in methods else None
+        )
+        pool = context.Pool(
+            workers, initializer=initialize,
+            initargs=(directory, options, cache_options)
+        )
+
+    try:
+        if input_file == "-":
+            answer_stream(sys.stdin, sys.stdout, search_options, pool)
+        elif input_file is not None:
+            with open(input_file, encoding="utf-8") as f:
+                answer_stream(f, sys.stdout, search_options, pool)
+        if socket_path is not None:
+            serve_socket(socket_path, search_options, pool)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def initialize(directory, options, cache_options=None):
+    """
+    Loads the dataset, unless it was inherited from a parent process, finds
+    its connected components and sets up the source table cache.
+    """
+    if degrees.graph is None and not degrees.people:
+        degrees.load_data(directory, **options)
+    if degrees.components is None:
+        degrees.survey_graph()
+    degrees.source_tables = SourceTableCache(**(cache_options or {}))
+
+
+def answer_stream(lines, output, search_options=None, pool=None):
+    """
+    Answers each query in `lines`, writing a JSON line to `output` for each
+    in the order the queries were given.
+    """
+    search_options = search_options or {}
+    queries = ((line, search_options) for line in lines if is_query(line))
+    if pool is None:
+        results = (answer(query) for query in queries)
+    else:
+        results = pool.imap(answer, queries, chunksize=4)
+    for result in results:
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+
+
+def serve_socket(path, search_options=None, pool=None):
+    """
+    Accepts clients on a Unix socket at `path` until interrupted, answering
+    the queries each client sends with one JSON line per query.
+    """
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            lines = (line.decode("utf-8") for line in self.rfile)
+            output = Writer(self.wfile)
+            answer_stream(lines, output, search_options, pool)
+
+    if os.path.exists(path):
+        os.remove(path)
+    try:
+        with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        os.remove(path)
+
+
+class Writer():
+    """Adapts a binary socket file to the text `write`/`flush` interface."""
+
+    def __init__(self, file):
+        self.file = file
+
+    def write(self, text):
+        self.file.write(text.encode("utf-8"))
+
+    def flush(self):
+        self.file.flush()
+
+
+def is_query(line):
+    """
+    Returns True unless a line is blank or a comment.
+    """
+    line = line.strip()
+    return bool(line) and not line.startswith("#")
+
+
+def answer(query):
+    """
+    Answers one `source,target` query line, where each person is given by
+    IMDB id or by name, and returns the result as a dictionary.
+    """
+    line, search_options = query
+    start = time.perf_counter()
+    result = {"query": line.strip()}
+    try:
+        fields = next(csv.reader([line.strip()]))
+        if len(fields) != 2:
+            raise LookupError("expected a line of the form source,target")
+        source, target = (resolve_person(field.strip()) for field in fields)
+        path = degrees.shortest_path(source, target, **search_options)
+    except LookupError as e:
+        result["error"] = str(e.args[0])
+    else:
+        result["source"] = source
+        result["source_name"] = degrees.people[source]["name"]
+        result["target"] = target
+        result["target_name"] = degrees.people[target]["name"]
+        if path is None:
+            result["degrees"] = None
+            result["path"] = None
+        else:
+            result["degrees"] = len(path)
+            result["path"] = [
+                {
+                    "movie_id": movie_id,
+                    "title": degrees.movies[movie_id]["title"],
+                    "person_id": person_id,
+                    "name": degrees.people[person_id]["name"],
+                }
+                for movie_id, person_id in path
+            ]
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def resolve_person(text):
+    """
+    Returns the IMDB id for a person given by id or by name, raising
+    LookupError if there is no such person or the name is ambiguous.
+
+    Misspelled or partial names resolve to the best match from
+    `find_people` if one match is better than all the others.
+    """
+    if text in degrees.people:
+        return text
+    person_ids = degrees.names.get(text.lower(), set())
+    if len(person_ids) > 1:
+        raise LookupError(
+            f"ambiguous name {text}: " + ", ".join(sorted(person_ids))
+        )
+    if len(person_ids) == 1:
+        return next(iter(person_ids))
+
+    # Settle for the closest match, as long as it is clearly the closest
+    matches = degrees.find_people(text, limit=5)
+    if not matches:
+        raise LookupError(f"person not found: {text}")
+    if len(matches) > 1 and matches[1][1] == matches[0][1]:
+        suggestions = ", ".join(
+            f"{degrees.people[person_id]['name']} ({person_id})"
+            for person_id, score in matches
+        )
+        raise LookupError(f"ambiguous name {text}, did you mean: {suggestions}")
+    return matches[0][0]
@@ -0,0 +1,364 @@
+import argparse
+import csv
+import functools
+import itertools
+import multiprocessing
+import os
+import random
+import resource
+import time
+
+import degrees
+from lookup import NameIndex
+from snapshot import snapshot_path
+from util import (
+    Node, StackFrontier, QueueFrontier, DequeStackFrontier, DequeQueueFrontier
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the degrees search engines."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser(
+        "search", help="compare one-sided and bidirectional search"
+    )
+    add_dataset_arguments(search)
+    search.add_argument("--pairs", type=int, default=300)
+    search.add_argument(
+        "--compact", action="store_true",
+        help="search the compact integer-indexed graph"
+    )
+
+    memory = commands.add_parser(
+        "memory", help="compare load time and memory of the loaders and "
+                       "of a binary snapshot"
+    )
+    add_dataset_arguments(memory)
+
+    lookup = commands.add_parser(
+        "names", help="time prefix and approximate name lookups"
+    )
+    lookup.add_argument("--count", type=int, default=10**6)
+    lookup.add_argument("--queries", type=int, default=1000)
+    lookup.add_argument("--seed", type=int, default=0)
+
+    frontier = commands.add_parser(
+        "frontier", help="time frontier operations at increasing sizes"
+    )
+    frontier.add_argument(
+        "--sizes", type=int, nargs="+", default=[10**5, 3 * 10**5, 10**6]
+    )
+    frontier.add_argument(
+        "--list-limit", type=int, default=10**4,
+        help="largest size to run the list-backed frontiers at"
+    )
+
+    args = parser.parse_args()
+    if args.command == "search":
+        directory = dataset_directory(args)
+        print("Loading data...")
+        degrees.load_data(directory, compact=args.compact)
+        print("Data loaded.")
+        benchmark_search(args.pairs, args.seed)
+    elif args.command == "memory":
+        benchmark_loaders(dataset_directory(args))
+    elif args.command == "names":
+        benchmark_names(args.count, args.queries, args.seed)
+    elif args.command == "frontier":
+        benchmark_frontiers(args.sizes, args.list_limit)
+
+
+def add_dataset_arguments(parser):
+    """
+    Add the arguments that choose (or generate) the dataset to `parser`.
+    """
+    parser.add_argument(
+        "directory", nargs="?",
+        help="dataset directory (a synthetic dataset is generated if omitted)"
+    )
+    parser.add_argument("--people", type=int, default=10000)
+    parser.add_argument("--movies", type=int, default=4000)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def dataset_directory(args):
+    """
+    Return the dataset directory named on the command line, generating a
+    synthetic dataset if none was given.
+    """
+    if args.directory is not None:
+        return args.directory
+    directory = os.path.join("synthetic", f"{args.people}-{args.movies}")
+    if not os.path.exists(directory):
+        print(f"Generating {directory}...")
+        generate_dataset(directory, args.people, args.movies, args.seed)
+    return directory
+
+
+def generate_dataset(directory, num_people, num_movies, seed=0, cast_size=4):
+    """
+    Write a random dataset in the same CSV layout as `small` and `large`.
+
+    Actors are picked with a heavy-tailed popularity so that, like the real
+    data, a few people star in many movies and most star in one or two.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "people.csv"), "w", newline="",
+              encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(num_people):
+            writer.writerow([i, f"Person {i}", 1900 + rng.randrange(120)])
+
+    with open(os.path.join(directory, "movies.csv"), "w", newline="",
+              encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for i in range(num_movies):
+            writer.writerow([i, f"Movie {i}", 1900 + rng.randrange(120)])
+
+    cum_weights = list(itertools.accumulate(
+        1 / (i + 1) for i in range(num_people)
+    ))
+    with open(os.path.join(directory, "stars.csv"), "w", newline="",
+              encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie_id in range(num_movies):
+            cast = set(rng.choices(
+                range(num_people), cum_weights=cum_weights, k=cast_size
+            ))
+            for person_id in cast:
+                writer.writerow([person_id, movie_id])
+
+
+def random_pairs(count, seed=0):
+    """
+    Return `count` random (source, target) pairs of people who have
+    starred in at least one movie.
+
+    If the data was loaded compactly, the pairs are of person indices.
+    """
+    rng = random.Random(seed)
+    if degrees.graph is not None:
+        graph = degrees.graph
+        candidates = [
+            person for person in range(graph.num_people)
+            if len(graph.movies_of(person))
+        ]
+    else:
+        candidates = sorted(
+            person_id for person_id, person in degrees.people.items()
+            if person["movies"]
+        )
+    return [
+        (rng.choice(candidates), rng.choice(candidates))
+        for _ in range(count)
+    ]
+
+
+def benchmark_search(num_pairs, seed=0):
+    """
+    Run both search engines over the same random pairs and print the
+    people explored and wall-clock time of each.
+    """
+    pairs = random_pairs(num_pairs, seed)
+    engines = [
+        ("one-sided", degrees.breadth_first_search),
+        ("bidirectional", degrees.bidirectional_search),
+    ]
+    if degrees.graph is not None:
+        engines = [
+            (name, functools.partial(search, neighbors=degrees.graph.neighbors))
+            for name, search in engines
+        ]
+    results = {}
+    for name, search in engines:
+        explored = 0
+        lengths = []
+        start = time.perf_counter()
+        for source, target in pairs:
+            path, num_explored = search(source, target)
+            explored += num_explored
+            lengths.append(None if path is None else len(path))
+        results[name] = (explored, time.perf_counter() - start, lengths)
+
+    if results["one-sided"][2] != results["bidirectional"][2]:
+        raise Exception("engines disagree on path lengths")
+
+    print(f"{len(pairs)} pairs")
+    print(f"  {'engine':<15}{'explored':>12}{'per query':>12}{'seconds':>10}")
+    for name, (explored, seconds, _) in results.items():
+        print(f"  {name:<15}{explored:>12}{explored / len(pairs):>12.1f}"
+              f"{seconds:>10.3f}")
+    baseline, bidirectional = results["one-sided"], results["bidirectional"]
+    print(f"  speedup: {baseline[1] / bidirectional[1]:.1f}x time, "
+          f"{baseline[0] / max(bidirectional[0], 1):.1f}x explored")
+
+
+def benchmark_loaders(directory):
+    """
+    Load the dataset into dictionaries, into a compact graph and from a
+    snapshot, each in a fresh process, and print the load time and
+    resident memory of each.
+    """
+    loaders = [
+        ("dicts", {}),
+        ("compact", {"compact": True}),
+        ("snapshot (write)", {"snapshot": True}),
+        ("snapshot", {"snapshot": True}),
+    ]
+    path = snapshot_path(directory)
+    if os.path.exists(path):
+        os.remove(path)
+
+    print(f"  {'loader':<18}{'ms':>10}{'resident MB':>14}{'peak MB':>10}")
+    for name, options in loaders:
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            seconds, resident, peak = pool.apply(
+                measure_load, (directory, options)
+            )
+        print(f"  {name:<18}{seconds * 1000:>10.1f}{resident / 2**20:>14.1f}"
+              f"{peak / 2**20:>10.1f}")
+
+
+def measure_load(directory, options):
+    """
+    Return the seconds taken to load the dataset with `load_data` options
+    and the growth in resident and peak memory, in bytes, that loading it
+    caused.
+    """
+    resident_before = resident_memory()
+    start = time.perf_counter()
+    degrees.load_data(directory, **options)
+    seconds = time.perf_counter() - start
+    resident = resident_memory() - resident_before
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return seconds, resident, peak - resident_before
+
+
+def resident_memory():
+    """
+    Return the resident memory of this process in bytes.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def random_names(count, seed=0):
+    """
+    Return `count` random names built from syllables, so that, unlike the
+    names of a generated dataset, they share few words and letters.
+    """
+    rng = random.Random(seed)
+    syllables = [
+        consonant + vowel
+        for consonant in "bcdfghjklmnprstvwz"
+        for vowel in "aeiou"
+    ]
+
+    def word(rng):
+        return "".join(rng.choices(syllables, k=rng.randint(2, 4))).title()
+
+    first = [word(rng) for _ in range(2000)]
+    last = [word(rng) for _ in range(count // 4 + 1)]
+    return [f"{rng.choice(first)} {rng.choice(last)}" for _ in range(count)]
+
+
+def misspell(name, rng):
+    """
+    Return `name` with one character deleted, replaced or transposed.
+    """
+    i = rng.randrange(len(name) - 1)
+    edit = rng.choice(["delete", "replace", "transpose"])
+    if edit == "delete":
+        return name[:i] + name[i + 1:]
+    if edit == "replace":
+        return name[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + name[i + 1:]
+    return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+
+def benchmark_names(count, num_queries, seed=0):
+    """
+    Build a `NameIndex` of `count` random names and print the time per
+    lookup of exact, prefix and misspelled queries, and how often the
+    intended name is the top result.
+    """
+    rng = random.Random(seed)
+    names = random_names(count, seed)
+    start = time.perf_counter()
+    index = NameIndex.build(names)
+    print(f"Built index of {len(index.names)} names "
+          f"in {time.perf_counter() - start:.2f} seconds")
+
+    targets = [rng.choice(names).lower() for _ in range(num_queries)]
+    queries = [
+        ("exact", targets),
+        ("prefix", [name[:max(3, len(name) // 2)] for name in targets]),
+        ("misspelled", [misspell(name, rng) for name in targets]),
+    ]
+    print(f"  {'query':<12}{'ms/lookup':>12}{'top hit':>10}")
+    for kind, texts in queries:
+        start = time.perf_counter()
+        results = [index.search(text) for text in texts]
+        seconds = time.perf_counter() - start
+        hits = sum(
+            1 for text, target, result in zip(texts, targets, results)
+            if result and (result[0][1] == target or kind == "prefix"
+                           and result[0][1].startswith(text))
+        )
+        print(f"  {kind:<12}{seconds / len(texts) * 1000:>12.3f}"
+              f"{hits / len(texts):>10.0%}")
+
+
+def benchmark_frontiers(sizes, list_limit):
+    """
+    Fill each kind of frontier with `size` nodes, checking membership
+    before every add as a search does, then empty it again.
+
+    Prints the time per operation, which stays flat as the size grows for
+    a linear-time frontier and grows with the size for a quadratic one.
+    """
+    frontiers = [
+        ("StackFrontier", StackFrontier, True),
+        ("QueueFrontier", QueueFrontier, True),
+        ("DequeStackFrontier", DequeStackFrontier, False),
+        ("DequeQueueFrontier", DequeQueueFrontier, False),
+    ]
+    sizes = sorted(set(sizes) | {size for size in (list_limit // 4, list_limit)
+                                 if size > 0})
+    print(f"  {'frontier':<20}{'size':>10}{'seconds':>10}{'ns/op':>10}")
+    for name, frontier_class, list_backed in frontiers:
+        for size in sizes:
+            if list_backed and size > list_limit:
+                continue
+            seconds = time_frontier(frontier_class, size)
+            print(f"  {name:<20}{size:>10}{seconds:>10.3f}"
+                  f"{seconds / (3 * size) * 1e9:>10.0f}")
+
+
+def time_frontier(frontier_class, size):
+    """
+    Return the seconds taken to check, add and remove `size` nodes.
+    """
+    nodes = [Node(state=i, parent=None, action=None) for i in range(size)]
+    start = time.perf_counter()
+    frontier = frontier_class()
+    for node in nodes:
+        if not frontier.contains_state(node.state):
+            frontier.add(node)
+    while not frontier.empty():
+        frontier.remove()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,18 @@
+import argparse
 import csv
+import random
 import sys
-
-from util import Node, StackFrontier, QueueFrontier
+from array import array
+
+from distances import (
+    SourceTable, CompactSourceTable, SourceTableCache, build_table,
+    reverse_path
+)
+from graph import load_graph, NamesView, PeopleView, MoviesView
+from lookup import NameIndex
+from snapshot import load_snapshot
+from stats import Components, survey
+from util import Node, DequeQueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,11 +23,46 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# The CompactGraph behind names, people and movies, if loaded compactly
+graph = None
+
+# Prefix and approximate-spelling index of the keys of names
+name_index = NameIndex.build([])
+
+# Breadth-first search tables of recently indexed sources
+source_tables = SourceTableCache()
+
+# Connected components of people, once found by `survey_graph`
+components = None
 
-def load_data(directory):
+
+def load_data(directory, compact=False, snapshot=False):
     """
     Load data from CSV files into memory.
+
+    If `compact` is true, the data is loaded into an integer-indexed
+    `CompactGraph` instead, and `names`, `people` and `movies` become
+    read-only views of it.
+
+    If `snapshot` is true, the data is loaded compactly from a binary
+    snapshot of the CSV files, which is written on first use and rebuilt
+    whenever the CSV files change.
     """
+    global names, people, movies, graph, name_index, components
+    source_tables.clear()
+    components = None
+    if compact or snapshot:
+        if snapshot:
+            graph = load_snapshot(directory, load_graph)
+        else:
+            graph = load_graph(directory)
+        names = NamesView(graph)
+        people = PeopleView(graph)
+        movies = MoviesView(graph)
+        name_index = graph.name_search
+        return
+    names, people, movies, graph = {}, {}, {}, None
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -51,17 +97,91 @@ def load_data(directory):
             except KeyError:
                 pass
 
+    name_index = NameIndex.build(names)
+
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        description="Find the degrees of separation between two people."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument(
+        "--bidirectional", action="store_true",
+        help="search from both people at once and meet in the middle"
+    )
+    parser.add_argument(
+        "--compact", action="store_true",
+        help="load the data into a compact integer-indexed graph"
+    )
+    parser.add_argument(
+        "--snapshot", action="store_true",
+        help="load the data compactly from a binary snapshot of the CSV "
+             "files, written on first use"
+    )
+    parser.add_argument(
+        "--batch", metavar="FILE",
+        help="answer source,target queries from FILE ('-' for stdin) as "
+             "JSON lines instead of asking for names"
+    )
+    parser.add_argument(
+        "--socket", metavar="PATH",
+        help="answer source,target queries from clients of a Unix socket"
+    )
+    parser.add_argument(
+        "--index", action="store_true",
+        help="answer --batch and --socket queries from a cached full search "
+             "of each source"
+    )
+    parser.add_argument(
+        "--index-tables", type=int, default=16, metavar="N",
+        help="number of source tables to cache with --index (default: 16)"
+    )
+    parser.add_argument(
+        "--index-memory", type=int, default=256, metavar="MB",
+        help="memory limit of the cached source tables (default: 256)"
+    )
+    parser.add_argument(
+        "--stats", action="store_true",
+        help="print the size, degree distribution and connected components "
+             "of the graph instead of asking for names"
+    )
+    parser.add_argument(
+        "--sample", type=int, default=10, metavar="N",
+        help="number of people to estimate eccentricity from with --stats "
+             "(default: 10)"
+    )
+    parser.add_argument(
+        "--workers", type=int,
+        help="number of worker processes for --batch and --socket "
+             "(default: one per CPU)"
+    )
+    args = parser.parse_args()
+
+    if args.batch is not None or args.socket is not None:
+        from batch import serve
+        serve(
+            args.directory,
+            {"compact": args.compact, "snapshot": args.snapshot},
+            {"bidirectional": args.bidirectional, "index": args.index},
+            input_file=args.batch,
+            socket_path=args.socket,
+            workers=args.workers,
+            cache_options={
+                "max_tables": args.index_tables,
+                "max_bytes": args.index_memory * 2**20
+            }
+        )
+        return
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(args.directory, compact=args.compact, snapshot=args.snapshot)
     print("Data loaded.")
 
+    if args.stats:
+        print(survey_graph(sample=args.sample).report())
+        return
+
     source = person_id_for_name(input("Name: "))
     if source is None:
         sys.exit("Person not found.")
@@ -69,7 +189,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, bidirectional=args.bidirectional)
 
     if path is None:
         print("Not connected.")
@@ -84,34 +204,159 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False, index=False):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
-    If no possible path, returns None.
+    If `bidirectional` is true, frontiers are grown from both the source
+    and the target until they meet, which explores far fewer people on
+    large, poorly connected graphs.
+
+    If the source or target has been indexed with `index_source` (or
+    `index` is true, which indexes the source first), the path is read
+    from the cached table instead of searching.
+
+    Once `survey_graph` has found the connected components, people in
+    different components are known to be unconnected without searching.
+
+    If either person is unknown, or no possible path, returns None.
+    """
+    if source not in people or target not in people:
+        return None
+
+    if graph is None:
+        start, goal, neighbors = source, target, neighbors_for_person
+    else:
+        # Search over the integer indices of the compact graph
+        start, goal = graph.person(source), graph.person(target)
+        neighbors = graph.neighbors
+
+    if components is not None and not components.connected(start, goal):
+        return None
+
+    if index:
+        index_source(source)
+    if source in source_tables:
+        path = source_tables.get(source).path(goal)
+    elif target in source_tables:
+        path = source_tables.get(target).path(start)
+        if path is not None:
+            path = reverse_path(path, goal)
+    else:
+        search = bidirectional_search if bidirectional else breadth_first_search
+        path, num_explored = search(start, goal, neighbors)
+
+    if path is None or graph is None:
+        return path
+    return [
+        (graph.movie_ids[movie], graph.person_ids[person])
+        for movie, person in path
+    ]
+
+
+def index_source(source):
+    """
+    Runs a full breadth-first search from the source and caches the
+    parent and distance of every person it reaches in `source_tables`,
+    so that later paths from (or to) the source need no search.
+
+    Returns the table.
+    """
+    table = source_tables.get(source)
+    if table is None:
+        table = search_table(source)
+        source_tables.put(source, table)
+    return table
+
+
+def search_table(source):
+    """
+    Runs a full breadth-first search from the source and returns its
+    table, without caching it.
+    """
+    if graph is None:
+        return build_table(SourceTable(source), neighbors_for_person)
+    return build_table(
+        CompactSourceTable(graph.person(source), graph.num_people),
+        graph.neighbors
+    )
+
+
+def survey_graph(sample=0, seed=0):
+    """
+    Counts the people, movies and edges of the loaded graph, their degree
+    distributions and its connected components in one pass, and estimates
+    the eccentricity of `sample` random people of the largest component
+    with a full breadth-first search from each.
+
+    Returns the `GraphStats`, and keeps the components for
+    `shortest_path` to reject unconnected pairs.
+    """
+    global components
+    if graph is None:
+        forest = Components({person_id: person_id for person_id in people})
+        person_movies = (
+            (person_id, len(person["movies"]))
+            for person_id, person in people.items()
+        )
+        casts = (movie["stars"] for movie in movies.values())
+    else:
+        offsets = graph.person_offsets
+        forest = Components(array("i", range(graph.num_people)))
+        person_movies = (
+            (person, offsets[person + 1] - offsets[person])
+            for person in range(graph.num_people)
+        )
+        casts = (graph.stars_of(movie) for movie in range(graph.num_movies))
+    stats = survey(person_movies, casts, forest)
+    components = forest
+
+    if sample > 0 and stats.num_people:
+        # Sample by IMDB id, as `search_table` expects
+        ids = people if graph is None else graph.person_ids
+        root = forest.largest()
+        candidates = [
+            person_id for i, person_id in enumerate(ids)
+            if forest.find(person_id if graph is None else i) == root
+        ]
+        rng = random.Random(seed)
+        for person_id in rng.sample(candidates, min(sample, len(candidates))):
+            stats.add_eccentricity(search_table(person_id).all_distances())
+    return stats
+
+
+def breadth_first_search(source, target, neighbors=None):
+    """
+    Runs a breadth-first search from the source towards the target, using
+    `neighbors` (by default `neighbors_for_person`) to expand each state.
+
+    Returns a tuple of the path (as in `shortest_path`, or None) and the
+    number of states explored.
     """
+    if neighbors is None:
+        neighbors = neighbors_for_person
+
     # Keep track of number of states explored
     num_explored = 0
 
     # Initialize frontier to just the starting position
     start = Node(state=source, parent=None, action=None)
-    frontier = QueueFrontier()
+    frontier = DequeQueueFrontier()
     frontier.add(start)
 
     # Initialize an empty explored set
     explored = set()
 
-    if source  == target:
-        return []
+    if source == target:
+        return [], num_explored
 
     # Keep looping until solution found
     while True:
 
         # If nothing left in frontier, then no path
         if frontier.empty():
-            #raise Exception("no solution")
-            return None
+            return None, num_explored
 
         # Choose a node from the frontier
         node = frontier.remove()
@@ -121,55 +366,156 @@ def shortest_path(source, target):
         explored.add(node.state)
 
         # Add neighbors to frontier
-        for movie_id, person_id in neighbors_for_person(node.state):
+        for movie_id, person_id in neighbors(node.state):
             if not frontier.contains_state(person_id) and person_id not in explored:
                 child = Node(state=person_id, parent=node, action=movie_id)
 
                 # If node is the goal, then we have a solution
                 if child.state == target:
-                    movies = []
-                    people = []
-                    solution =[]
+                    solution = []
                     while child.parent is not None:
-                        movies.append(child.action)
-                        people.append(child.state)
+                        solution.append((child.action, child.state))
                         child = child.parent
-                    movies.reverse()
-                    people.reverse()
-                    x = zip(movies,people)
-                    for movie,person in x:
-                        solution.append((movie,person))
-                    return solution
+                    solution.reverse()
+                    return solution, num_explored
 
+                frontier.add(child)
 
 
-                frontier.add(child)
+def bidirectional_search(source, target, neighbors=None):
+    """
+    Runs a breadth-first search from the source and from the target at the
+    same time, always expanding one full layer of the smaller frontier.
+    States are expanded with `neighbors` (by default `neighbors_for_person`).
+
+    Returns a tuple of the path (as in `shortest_path`, or None) and the
+    number of states explored.
+    """
+    if neighbors is None:
+        neighbors = neighbors_for_person
+
+    num_explored = 0
+    if source == target:
+        return [], num_explored
+
+    # Maps each reached person to the (movie_id, person_id) step that
+    # leads one person closer to the source (or target, respectively)
+    forward = {source: None}
+    backward = {target: None}
+    forward_layer = [source]
+    backward_layer = [target]
+
+    while forward_layer and backward_layer:
+
+        # Expand whichever side has the smaller frontier
+        if len(forward_layer) <= len(backward_layer):
+            reached, other, layer = forward, backward, forward_layer
+        else:
+            reached, other, layer = backward, forward, backward_layer
+
+        # Expand the whole layer, remembering the shortest meeting point;
+        # stopping at the first meeting could return a longer path
+        meeting = None
+        best = None
+        next_layer = []
+        for person_id in layer:
+            num_explored += 1
+            for movie_id, neighbor_id in neighbors(person_id):
+                if neighbor_id in reached:
+                    continue
+                reached[neighbor_id] = (movie_id, person_id)
+                if neighbor_id in other:
+                    length = _steps(other, neighbor_id)
+                    if best is None or length < best:
+                        meeting, best = neighbor_id, length
+                next_layer.append(neighbor_id)
+
+        if meeting is not None:
+            return _join(forward, backward, meeting), num_explored
+
+        if reached is forward:
+            forward_layer = next_layer
+        else:
+            backward_layer = next_layer
+
+    return None, num_explored
+
+
+def _steps(parents, person_id):
+    """
+    Returns the number of steps from `person_id` back to the root of the
+    search tree described by `parents`.
+    """
+    steps = 0
+    while parents[person_id] is not None:
+        person_id = parents[person_id][1]
+        steps += 1
+    return steps
+
+
+def _join(forward, backward, meeting):
+    """
+    Joins the two halves of a bidirectional search at `meeting` into a list
+    of (movie_id, person_id) pairs from the source to the target.
+    """
+    path = []
+    person_id = meeting
+    while forward[person_id] is not None:
+        movie_id, parent_id = forward[person_id]
+        path.append((movie_id, person_id))
+        person_id = parent_id
+    path.reverse()
+
+    person_id = meeting
+    while backward[person_id] is not None:
+        movie_id, person_id = backward[person_id]
+        path.append((movie_id, person_id))
+    return path
 
 
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    If no one has exactly that name, offers the closest matches instead.
     """
     person_ids = list(names.get(name.lower(), set()))
-    if len(person_ids) == 0:
-        return None
-    elif len(person_ids) > 1:
+    if len(person_ids) == 1:
+        return person_ids[0]
+    if len(person_ids) > 1:
         print(f"Which '{name}'?")
-        for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
-            print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
-        try:
-            person_id = input("Intended Person ID: ")
-            if person_id in person_ids:
-                return person_id
-        except ValueError:
-            pass
-        return None
     else:
-        return person_ids[0]
+        person_ids = [person_id for person_id, score in find_people(name)]
+        if len(person_ids) == 0:
+            return None
+        print(f"No exact match for '{name}'. Did you mean:")
+
+    for person_id in person_ids:
+        person = people[person_id]
+        name = person["name"]
+        birth = person["birth"]
+        print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
+    try:
+        person_id = input("Intended Person ID: ")
+        if person_id in person_ids:
+            return person_id
+    except ValueError:
+        pass
+    return None
+
+
+def find_people(name, limit=10):
+    """
+    Returns up to `limit` (person_id, score) pairs for the people whose
+    names best match `name` exactly, by prefix or by approximate spelling,
+    best first. Scores are those of `NameIndex.search`.
+    """
+    matches = []
+    for score, match in name_index.search(name, limit):
+        for person_id in sorted(names[match]):
+            matches.append((person_id, score))
+    return matches[:limit]
 
 
 def neighbors_for_person(person_id):
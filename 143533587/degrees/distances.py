@@ -0,0 +1,177 @@
+import sys
+from array import array
+from collections import OrderedDict, deque
+
+
+class SourceTable():
+    """
+    The parent and distance of every person reachable from one source,
+    from a full breadth-first search, so that the shortest path to any
+    target is a walk up the parent pointers.
+    """
+
+    def __init__(self, source):
+        self.source = source
+
+        # Maps each reached person to (movie, parent person, distance)
+        self.parents = {source: (None, None, 0)}
+
+    def reached(self, person):
+        return person in self.parents
+
+    def add(self, person, movie, parent, distance):
+        self.parents[person] = (movie, parent, distance)
+
+    def parent(self, person):
+        """Returns the (movie, person) step towards the source."""
+        movie, parent, distance = self.parents[person]
+        return movie, parent
+
+    def distance(self, person):
+        """
+        Returns the number of steps from the source to a person, or None if
+        the person cannot be reached.
+        """
+        entry = self.parents.get(person)
+        return None if entry is None else entry[2]
+
+    def all_distances(self):
+        """Yields the distance of every reached person from the source."""
+        for movie, parent, distance in self.parents.values():
+            yield distance
+
+    def path(self, target):
+        """
+        Returns the shortest list of (movie, person) pairs that connect the
+        source to the target, or None if there is no path.
+        """
+        if not self.reached(target):
+            return None
+        path = []
+        while target != self.source:
+            movie, parent = self.parent(target)
+            path.append((movie, target))
+            target = parent
+        path.reverse()
+        return path
+
+    @property
+    def nbytes(self):
+        """An estimate of the memory used by the table, in bytes."""
+        entry = sys.getsizeof((None, None, 0))
+        return sys.getsizeof(self.parents) + entry * len(self.parents)
+
+
+class CompactSourceTable(SourceTable):
+    """
+    A `SourceTable` over the integer people and movies of a `CompactGraph`,
+    stored in arrays.
+    """
+
+    def __init__(self, source, num_people):
+        self.source = source
+        self.movies = array("i", [-1]) * num_people
+        self.people = array("i", [-1]) * num_people
+        self.distances = array("i", [-1]) * num_people
+        self.distances[source] = 0
+
+    def reached(self, person):
+        return self.distances[person] >= 0
+
+    def add(self, person, movie, parent, distance):
+        self.movies[person] = movie
+        self.people[person] = parent
+        self.distances[person] = distance
+
+    def parent(self, person):
+        return self.movies[person], self.people[person]
+
+    def distance(self, person):
+        distance = self.distances[person]
+        return None if distance < 0 else distance
+
+    def all_distances(self):
+        return (distance for distance in self.distances if distance >= 0)
+
+    @property
+    def nbytes(self):
+        return sum(
+            a.itemsize * len(a)
+            for a in (self.movies, self.people, self.distances)
+        )
+
+
+def build_table(table, neighbors):
+    """
+    Fills an empty `table` by running a breadth-first search from its
+    source, expanding each person with `neighbors`, and returns it.
+    """
+    queue = deque([table.source])
+    while queue:
+        person = queue.popleft()
+        distance = table.distance(person) + 1
+        for movie, neighbor in neighbors(person):
+            if not table.reached(neighbor):
+                table.add(neighbor, movie, person, distance)
+                queue.append(neighbor)
+    return table
+
+
+def reverse_path(path, start):
+    """
+    Given a path of (movie, person) pairs from `start`, returns the path
+    in the opposite direction, ending at `start`.
+    """
+    people = [start] + [person for movie, person in path]
+    return [
+        (path[i][0], people[i]) for i in reversed(range(len(path)))
+    ]
+
+
+class SourceTableCache():
+    """
+    Keeps the tables of the most recently used sources, evicting the least
+    recently used tables once there are more than `max_tables` or they
+    take more than `max_bytes` between them.
+    """
+
+    def __init__(self, max_tables=16, max_bytes=256 * 2**20):
+        self.max_tables = max_tables
+        self.max_bytes = max_bytes
+        self.tables = OrderedDict()
+        self.nbytes = 0
+
+    def __contains__(self, source):
+        return source in self.tables
+
+    def __len__(self):
+        return len(self.tables)
+
+    def get(self, source):
+        """
+        Returns the table for a source, or None if it is not cached.
+        """
+        table = self.tables.get(source)
+        if table is not None:
+            self.tables.move_to_end(source)
+        return table
+
+    def put(self, source, table):
+        """
+        Caches the table for a source, unless it alone would exceed the
+        memory limit.
+        """
+        if source in self.tables:
+            self.nbytes -= self.tables.pop(source).nbytes
+        if table.nbytes > self.max_bytes or self.max_tables < 1:
+            return
+        self.tables[source] = table
+        self.nbytes += table.nbytes
+        while (len(self.tables) > self.max_tables
+               or self.nbytes > self.max_bytes):
+            source, evicted = self.tables.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        self.tables.clear()
+        self.nbytes = 0
@@ -0,0 +1,241 @@
+import csv
+from array import array
+from collections.abc import Mapping
+
+from lookup import NameIndex
+from tables import StringTable, SortedIndex, build_csr
+
+
+class CompactGraph():
+    """
+    The people/movies graph with ids interned to dense integers.
+
+    People are numbered 0..num_people-1 and movies 0..num_movies-1 in the
+    order they appear in the CSV files. Adjacency is stored CSR-style: the
+    movies of person `p` are `person_movies[person_offsets[p]:
+    person_offsets[p + 1]]`, and likewise the stars of each movie in
+    `movie_people`.
+    """
+
+    def __init__(self, person_ids, names, births, movie_ids, titles, years,
+                 person_offsets, person_movies, movie_offsets, movie_people,
+                 person_order=None, name_order=None, movie_order=None,
+                 name_search=None):
+        self.person_ids = person_ids
+        self.names = names
+        self.births = births
+        self.movie_ids = movie_ids
+        self.titles = titles
+        self.years = years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+        self.person_index = SortedIndex(person_ids, person_order)
+        self.name_index = SortedIndex(names, name_order, key=str.lower)
+        self.movie_index = SortedIndex(movie_ids, movie_order)
+        self._name_search = name_search
+
+    @property
+    def num_people(self):
+        return len(self.person_ids)
+
+    @property
+    def num_movies(self):
+        return len(self.movie_ids)
+
+    @property
+    def name_search(self):
+        """
+        A `NameIndex` of the lowercase names of people, built on first use.
+        """
+        if self._name_search is None:
+            self._name_search = NameIndex.build(self.names)
+        return self._name_search
+
+    def person(self, person_id):
+        """Returns the index of an IMDB person id, or None."""
+        return self.person_index.find(person_id)
+
+    def movie(self, movie_id):
+        """Returns the index of an IMDB movie id, or None."""
+        return self.movie_index.find(movie_id)
+
+    def people_named(self, name):
+        """Returns the indices of people with a name, ignoring case."""
+        return self.name_index.find_all(name)
+
+    def movies_of(self, person):
+        """Returns the indices of the movies a person starred in."""
+        offsets = self.person_offsets
+        return self.person_movies[offsets[person]:offsets[person + 1]]
+
+    def stars_of(self, movie):
+        """Returns the indices of the people who starred in a movie."""
+        offsets = self.movie_offsets
+        return self.movie_people[offsets[movie]:offsets[movie + 1]]
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) index pairs for people who starred with a
+        given person.
+        """
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_people = self.movie_offsets, self.movie_people
+        for i in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[i]
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                yield movie, movie_people[j]
+
+
+def load_graph(directory):
+    """
+    Load data from CSV files into a `CompactGraph`.
+    """
+    person_ids, names, births = StringTable(), StringTable(), StringTable()
+    movie_ids, titles, years = StringTable(), StringTable(), StringTable()
+
+    # A repeated id keeps its first place but the fields of its last row,
+    # as in the dictionaries of degrees.load_data
+    rows = {}
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            rows[row["id"]] = row["name"], row["birth"]
+    for person_id, (name, birth) in rows.items():
+        person_ids.append(person_id)
+        names.append(name)
+        births.append(birth)
+
+    # The id dictionaries are only needed while reading stars.csv
+    people = {person_id: i for i, person_id in enumerate(rows)}
+
+    rows = {}
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            rows[row["id"]] = row["title"], row["year"]
+    for movie_id, (title, year) in rows.items():
+        movie_ids.append(movie_id)
+        titles.append(title)
+        years.append(year)
+    movies = {movie_id: i for i, movie_id in enumerate(rows)}
+    del rows
+
+    # Collect each distinct (person, movie) edge once
+    num_movies = max(len(movies), 1)
+    edges = set()
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            person = people.get(row["person_id"])
+            movie = movies.get(row["movie_id"])
+            if person is not None and movie is not None:
+                edges.add(person * num_movies + movie)
+    edges = sorted(edges)
+    star_people = array("i", (edge // num_movies for edge in edges))
+    star_movies = array("i", (edge % num_movies for edge in edges))
+    del people, movies, edges
+
+    person_offsets, person_movies = build_csr(
+        len(person_ids), star_people, star_movies
+    )
+    movie_offsets, movie_people = build_csr(
+        len(movie_ids), star_movies, star_people
+    )
+    return CompactGraph(
+        person_ids, names, births, movie_ids, titles, years,
+        person_offsets, person_movies, movie_offsets, movie_people
+    )
+
+
+class PeopleView(Mapping):
+    """
+    A read-only view of a `CompactGraph` with the same shape as the
+    `people` dictionary in degrees.py.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        person = self.graph.person(person_id)
+        if person is None:
+            raise KeyError(person_id)
+        return {
+            "name": self.graph.names[person],
+            "birth": self.graph.births[person],
+            "movies": {
+                self.graph.movie_ids[movie]
+                for movie in self.graph.movies_of(person)
+            }
+        }
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return self.graph.num_people
+
+    def __contains__(self, person_id):
+        return self.graph.person(person_id) is not None
+
+
+class MoviesView(Mapping):
+    """
+    A read-only view of a `CompactGraph` with the same shape as the
+    `movies` dictionary in degrees.py.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        movie = self.graph.movie(movie_id)
+        if movie is None:
+            raise KeyError(movie_id)
+        return {
+            "title": self.graph.titles[movie],
+            "year": self.graph.years[movie],
+            "stars": {
+                self.graph.person_ids[person]
+                for person in self.graph.stars_of(movie)
+            }
+        }
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return self.graph.num_movies
+
+    def __contains__(self, movie_id):
+        return self.graph.movie(movie_id) is not None
+
+
+class NamesView(Mapping):
+    """
+    A read-only view of a `CompactGraph` with the same shape as the
+    `names` dictionary in degrees.py, mapping lowercase names to sets of
+    person ids.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        people = self.graph.people_named(name)
+        if not people:
+            raise KeyError(name)
+        return {self.graph.person_ids[person] for person in people}
+
+    def __iter__(self):
+        previous = None
+        for person in self.graph.name_index.order:
+            name = self.graph.names[person].lower()
+            if name != previous:
+                yield name
+                previous = name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, name):
+        return bool(self.graph.people_named(name))
@@ -0,0 +1,208 @@
+import bisect
+import heapq
+import zlib
+from array import array
+
+from tables import StringTable, build_csr
+
+
+class NameIndex():
+    """
+    Finds names by prefix and by approximate spelling.
+
+    Names are kept lowercase and sorted in a `StringTable`, so names with a
+    given prefix are found by binary search.
+
+    For approximate matches, names are split into words. The names
+    containing each word are listed CSR-style in `word_offsets` and
+    `word_names`. Every word is also filed under a hash of itself and of
+    each way of deleting one letter from it, in the sorted `keys` with the
+    words listed in `key_offsets` and `key_words`, so that two words one
+    typo apart share a key and finding the words close to a query word
+    takes a handful of binary searches.
+    """
+
+    def __init__(self, names, words, word_offsets, word_names,
+                 keys, key_offsets, key_words):
+        self.names = names
+        self.words = words
+        self.word_offsets = word_offsets
+        self.word_names = word_names
+        self.keys = keys
+        self.key_offsets = key_offsets
+        self.key_words = key_words
+
+    @classmethod
+    def build(cls, names):
+        """
+        Builds the index of an iterable of names.
+        """
+        table = StringTable()
+        words = StringTable()
+        word_ids = {}
+        occurrence_words, occurrence_names = array("i"), array("i")
+        for i, name in enumerate(sorted({name.lower() for name in names})):
+            table.append(name)
+            for word in set(name.split()):
+                if word not in word_ids:
+                    word_ids[word] = len(word_ids)
+                    words.append(word)
+                occurrence_words.append(word_ids[word])
+                occurrence_names.append(i)
+        word_offsets, word_names = build_csr(
+            len(words), occurrence_words, occurrence_names
+        )
+        del occurrence_words, occurrence_names
+
+        entry_keys, entry_words = array("q"), array("i")
+        for word, i in word_ids.items():
+            for key in deletion_keys(word):
+                entry_keys.append(key)
+                entry_words.append(i)
+        del word_ids
+
+        # Number the distinct keys in sorted order for binary search
+        keys = array("q", sorted(set(entry_keys)))
+        rank = {key: i for i, key in enumerate(keys)}
+        entry_keys = array("i", (rank[key] for key in entry_keys))
+        del rank
+        key_offsets, key_words = build_csr(len(keys), entry_keys, entry_words)
+        return cls(
+            table, words, word_offsets, word_names, keys, key_offsets,
+            key_words
+        )
+
+    def prefix(self, text, limit=10):
+        """
+        Returns up to `limit` names starting with `text`, in sorted order.
+        """
+        text = text.lower()
+        i = bisect.bisect_left(self.names, text)
+        matches = []
+        while (i < len(self.names) and len(matches) < limit
+               and self.names[i].startswith(text)):
+            matches.append(self.names[i])
+            i += 1
+        return matches
+
+    def similar_words(self, word):
+        """
+        Returns a dictionary mapping the indices of the words at most one
+        typo (an insertion, deletion, substitution or transposition) away
+        from `word` to their edit distance from it.
+        """
+        similar = {}
+        for key in deletion_keys(word):
+            k = bisect.bisect_left(self.keys, key)
+            if k == len(self.keys) or self.keys[k] != key:
+                continue
+            for i in self.key_words[self.key_offsets[k]:self.key_offsets[k + 1]]:
+                if i not in similar:
+                    distance = typo_distance(word, self.words[i])
+                    if distance <= 1:
+                        similar[i] = distance
+        return similar
+
+    def fuzzy(self, text, limit=10):
+        """
+        Returns up to `limit` (score, name) pairs for the names containing,
+        for every word of `text`, a word at most one typo away, best first
+        (ties in sorted order). The score is 1 minus the number of typos
+        per letter of `text`.
+        """
+        query = text.lower().split()
+        if not query:
+            return []
+
+        # Start from the names matching the query word that appears in the
+        # fewest names, then check them against the other query words
+        similar = [self.similar_words(word) for word in query]
+        sizes = [
+            sum(self.word_offsets[i + 1] - self.word_offsets[i] for i in words)
+            for words in similar
+        ]
+        rarest = sizes.index(min(sizes))
+        typos = {}
+        for i, distance in similar[rarest].items():
+            for name in self.word_names[self.word_offsets[i]:
+                                        self.word_offsets[i + 1]]:
+                typos[name] = min(typos.get(name, distance), distance)
+
+        others = [
+            {self.words[i]: distance for i, distance in words.items()}
+            for k, words in enumerate(similar) if k != rarest
+        ]
+        if others:
+            for name in list(typos):
+                words = self.names[name].split()
+                for distances in others:
+                    distance = min(distances.get(word, 2) for word in words)
+                    if distance > 1:
+                        del typos[name]
+                        break
+                    typos[name] += distance
+
+        # Names are numbered in sorted order, so comparing numbers breaks
+        # ties alphabetically without decoding every candidate
+        best = heapq.nsmallest(
+            limit, ((count, name) for name, count in typos.items())
+        )
+        letters = sum(len(word) for word in query)
+        return [(1 - count / letters, self.names[name]) for count, name in best]
+
+    def search(self, text, limit=10):
+        """
+        Returns up to `limit` (score, name) pairs for the names that best
+        match `text`, best first. An exact match scores 2, a prefix match
+        between 1 and 2 (higher for shorter names) and an approximate match
+        at most 1 (see `fuzzy`).
+        """
+        text = " ".join(text.lower().split())
+        scores = {}
+        for name in self.prefix(text, limit):
+            scores[name] = 2 if name == text else 1 + len(text) / len(name)
+
+        # Approximate matches always rank below prefix matches, and are
+        # not needed at all once the exact name has been found
+        if len(scores) < limit and text not in scores:
+            for score, name in self.fuzzy(text, limit):
+                scores.setdefault(name, score)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(score, name) for name, score in ranked[:limit]]
+
+
+def deletion_keys(word):
+    """
+    Returns the set of hashes of `word` and of `word` with each one of its
+    letters deleted. Two words share a key if they are at most one typo
+    apart (and, rarely, if their hashes collide).
+    """
+    variants = {word} | {word[:i] + word[i + 1:] for i in range(len(word))}
+    return {zlib.crc32(variant.encode("utf-8")) for variant in variants}
+
+
+def typo_distance(a, b):
+    """
+    Returns 0 if `a` and `b` are equal, 1 if they are one insertion,
+    deletion, substitution or adjacent transposition apart, and 2 if they
+    are further apart than that.
+    """
+    if a == b:
+        return 0
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) - len(a) > 1:
+        return 2
+
+    # Skip the common prefix, then see whether one edit explains the rest
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) < len(b):
+        return 1 if a[i:] == b[i + 1:] else 2
+    if a[i + 1:] == b[i + 1:]:
+        return 1
+    if a[i + 1:i + 2] == b[i:i + 1] and a[i:i + 1] == b[i + 1:i + 2] \
+            and a[i + 2:] == b[i + 2:]:
+        return 1
+    return 2
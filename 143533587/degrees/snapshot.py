@@ -0,0 +1,177 @@
+import json
+import mmap
+import os
+import struct
+import sys
+
+from graph import CompactGraph
+from lookup import NameIndex
+from tables import StringTable
+
+# Bump whenever the layout of a snapshot, or what is loaded into it, changes
+SNAPSHOT_VERSION = 3
+
+MAGIC = b"DEGREES\0"
+
+FILES = ["people.csv", "movies.csv", "stars.csv"]
+
+# Graph attributes stored in a snapshot, in order
+TABLES = ["person_ids", "names", "births", "movie_ids", "titles", "years"]
+ARRAYS = [
+    "person_offsets", "person_movies", "movie_offsets", "movie_people",
+]
+INDICES = [
+    ("person_order", "person_index"),
+    ("name_order", "name_index"),
+    ("movie_order", "movie_index"),
+]
+NAME_SEARCH_TABLES = ["names", "words"]
+NAME_SEARCH_ARRAYS = [
+    "word_offsets", "word_names", "keys", "key_offsets", "key_words",
+]
+
+
+def snapshot_path(directory):
+    """
+    Returns the path of the snapshot for a data directory.
+    """
+    return os.path.join(directory, "degrees.snapshot")
+
+
+def source_key(directory):
+    """
+    Returns a key identifying the current contents of the CSV files in a
+    data directory, which changes whenever any of them is modified.
+    """
+    key = [SNAPSHOT_VERSION, sys.byteorder]
+    for filename in FILES:
+        stat = os.stat(os.path.join(directory, filename))
+        key.extend([filename, stat.st_size, stat.st_mtime_ns])
+    return key
+
+
+def write_snapshot(path, graph, key):
+    """
+    Writes `graph` to a snapshot file at `path`, tagged with `key`.
+
+    The snapshot is written to a temporary file first and then renamed, so
+    a concurrent reader never sees a partial snapshot.
+    """
+    sections = []
+    for name in TABLES:
+        table = getattr(graph, name)
+        sections.append((f"{name}.data", "B", table.data))
+        sections.append((f"{name}.offsets", "q", table.offsets))
+    for name in ARRAYS:
+        array = getattr(graph, name)
+        sections.append((name, array.typecode, array))
+    for name, index in INDICES:
+        order = getattr(graph, index).order
+        sections.append((name, order.typecode, order))
+    for name in NAME_SEARCH_TABLES:
+        table = getattr(graph.name_search, name)
+        sections.append((f"name_search.{name}.data", "B", table.data))
+        sections.append((f"name_search.{name}.offsets", "q", table.offsets))
+    for name in NAME_SEARCH_ARRAYS:
+        array = getattr(graph.name_search, name)
+        sections.append((f"name_search.{name}", array.typecode, array))
+
+    # Lay out each section at an 8-byte aligned offset after the header
+    layout = {}
+    position = 0
+    for name, typecode, buffer in sections:
+        size = memoryview(buffer).nbytes
+        layout[name] = [typecode, position, size]
+        position += size + (-size % 8)
+    header = json.dumps({"key": key, "sections": layout}).encode("utf-8")
+    header += b" " * (-(len(MAGIC) + 8 + len(header)) % 8)
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            for name, typecode, buffer in sections:
+                size = memoryview(buffer).nbytes
+                f.write(buffer)
+                f.write(bytes(-size % 8))
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def read_snapshot(path, key):
+    """
+    Returns the `CompactGraph` stored in the snapshot at `path`, with its
+    arrays memory-mapped from the file, or None if there is no snapshot, it
+    was written for a different `key`, or it is damaged (truncated, with a
+    bad header, or with sections that do not fit in the file).
+    """
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    with f:
+        try:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            (length,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(length))
+            if header["key"] != key:
+                return None
+            layout = header["sections"]
+            start = len(MAGIC) + 8 + length
+            buffer = memoryview(
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            )
+        except (struct.error, ValueError, KeyError, TypeError, OSError):
+            return None
+
+    def section(name):
+        typecode, offset, size = layout[name]
+        if offset < 0 or size < 0 or start + offset + size > len(buffer):
+            raise ValueError(f"section {name} does not fit in the snapshot")
+        view = buffer[start + offset:start + offset + size]
+        return view if typecode == "B" else view.cast(typecode)
+
+    try:
+        tables = [
+            StringTable(section(f"{name}.data"), section(f"{name}.offsets"))
+            for name in TABLES
+        ]
+        arrays = [section(name) for name in ARRAYS]
+        orders = [section(name) for name, index in INDICES]
+        name_search = NameIndex(
+            *[
+                StringTable(section(f"name_search.{name}.data"),
+                            section(f"name_search.{name}.offsets"))
+                for name in NAME_SEARCH_TABLES
+            ],
+            *[section(f"name_search.{name}") for name in NAME_SEARCH_ARRAYS]
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
+    return CompactGraph(*tables, *arrays, *orders, name_search=name_search)
+
+
+def load_snapshot(directory, load):
+    """
+    Returns the graph of a data directory from its snapshot if the snapshot
+    is up to date. Otherwise, calls `load(directory)` to build the graph
+    from the CSV files and saves a new snapshot of it for next time.
+    """
+    key = source_key(directory)
+    path = snapshot_path(directory)
+    graph = read_snapshot(path, key)
+    if graph is not None:
+        return graph
+
+    graph = load(directory)
+    try:
+        write_snapshot(path, graph, key)
+    except OSError:
+        # A read-only data directory just means no snapshot
+        pass
+    return graph
@@ -0,0 +1,187 @@
+from collections import Counter
+
+
+class Components():
+    """
+    The connected components of the people in a graph, as a union-find
+    forest over `parents`, a mapping (or array) from each person to itself.
+
+    After `flatten`, every person points straight at the root of its
+    component, so `connected` is a pair of lookups.
+    """
+
+    def __init__(self, parents):
+        self.parents = parents
+        self.sizes = {}
+
+    def find(self, person):
+        """Returns the root of the component of a person."""
+        parents = self.parents
+        while parents[person] != person:
+            # Path halving: point every other person at its grandparent
+            parents[person] = parents[parents[person]]
+            person = parents[person]
+        return person
+
+    def union(self, a, b):
+        """Merges the components of two people."""
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        size_a, size_b = self.sizes.get(a, 1), self.sizes.get(b, 1)
+        if size_a < size_b:
+            a, b = b, a
+        self.parents[b] = a
+        self.sizes[a] = size_a + size_b
+        self.sizes.pop(b, None)
+
+    def flatten(self):
+        """Points every person directly at the root of its component."""
+        people = self.parents
+        if not isinstance(people, dict):
+            people = range(len(people))
+        for person in people:
+            self.parents[person] = self.find(person)
+
+    def connected(self, a, b):
+        """Returns True if there is a path between two people."""
+        return self.find(a) == self.find(b)
+
+    def size(self, person):
+        """Returns the number of people in the component of a person."""
+        return self.sizes.get(self.find(person), 1)
+
+    def largest(self):
+        """Returns the root of the largest component, or None if empty."""
+        if self.sizes:
+            return max(self.sizes, key=self.sizes.get)
+
+        # Everyone is alone, and every person is its own root
+        return next(iter(self.parents), None)
+
+
+class GraphStats():
+    """
+    Counts and histograms of a graph, from `survey`.
+
+    Histograms map the smallest value of each power-of-two bucket (0, 1,
+    2, 4, 8, ...) to the number of values that fall into it.
+    """
+
+    def __init__(self, components):
+        self.components = components
+        self.num_people = 0
+        self.num_movies = 0
+
+        # Person-movie pairs, and co-star pairs counted once per movie
+        self.num_stars = 0
+        self.num_pairs = 0
+
+        self.movies_per_person = Counter()
+        self.stars_per_movie = Counter()
+        self.component_sizes = Counter()
+
+        # Filled in by `add_eccentricity` for a sample of people
+        self.eccentricities = []
+        self.reached = Counter()
+
+    @property
+    def num_components(self):
+        return sum(self.component_sizes.values())
+
+    def add_eccentricity(self, distances):
+        """
+        Records the distances from one sampled person to every person
+        reached by a breadth-first search from it.
+        """
+        eccentricity = 0
+        for distance in distances:
+            self.reached[distance] += 1
+            eccentricity = max(eccentricity, distance)
+        self.eccentricities.append(eccentricity)
+
+    def report(self):
+        """Returns the statistics as a printable string."""
+        lines = [
+            f"People: {self.num_people}",
+            f"Movies: {self.num_movies}",
+            f"Person-movie edges: {self.num_stars}",
+            f"Co-star pairs (counted per movie): {self.num_pairs}",
+            "Movies per person:",
+            *format_histogram(self.movies_per_person),
+            "Stars per movie:",
+            *format_histogram(self.stars_per_movie),
+            f"Connected components: {self.num_components}",
+        ]
+        if self.num_people:
+            root = self.components.largest()
+            largest = self.components.size(root)
+            lines.append(
+                f"Largest component: {largest} people "
+                f"({largest / self.num_people:.1%})"
+            )
+        lines.append("Component sizes:")
+        lines.extend(format_histogram(self.component_sizes))
+
+        if self.eccentricities:
+            samples = len(self.eccentricities)
+            lines.append(
+                f"Eccentricity of {samples} sampled people: "
+                f"min {min(self.eccentricities)}, "
+                f"mean {sum(self.eccentricities) / samples:.2f}, "
+                f"max {max(self.eccentricities)}"
+            )
+            lines.append("Mean people reached within each distance:")
+            within = 0
+            for distance in sorted(self.reached):
+                within += self.reached[distance]
+                lines.append(f"  {distance:>6}  {within / samples:>14.1f}")
+        return "\n".join(lines)
+
+
+def survey(people, casts, components):
+    """
+    Gathers the `GraphStats` of a graph in a single pass over `people`, an
+    iterable of (person, number of movies) pairs, and over `casts`, an
+    iterable of the stars of each movie, merging co-stars in `components`.
+    """
+    stats = GraphStats(components)
+    for person, num_movies in people:
+        stats.num_people += 1
+        stats.movies_per_person[bucket(num_movies)] += 1
+
+    for stars in casts:
+        stats.num_movies += 1
+        count = 0
+        first = None
+        for person in stars:
+            count += 1
+            if first is None:
+                first = person
+            else:
+                components.union(first, person)
+        stats.num_stars += count
+        stats.num_pairs += count * (count - 1) // 2
+        stats.stars_per_movie[bucket(count)] += 1
+
+    components.flatten()
+    isolated = stats.num_people - sum(components.sizes.values())
+    stats.component_sizes[bucket(1)] += isolated
+    for size in components.sizes.values():
+        stats.component_sizes[bucket(size)] += 1
+    return stats
+
+
+def bucket(value):
+    """Returns the smallest value of the power-of-two bucket of `value`."""
+    return 0 if value <= 0 else 1 << (value.bit_length() - 1)
+
+
+def format_histogram(histogram):
+    """Returns the lines of a bucketed histogram, in order of bucket."""
+    lines = []
+    for low in sorted(histogram):
+        high = max(low, 2 * low - 1)
+        label = str(low) if low == high else f"{low}-{high}"
+        lines.append(f"  {label:>15}  {histogram[low]:>10}")
+    return lines
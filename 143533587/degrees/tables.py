@@ -0,0 +1,81 @@
+import bisect
+from array import array
+
+
+class StringTable():
+    """
+    A sequence of strings packed into one UTF-8 buffer with an array of
+    offsets, which takes a fraction of the memory of a list of `str`s.
+    """
+
+    def __init__(self, data=None, offsets=None):
+        self.data = bytearray() if data is None else data
+        self.offsets = array("q", [0]) if offsets is None else offsets
+
+    def append(self, string):
+        self.data += string.encode("utf-8")
+        self.offsets.append(len(self.data))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+class SortedIndex():
+    """
+    Finds the positions of strings in a `StringTable` by binary search over
+    an array of positions sorted by `key` of each string.
+    """
+
+    def __init__(self, table, order=None, key=None):
+        self.table = table
+        self.key = key
+        if order is None:
+            order = array("i", sorted(range(len(table)), key=self._key))
+        self.order = order
+
+    def _key(self, i):
+        string = self.table[i]
+        return string if self.key is None else self.key(string)
+
+    def find_all(self, string):
+        """
+        Returns the positions of every string whose key equals that of
+        `string`.
+        """
+        key = string if self.key is None else self.key(string)
+        lo = bisect.bisect_left(self.order, key, key=self._key)
+        hi = bisect.bisect_right(self.order, key, lo=lo, key=self._key)
+        return list(self.order[lo:hi])
+
+    def find(self, string):
+        """
+        Returns the position of `string`, or None if it is not in the table.
+        """
+        positions = self.find_all(string)
+        return positions[0] if positions else None
+
+
+def build_csr(count, sources, targets):
+    """
+    Returns the offsets and targets arrays of a CSR adjacency structure for
+    `count` nodes, given parallel arrays of edge sources and targets.
+    """
+    offsets = array("q", bytes(8 * (count + 1)))
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+
+    adjacency = array("i", bytes(4 * len(targets)))
+    fill = offsets[:-1]
+    for source, target in zip(sources, targets):
+        adjacency[fill[source]] = target
+        fill[source] += 1
+    return offsets, adjacency
@@ -0,0 +1,269 @@
+import io
+import itertools
+import json
+import struct
+
+import pytest
+
+import batch
+import degrees
+from benchmark import generate_dataset
+from distances import SourceTable, SourceTableCache
+from graph import load_graph
+from lookup import NameIndex
+from snapshot import load_snapshot, read_snapshot, snapshot_path, source_key
+from util import Node, DequeStackFrontier, DequeQueueFrontier
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    generate_dataset(str(tmp_path), 300, 120, seed=1)
+    degrees.load_data(str(tmp_path))
+    return tmp_path
+
+
+def is_valid(path, source, target):
+    person_id = source
+    for movie_id, next_id in path:
+        if person_id not in degrees.movies[movie_id]["stars"]:
+            return False
+        if next_id not in degrees.movies[movie_id]["stars"]:
+            return False
+        person_id = next_id
+    return person_id == target
+
+
+def test_same_person(dataset):
+    assert degrees.shortest_path("0", "0") == []
+    assert degrees.shortest_path("0", "0", bidirectional=True) == []
+
+
+def test_bidirectional_matches_breadth_first(dataset):
+    people = sorted(degrees.people)[:25]
+    for source, target in itertools.product(people, repeat=2):
+        expected = degrees.shortest_path(source, target)
+        path = degrees.shortest_path(source, target, bidirectional=True)
+        if expected is None:
+            assert path is None
+        else:
+            assert len(path) == len(expected)
+            assert is_valid(path, source, target)
+
+
+def test_compact_graph_matches_dicts(dataset):
+    people = sorted(degrees.people)[:25]
+    pairs = list(itertools.product(people, repeat=2))
+    expected = [degrees.shortest_path(*pair) for pair in pairs]
+    names = dict(degrees.names)
+    stars = {
+        movie_id: movie["stars"] for movie_id, movie in degrees.movies.items()
+    }
+
+    degrees.load_data(str(dataset), compact=True)
+    assert dict(degrees.names) == names
+    assert {
+        movie_id: movie["stars"] for movie_id, movie in degrees.movies.items()
+    } == stars
+    for (source, target), path in zip(pairs, expected):
+        for bidirectional in (False, True):
+            found = degrees.shortest_path(source, target, bidirectional)
+            if path is None:
+                assert found is None
+            else:
+                assert len(found) == len(path)
+                assert is_valid(found, source, target)
+
+
+def test_snapshot(dataset):
+    degrees.load_data(str(dataset), compact=True)
+    expected = dict(degrees.people)
+    graph = load_snapshot(str(dataset), load_graph)
+    assert read_snapshot(snapshot_path(str(dataset)), source_key(str(dataset)))
+
+    degrees.load_data(str(dataset), snapshot=True)
+    assert degrees.graph is not graph
+    assert dict(degrees.people) == expected
+    assert degrees.shortest_path("0", "0") == []
+
+    # Changing a CSV file makes the snapshot stale
+    with open(dataset / "people.csv", "a", encoding="utf-8") as f:
+        f.write("new,New Person,2000\n")
+    assert read_snapshot(
+        snapshot_path(str(dataset)), source_key(str(dataset))
+    ) is None
+    degrees.load_data(str(dataset), snapshot=True)
+    assert degrees.people["new"]["name"] == "New Person"
+    assert degrees.names["new person"] == {"new"}
+
+
+@pytest.mark.parametrize("damage", ["magic", "length", "header", "sections"])
+def test_damaged_snapshot(dataset, damage):
+    graph = load_snapshot(str(dataset), load_graph)
+    path = snapshot_path(str(dataset))
+    with open(path, "rb") as f:
+        contents = f.read()
+    (length,) = struct.unpack("<Q", contents[8:16])
+    if damage == "magic":
+        contents = contents[:5]
+    elif damage == "length":
+        contents = contents[:12]
+    elif damage == "header":
+        contents = contents[:16] + b"{" * length + contents[16 + length:]
+    else:
+        contents = contents[:16 + length + 8]
+    with open(path, "wb") as f:
+        f.write(contents)
+    key = source_key(str(dataset))
+    assert read_snapshot(path, key) is None
+
+    # Loading falls back to the CSV files and writes a good snapshot again
+    rebuilt = load_snapshot(str(dataset), load_graph)
+    assert rebuilt.num_people == graph.num_people
+    assert read_snapshot(path, key) is not None
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_source_tables(dataset, compact):
+    degrees.load_data(str(dataset), compact=compact)
+    people = sorted(degrees.people)[:25]
+    expected = {
+        (source, target): degrees.shortest_path(source, target)
+        for source, target in itertools.product(people, repeat=2)
+    }
+
+    degrees.index_source(people[0])
+    assert people[0] in degrees.source_tables
+    for (source, target), path in expected.items():
+        found = degrees.shortest_path(source, target, index=True)
+        if path is None:
+            assert found is None
+        else:
+            assert len(found) == len(path)
+            assert is_valid(found, source, target)
+    assert len(degrees.source_tables) == degrees.source_tables.max_tables
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_survey_graph(dataset, compact):
+    expected = {
+        person_id: degrees.shortest_path("0", person_id)
+        for person_id in degrees.people
+    }
+    degrees.load_data(str(dataset), compact=compact)
+    stats = degrees.survey_graph(sample=3)
+    assert stats.num_people == 300
+    assert stats.num_movies == 120
+    assert stats.num_stars == sum(
+        len(movie["stars"]) for movie in degrees.movies.values()
+    )
+    assert sum(stats.movies_per_person.values()) == 300
+    assert len(stats.eccentricities) == 3
+    assert "Connected components" in stats.report()
+
+    # Unconnected pairs are now rejected without searching
+    assert degrees.components is not None
+    for person_id, path in expected.items():
+        assert (degrees.shortest_path("0", person_id) is None) == (path is None)
+    assert any(path is None for path in expected.values())
+
+
+def test_repeated_ids_keep_last_row(tmp_path):
+    (tmp_path / "people.csv").write_text(
+        "id,name,birth\n1,Ann,1950\n2,Bob,1960\n1,Anne,1951\n"
+    )
+    (tmp_path / "movies.csv").write_text(
+        "id,title,year\n10,Old,1990\n10,New,1991\n"
+    )
+    (tmp_path / "stars.csv").write_text(
+        "person_id,movie_id\n1,10\n2,10\n"
+    )
+    loaded = []
+    for compact in [False, True]:
+        degrees.load_data(str(tmp_path), compact=compact)
+        person, movie = degrees.people["1"], degrees.movies["10"]
+        loaded.append((
+            list(degrees.people), person["name"], person["birth"],
+            set(person["movies"]), movie["title"], movie["year"],
+            set(movie["stars"]), degrees.shortest_path("1", "2")
+        ))
+    assert loaded[0] == loaded[1]
+    assert loaded[1][:3] == (["1", "2"], "Anne", "1951")
+    assert loaded[1][4:6] == ("New", "1991")
+
+
+@pytest.mark.parametrize("snapshot", [False, True])
+@pytest.mark.parametrize("compact", [False, True])
+def test_unknown_person(dataset, compact, snapshot):
+    degrees.load_data(str(dataset), compact=compact, snapshot=snapshot)
+    for bidirectional, index in itertools.product([False, True], repeat=2):
+        for source, target in [("missing", "0"), ("0", "missing")]:
+            assert degrees.shortest_path(
+                source, target, bidirectional=bidirectional, index=index
+            ) is None
+    degrees.survey_graph()
+    assert degrees.shortest_path("missing", "0") is None
+
+
+def test_source_table_cache_evicts_least_recently_used():
+    cache = SourceTableCache(max_tables=2)
+    for source in "abc":
+        cache.put(source, SourceTable(source))
+        cache.get("a")
+    assert "a" in cache and "b" not in cache and "c" in cache
+
+    cache = SourceTableCache(max_bytes=SourceTable("a").nbytes)
+    cache.put("a", SourceTable("a"))
+    cache.put("b", SourceTable("b"))
+    assert len(cache) == 1 and "b" in cache
+
+
+def test_name_index():
+    index = NameIndex.build(
+        ["Kevin Bacon", "Kevin Costner", "Kevin Bacon", "Tom Hanks",
+         "Tom Cruise", "Emma Watson"]
+    )
+    assert len(index.names) == 5
+    assert index.prefix("kev") == ["kevin bacon", "kevin costner"]
+    assert index.search("Kevin Bacon")[0] == (2, "kevin bacon")
+    assert index.search("tom ")[0][1] in ("tom cruise", "tom hanks")
+    assert index.search("kevn bacon")[0][1] == "kevin bacon"
+    assert index.search("Ema Watsno")[0][1] == "emma watson"
+    assert index.search("hanks tom")[0][1] == "tom hanks"
+    assert index.search("nobody at all") == []
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_find_people(dataset, compact, monkeypatch):
+    degrees.load_data(str(dataset), compact=compact)
+    assert degrees.find_people("Person 12")[0] == ("12", 2)
+    assert degrees.find_people("Pesron 12")[0][0] == "12"
+    assert batch.resolve_person("Pesron 12") == "12"
+
+    monkeypatch.setattr("builtins.input", lambda prompt: "12")
+    assert degrees.person_id_for_name("Persn 12") == "12"
+
+
+def test_deque_frontiers():
+    stack, queue = DequeStackFrontier(), DequeQueueFrontier()
+    for frontier in (stack, queue):
+        for state in ("a", "b", "a"):
+            frontier.add(Node(state=state, parent=None, action=None))
+    assert [stack.remove().state for _ in range(3)] == ["a", "b", "a"]
+    assert queue.remove().state == "a"
+    assert queue.contains_state("a")
+    assert [queue.remove().state for _ in range(2)] == ["b", "a"]
+    assert not queue.contains_state("a")
+    with pytest.raises(Exception):
+        queue.remove()
+
+
+def test_batch(dataset):
+    lines = ["# comment\n", "0,0\n", "Person 0,Person 1\n", "Nobody,0\n", "1\n"]
+    output = io.StringIO()
+    batch.answer_stream(lines, output, {"bidirectional": True})
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert len(results) == 4
+    assert results[0]["degrees"] == 0 and results[0]["path"] == []
+    assert results[1]["source"] == "0" and results[1]["target"] == "1"
+    assert results[1]["degrees"] == len(degrees.shortest_path("0", "1"))
+    assert "error" in results[2] and "error" in results[3]
@@ -0,0 +1,199 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from elimination import EliminationPlan, family_shape
+from heredity import PROBS, enumerate_probabilities, load_data
+
+# Per process caches: `EliminationPlan`s by family shape, and results by
+# (engine, shape, traits), which are the same for every family that
+# matches on all three
+plans = {}
+results = {}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Infer gene and trait probabilities for every family "
+                    "CSV file in a directory."
+    )
+    parser.add_argument("directory")
+    parser.add_argument(
+        "--output", default="-", metavar="FILE",
+        help="where to write the results (default: stdout)"
+    )
+    parser.add_argument(
+        "--format", choices=["json", "csv"], default=None,
+        help="JSON lines, one per family, or CSV rows, one per person "
+             "(default: from the output file name, else JSON)"
+    )
+    parser.add_argument(
+        "--engine", choices=["eliminate", "enumerate", "vectorize", "gibbs",
+                             "weighting"],
+        default="eliminate"
+    )
+    parser.add_argument(
+        "--samples", type=int, default=100000,
+        help="samples per family, for the sampling engines"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="processes to share the families between (default: one per "
+             "CPU; 0 to run in this process)"
+    )
+    args = parser.parse_args()
+
+    output_format = args.format
+    if output_format is None:
+        output_format = "csv" if args.output.endswith(".csv") else "json"
+    options = {"engine": args.engine, "samples": args.samples}
+    if args.output == "-":
+        count = run(args.directory, sys.stdout, output_format, options,
+                    args.workers)
+    else:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            count = run(args.directory, f, output_format, options,
+                        args.workers)
+    print(f"Processed {count} families", file=sys.stderr)
+
+
+def run(directory, output, output_format="json", options=None,
+        workers=None, chunksize=16):
+    """
+    Infers the probabilities for every .csv family file in `directory`, in
+    name order, with `infer` and keyword arguments `options`, and writes
+    them to `output` as they are ready. Returns the number of families.
+
+    Files are shared between a pool of `workers` processes (by default one
+    per CPU; with 0, all run in this process), `chunksize` at a time, so
+    that each process reuses its cached plans over many families.
+    """
+    paths = [
+        os.path.join(directory, name)
+        for name in sorted(os.listdir(directory)) if name.endswith(".csv")
+    ]
+    jobs = ((path, options or {}) for path in paths)
+    if workers == 0:
+        pool = None
+        answers = map(infer_job, jobs)
+    else:
+        pool = multiprocessing.Pool(workers)
+        answers = pool.imap(infer_job, jobs, chunksize)
+
+    writer = None
+    if output_format == "csv":
+        writer = csv.writer(output)
+        writer.writerow([
+            "family", "person", "gene_2", "gene_1", "gene_0", "trait",
+            "error"
+        ])
+    try:
+        for answer in answers:
+            if writer is None:
+                output.write(json.dumps(answer) + "\n")
+            else:
+                write_rows(writer, answer)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return len(paths)
+
+
+def write_rows(writer, answer):
+    """
+    Writes a CSV row for each person in an answer of `infer`, or a row
+    with the error if there is one.
+    """
+    if "error" in answer:
+        writer.writerow([answer["family"]] + [""] * 5 + [answer["error"]])
+        return
+    for person, probabilities in answer["people"].items():
+        gene = probabilities["gene"]
+        writer.writerow([
+            answer["family"], person,
+            gene["2"], gene["1"], gene["0"], probabilities["trait"]["true"],
+            ""
+        ])
+
+
+def infer_job(job):
+    """Calls `infer` with a (path, options) pair."""
+    path, options = job
+    return infer(path, **options)
+
+
+def infer(path, engine="eliminate", samples=100000):
+    """
+    Infers the probabilities of a family file with `engine` (as for
+    `heredity.py --engine`), and returns a dictionary that can be written
+    as JSON, with the family's file name, the probabilities of each person
+    (by copies as strings, and "true" and "false" for traits), and how
+    long it took, or an error.
+    """
+    start = time.perf_counter()
+    answer = {"family": os.path.basename(path)}
+    try:
+        people = load_data(path)
+        names = list(people)
+        shape = family_shape(people, names)
+    except (OSError, csv.Error, KeyError, ValueError) as e:
+        answer["error"] = f"{type(e).__name__}: {e}"
+        answer["seconds"] = time.perf_counter() - start
+        return answer
+
+    # Exact results only depend on the shape and traits, not on names
+    key = (engine, shape, tuple(people[name]["trait"] for name in names))
+    if key in results:
+        by_number = results[key]
+    else:
+        probabilities = probabilities_for(people, names, shape, engine,
+                                          samples)
+        by_number = [probabilities[name] for name in names]
+        if engine not in ("gibbs", "weighting"):
+            results[key] = by_number
+
+    answer["people"] = {
+        name: {
+            "gene": {
+                str(copies): p
+                for copies, p in by_number[i]["gene"].items()
+            },
+            "trait": {
+                "true": by_number[i]["trait"][True],
+                "false": by_number[i]["trait"][False],
+            },
+        }
+        for i, name in enumerate(names)
+    }
+    answer["seconds"] = time.perf_counter() - start
+    return answer
+
+
+def probabilities_for(people, names, shape, engine, samples):
+    """
+    Returns the probabilities of a family with `engine`, reusing the
+    `EliminationPlan` of its shape for elimination.
+    """
+    if engine == "eliminate":
+        if shape not in plans:
+            plans[shape] = EliminationPlan(shape)
+        return plans[shape].probabilities(people, names, PROBS)
+    if engine == "enumerate":
+        return enumerate_probabilities(people)
+    if engine == "vectorize":
+        from vectorized import vectorized_probabilities
+        return vectorized_probabilities(people)
+    from sampling import sample_probabilities
+    probabilities, report = sample_probabilities(
+        people, engine, samples, workers=0
+    )
+    return probabilities
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import random
+import time
+
+from elimination import eliminate_probabilities
+from heredity import PROBS, enumerate_probabilities
+from vectorized import vectorized_probabilities
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark heredity inference on random families."
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=list(range(5, 13))
+    )
+    parser.add_argument(
+        "--enumerate-limit", type=int, default=9,
+        help="largest family to run enumerate_probabilities on"
+    )
+    parser.add_argument(
+        "--known", type=float, default=0.5,
+        help="fraction of people whose trait is known"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"  {'people':>7}{'method':>12}{'seconds':>10}{'max error':>12}")
+    for size in args.sizes:
+        people = random_family(size, args.known, args.seed)
+        reference = eliminate_probabilities(people, PROBS)
+        methods = [
+            ("eliminate", lambda: eliminate_probabilities(people, PROBS)),
+            ("vectorize", lambda: vectorized_probabilities(people)),
+        ]
+        if size <= args.enumerate_limit:
+            methods.append(
+                ("enumerate", lambda: enumerate_probabilities(people))
+            )
+        for name, method in methods:
+            start = time.perf_counter()
+            probabilities = method()
+            seconds = time.perf_counter() - start
+            error = max(
+                abs(probabilities[person][field][value] - p)
+                for person in people
+                for field in reference[person]
+                for value, p in reference[person][field].items()
+            )
+            print(f"  {size:>7}{name:>12}{seconds:>10.3f}{error:>12.2e}")
+
+
+def random_family(size, known=0.5, seed=0):
+    """
+    Returns a `load_data` dictionary of `size` people, in which each
+    person after the first two is a child of a random earlier couple with
+    probability 2/3 (and otherwise has no parents in the family), and
+    each trait is known with probability `known`.
+    """
+    generator = random.Random(seed)
+    people = {}
+    for i in range(size):
+        mother = father = None
+        if i >= 2 and generator.random() < 2 / 3:
+            mother, father = generator.sample(sorted(people), 2)
+        trait = None
+        if generator.random() < known:
+            trait = generator.random() < 0.3
+        people[str(i)] = {
+            "name": str(i), "mother": mother, "father": father,
+            "trait": trait
+        }
+    return people
+
+
+if __name__ == "__main__":
+    main()
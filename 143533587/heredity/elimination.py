@@ -0,0 +1,377 @@
+import heapq
+import itertools
+
+GENES = (0, 1, 2)
+
+
+class Factor():
+    """
+    A function of some gene variables, stored as a table mapping every
+    assignment of `variables` (a tuple of copies of the gene, in order)
+    to a non-negative number.
+    """
+
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = table
+
+    @classmethod
+    def build(cls, variables, function):
+        """
+        Builds the factor of `variables` whose value at each assignment is
+        `function(*assignment)`.
+        """
+        return cls(variables, {
+            assignment: function(*assignment)
+            for assignment in itertools.product(GENES, repeat=len(variables))
+        })
+
+    def multiply(self, other):
+        """Returns the product of this factor and another."""
+        variables = self.variables + tuple(
+            v for v in other.variables if v not in self.variables
+        )
+        left = [variables.index(v) for v in self.variables]
+        right = [variables.index(v) for v in other.variables]
+        return Factor.build(variables, lambda *assignment: (
+            self.table[tuple(assignment[i] for i in left)]
+            * other.table[tuple(assignment[i] for i in right)]
+        ))
+
+    def sum_out(self, variable):
+        """Returns this factor with `variable` summed out."""
+        i = self.variables.index(variable)
+        table = {}
+        for assignment, value in self.table.items():
+            rest = assignment[:i] + assignment[i + 1:]
+            table[rest] = table.get(rest, 0) + value
+        return Factor(self.variables[:i] + self.variables[i + 1:], table)
+
+    def project(self, variables):
+        """
+        Returns this factor with every variable not in `variables` summed
+        out.
+        """
+        factor = self
+        for variable in self.variables:
+            if variable not in variables:
+                factor = factor.sum_out(variable)
+        return factor
+
+    def scaled(self):
+        """
+        Returns this factor divided by the sum of its values, so that long
+        products of factors do not underflow.
+        """
+        total = sum(self.table.values())
+        return Factor(self.variables, {
+            assignment: value / total
+            for assignment, value in self.table.items()
+        })
+
+
+def product(factors, variables=()):
+    """
+    Returns the product of `factors`, or the factor of `variables` that is
+    1 everywhere if there are none.
+    """
+    result = Factor.build(variables, lambda *assignment: 1)
+    for factor in factors:
+        result = result.multiply(factor)
+    return result
+
+
+def passing(copies, probs):
+    """
+    Returns the probability that a parent with `copies` of the gene
+    passes the gene on to a child.
+    """
+    mutation = probs["mutation"]
+    if copies == 2:
+        return 1 - mutation
+    if copies == 1:
+        return 0.5
+    return mutation
+
+
+def inheritance(copies, mother, father, probs):
+    """
+    Returns the probability of a child having `copies` of the gene given
+    the copies of its mother and father (None for an unknown parent,
+    who passes the gene on only by mutation).
+    """
+    from_mother = passing(mother or 0, probs)
+    from_father = passing(father or 0, probs)
+    if copies == 2:
+        return from_mother * from_father
+    if copies == 1:
+        return (from_mother * (1 - from_father)
+                + (1 - from_mother) * from_father)
+    return (1 - from_mother) * (1 - from_father)
+
+
+def person_factor(people, person, probs):
+    """
+    Returns the factor of a person's gene given their parents' genes,
+    times the probability of their trait if it is known.
+    """
+    mother = people[person]["mother"]
+    father = people[person]["father"]
+    trait = people[person]["trait"]
+    parents = tuple(p for p in (mother, father) if p is not None)
+
+    def value(copies, *genes):
+        known = dict(zip(parents, genes))
+        if parents:
+            p = inheritance(copies, known.get(mother), known.get(father),
+                            probs)
+        else:
+            p = probs["gene"][copies]
+        if trait is not None:
+            p *= probs["trait"][copies][trait]
+        return p
+
+    # A parent listed twice is one variable
+    return Factor.build((person,) + tuple(dict.fromkeys(parents)), value)
+
+
+def elimination_order(scopes):
+    """
+    Returns an order to eliminate the variables of a list of factor
+    scopes in, greedily picking the variable whose elimination adds the
+    fewest new edges between its neighbours (then the fewest neighbours).
+
+    Scores are kept in a heap and only rechecked when they reach the top,
+    so finding the order does not take time quadratic in the variables.
+    """
+    neighbours = {}
+    for scope in scopes:
+        for v in scope:
+            neighbours.setdefault(v, set()).update(scope)
+    for v in neighbours:
+        neighbours[v].discard(v)
+
+    def score(v):
+        around = list(neighbours[v])
+        missing = sum(
+            1 for a, b in itertools.combinations(around, 2)
+            if b not in neighbours[a]
+        )
+        return missing, len(around), str(v)
+
+    heap = [(score(v), v) for v in neighbours]
+    heapq.heapify(heap)
+    order = []
+    while heap:
+        old, v = heapq.heappop(heap)
+        if v not in neighbours:
+            continue
+        new = score(v)
+        if new != old:
+            heapq.heappush(heap, (new, v))
+            continue
+        order.append(v)
+        around = neighbours.pop(v)
+        for a in around:
+            neighbours[a].discard(v)
+            neighbours[a].update(around - {a})
+    return order
+
+
+class Cluster():
+    """
+    A node of the cluster tree built while eliminating a variable: the
+    variables of the factors it combined, the numbers of the original
+    factors it absorbed, and its neighbours with the variables they
+    share.
+    """
+
+    def __init__(self, variable, scope, factors):
+        self.variable = variable
+        self.scope = scope
+        self.factors = factors
+        self.neighbours = []
+
+
+def cluster_tree(scopes, order):
+    """
+    Eliminates the variables of factors with `scopes` in `order`, returning
+    a list of `Cluster`s (one per variable, in order) connected into a
+    forest. Each cluster's message to its parent is the factor its
+    elimination made.
+    """
+    # Pool entries are (factor scope, original factor number or None, the
+    # cluster whose message it is, or None), by number: the original
+    # factors first, then one message per cluster. `waiting` holds the
+    # numbers of the entries with each variable.
+    pool = {}
+    waiting = {}
+    for key, scope in enumerate(scopes):
+        pool[key] = (set(scope), key, None)
+        for v in scope:
+            waiting.setdefault(v, []).append(key)
+
+    clusters = []
+    for variable in order:
+        used = [pool.pop(key) for key in waiting.pop(variable, ())
+                if key in pool]
+        scope = set().union(*(entry[0] for entry in used)) | {variable}
+        cluster = Cluster(
+            variable, tuple(sorted(scope, key=str)),
+            [f for s, f, child in used if f is not None]
+        )
+        for s, f, child in used:
+            if child is not None:
+                cluster.neighbours.append(child)
+                child.neighbours.append(cluster)
+        clusters.append(cluster)
+
+        key = len(scopes) + len(clusters)
+        pool[key] = (scope - {variable}, None, cluster)
+        for v in pool[key][0]:
+            waiting[v].append(key)
+    return clusters
+
+
+def calibrate(clusters, factors):
+    """
+    Runs sum-product message passing over a cluster forest, whose clusters
+    absorb the given `factors`, in both directions and returns the belief
+    of every cluster: the joint of its scope and the evidence, up to a
+    constant factor (messages are scaled to sum to 1).
+    """
+    messages = {}
+
+    def message(source, target):
+        if (source, target) not in messages:
+            absorbed = [factors[key] for key in source.factors]
+            for other in source.neighbours:
+                if other is not target:
+                    absorbed.append(message(other, source))
+            shared = set(source.scope) & set(target.scope)
+            messages[source, target] = product(
+                absorbed, source.scope
+            ).project(shared).scaled()
+        return messages[source, target]
+
+    # Elimination order puts every cluster after the children whose
+    # messages it consumed, so compute upward messages first (avoiding
+    # deep recursion) and then downward messages in reverse.
+    position = {cluster: i for i, cluster in enumerate(clusters)}
+    for cluster in clusters:
+        for other in cluster.neighbours:
+            if position[other] > position[cluster]:
+                message(cluster, other)
+    for cluster in reversed(clusters):
+        for other in cluster.neighbours:
+            if position[other] < position[cluster]:
+                message(cluster, other)
+
+    beliefs = {}
+    for cluster in clusters:
+        absorbed = [factors[key] for key in cluster.factors] + [
+            messages[other, cluster] for other in cluster.neighbours
+        ]
+        beliefs[cluster] = product(absorbed, cluster.scope)
+    return beliefs
+
+
+def family_shape(people, names):
+    """
+    Returns the shape of a family with people in the order of `names`: for
+    each person, the numbers of their distinct known parents. Families of
+    the same shape share an `EliminationPlan`, whatever their names and
+    traits.
+    """
+    number = {name: i for i, name in enumerate(names)}
+    return tuple(
+        tuple(dict.fromkeys(
+            number[parent]
+            for parent in (people[name]["mother"], people[name]["father"])
+            if parent is not None
+        ))
+        for name in names
+    )
+
+
+class EliminationPlan():
+    """
+    The elimination order and cluster tree of a family shape (as returned
+    by `family_shape`), which only depend on who is whose parent, so that
+    they can be worked out once for many families of the same shape.
+    """
+
+    def __init__(self, shape):
+        self.shape = shape
+        scopes = [(person,) + parents for person, parents in enumerate(shape)]
+        self.order = elimination_order(scopes)
+        self.clusters = cluster_tree(scopes, self.order)
+
+        # The tables of person factors, by (parents, trait), as parents
+        # count the same whoever they are
+        self.tables = {}
+
+    def factors(self, people, names, probs):
+        """
+        Returns the factor of each person of a family with this shape, over
+        the numbers of the people.
+        """
+        factors = []
+        for person, name in enumerate(names):
+            parents = self.shape[person]
+            mother = people[name]["mother"]
+            father = people[name]["father"]
+            trait = people[name]["trait"]
+            key = (len(parents), mother is None, father is None, trait)
+            if key not in self.tables:
+                numbered = {
+                    "mother": parents[0] if mother is not None else None,
+                    "father": parents[-1] if father is not None else None,
+                    "trait": trait,
+                }
+                self.tables[key] = person_factor(
+                    {person: numbered}, person, probs
+                ).table
+            factors.append(Factor((person,) + parents, self.tables[key]))
+        return factors
+
+    def probabilities(self, people, names, probs):
+        """
+        Returns the probability distributions of the gene and trait of each
+        person of a family with this shape, with people in the order of
+        `names`, given the known traits.
+        """
+        beliefs = calibrate(self.clusters, self.factors(people, names, probs))
+        probabilities = {}
+        for cluster in self.clusters:
+            gene = beliefs[cluster].project({cluster.variable}).table
+            total = sum(gene.values())
+            gene = {copies: gene[(copies,)] / total for copies in (2, 1, 0)}
+            trait = people[names[cluster.variable]]["trait"]
+            if trait is None:
+                have = sum(
+                    gene[copies] * probs["trait"][copies][True]
+                    for copies in gene
+                )
+            else:
+                have = 1 if trait else 0
+            probabilities[names[cluster.variable]] = {
+                "gene": gene,
+                "trait": {True: have, False: 1 - have},
+            }
+        return {name: probabilities[name] for name in names}
+
+
+def eliminate_probabilities(people, probs):
+    """
+    Returns the probability distributions of the gene and trait of each
+    person given the known traits, in the same shape as `heredity.main`
+    builds, by variable elimination over the family's gene factors.
+
+    Each person contributes one factor over their gene and their parents'
+    genes, so the work grows linearly with the number of people for
+    family trees, instead of exponentially as in enumeration.
+    """
+    names = list(people)
+    plan = EliminationPlan(family_shape(people, names))
+    return plan.probabilities(people, names, probs)
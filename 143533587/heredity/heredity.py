@@ -1,6 +1,8 @@
+import argparse
 import csv
 import itertools
-import sys
+
+from elimination import GENES, eliminate_probabilities, inheritance
 
 PROBS = {
 
@@ -38,60 +40,174 @@ PROBS = {
 
 
 def main():
+    parser = argparse.ArgumentParser(
+        description="Infer gene and trait probabilities for a family."
+    )
+    parser.add_argument("data", metavar="data.csv")
+    parser.add_argument(
+        "--engine", choices=["enumerate", "vectorize", "eliminate", "gibbs",
+                             "weighting"],
+        default="enumerate",
+        help="enumerate every assignment of genes and traits, one at a time "
+             "or many at once with NumPy; use variable elimination (fast "
+             "for large families); or estimate by Gibbs sampling or "
+             "likelihood weighting"
+    )
+    parser.add_argument(
+        "--samples", type=int, default=100000,
+        help="samples to draw, for the sampling engines"
+    )
+    parser.add_argument("--chains", type=int, default=4)
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="processes to run the chains in (default: one per CPU)"
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    people = load_data(args.data)
+
+    report = None
+    if args.engine == "eliminate":
+        probabilities = eliminate_probabilities(people, PROBS)
+    elif args.engine == "vectorize":
+        from vectorized import vectorized_probabilities
+        probabilities = vectorized_probabilities(people)
+    elif args.engine in ("gibbs", "weighting"):
+        from sampling import sample_probabilities
+        probabilities, report = sample_probabilities(
+            people, args.engine, args.samples, args.chains, args.workers,
+            args.seed
+        )
+    else:
+        probabilities = enumerate_probabilities(people)
 
-    # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+    if report is not None:
+        print(report.report())
+
+
+def enumerate_probabilities(people):
+    """
+    Returns the probability distributions of the gene and trait of each
+    person given the known traits, by summing the joint probability of
+    every assignment of genes and traits.
+
+    Assignments are enumerated lazily as bitmasks over the people (bit i
+    for the i-th person), and only traits that are not known are varied.
+    The probability of each person's part of an assignment is looked up
+    in tables made once by `person_tables`.
+    """
+    names = list(people)
+    genes, traits = person_tables(people, names)
+    everyone = range(len(names))
+    known = sum(1 << i for i in everyone if people[names[i]]["trait"])
+    unknown = [i for i in everyone if people[names[i]]["trait"] is None]
+
+    # Sums of the joint probabilities by person and value
+    gene_totals = [[0, 0, 0] for _ in everyone]
+    trait_totals = [[0, 0] for _ in everyone]
+
+    # A missing parent is numbered len(names), and has no copies
+    copies = [0] * (len(names) + 1)
+    for one_gene, two_genes in gene_masks(len(names)):
+        for i in everyone:
+            copies[i] = 2 if two_genes >> i & 1 else one_gene >> i & 1
+        p_genes = 1
+        for i in everyone:
+            mother, father, table = genes[i]
+            p_genes *= table[copies[i]][copies[mother]][copies[father]]
+
+        for have_trait in submasks(sum(1 << i for i in unknown)):
+            p = p_genes
+            for i in unknown:
+                p *= traits[copies[i]][have_trait >> i & 1]
+            have_trait |= known
+            for i in everyone:
+                gene_totals[i][copies[i]] += p
+                trait_totals[i][have_trait >> i & 1] += p
 
-    # Keep track of gene and trait probabilities for each person
     probabilities = {
-        person: {
-            "gene": {
-                2: 0,
-                1: 0,
-                0: 0
-            },
-            "trait": {
-                True: 0,
-                False: 0
-            }
+        name: {
+            "gene": {c: gene_totals[i][c] for c in (2, 1, 0)},
+            "trait": {True: trait_totals[i][1], False: trait_totals[i][0]},
         }
-        for person in people
+        for i, name in enumerate(names)
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
+    # Ensure probabilities sum to 1
+    normalize(probabilities)
+    return probabilities
 
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
 
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
+def person_tables(people, names):
+    """
+    Returns the probabilities of each person's part of an assignment, for
+    the people in the order of `names`, as a pair:
+
+    * for each person, (mother number, father number, table), where
+      table[copies][mother copies][father copies] is the probability of
+      the person's copies of the gene given their parents', times the
+      probability of their trait if it is known, and a missing parent is
+      numbered len(names);
+    * a table of the probability of a trait (True as 1) given copies of
+      the gene, for the people whose trait is not known.
+    """
+    number = {name: i for i, name in enumerate(names)}
+    missing = len(names)
+    genes = []
+    for name in names:
+        mother, father = people[name]["mother"], people[name]["father"]
+        trait = people[name]["trait"]
+        table = [[[0] * 3 for _ in GENES] for _ in GENES]
+        for copies, mother_copies, father_copies in itertools.product(
+            GENES, repeat=3
+        ):
+            if mother is None and father is None:
+                p = PROBS["gene"][copies]
+            else:
+                # A missing parent passes the gene only by mutation
+                p = inheritance(copies, mother_copies, father_copies, PROBS)
+            if trait is not None:
+                p *= PROBS["trait"][copies][trait]
+            table[copies][mother_copies][father_copies] = p
+        genes.append((number.get(mother, missing), number.get(father, missing),
+                      table))
+    traits = [
+        [PROBS["trait"][copies][False], PROBS["trait"][copies][True]]
+        for copies in GENES
+    ]
+    return genes, traits
+
 
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+def gene_masks(n):
+    """
+    Yields every pair of bitmasks (one_gene, two_genes) of `n` people that
+    have no person in common.
+    """
+    everyone = (1 << n) - 1
+    for one_gene in range(1 << n):
+        yield from ((one_gene, two_genes)
+                    for two_genes in submasks(everyone & ~one_gene))
 
-    # Ensure probabilities sum to 1
-    normalize(probabilities)
 
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+def submasks(mask):
+    """
+    Yields every bitmask whose bits are a subset of the bits of `mask`,
+    from `mask` itself down to 0.
+    """
+    subset = mask
+    while True:
+        yield subset
+        if subset == 0:
+            return
+        subset = (subset - 1) & mask
 
 
 def load_data(filename):
@@ -118,14 +234,15 @@ def load_data(filename):
 
 def powerset(s):
     """
-    Return a list of all possible subsets of set s.
+    Return an iterator over all possible subsets of set s, made one at a
+    time as they are needed.
     """
     s = list(s)
-    return [
+    return (
         set(s) for s in itertools.chain.from_iterable(
             itertools.combinations(s, r) for r in range(len(s) + 1)
         )
-    ]
+    )
 
 def joint_probability(people, one_gene, two_genes, have_trait):
     """
@@ -0,0 +1,424 @@
+import itertools
+import math
+import multiprocessing
+
+import numpy as np
+
+from vectorized import log_tables
+
+SAMPLES = 100000
+CHAINS = 4
+BATCH = 4096
+LANES = 16
+SWEEP_BATCHES = 20
+
+
+class ConvergenceReport():
+    """
+    How well the chains of `sample_probabilities` agree: for each person,
+    the potential scale reduction factor (R-hat) of the indicators of
+    their copies of the gene, taking the worst of the three, and the
+    number of samples the chains were worth together (for likelihood
+    weighting, the effective number given the spread of the weights; for
+    Gibbs sampling, given how alike successive sweeps are).
+
+    R-hat compares the spread between the chains' estimates with the
+    spread within them, and is close to 1 once they agree.
+    """
+
+    def __init__(self, names, r_hat, effective_samples):
+        self.names = names
+        self.r_hat = r_hat
+        self.effective_samples = effective_samples
+
+    @property
+    def worst(self):
+        """The person with the largest R-hat, or None for no people."""
+        return max(self.names, key=self.r_hat.get, default=None)
+
+    def converged(self, threshold=1.01):
+        """Returns True if every R-hat is at most `threshold`."""
+        return all(r <= threshold for r in self.r_hat.values())
+
+    def report(self, count=10):
+        """
+        Returns a table of the `count` people with the largest R-hat.
+        """
+        lines = [f"Effective samples: {self.effective_samples:.0f}"]
+        lines.append(f"{'person':>20}{'R-hat':>10}")
+        for name in sorted(self.names, key=self.r_hat.get,
+                           reverse=True)[:count]:
+            lines.append(f"{name:>20}{self.r_hat[name]:>10.4f}")
+        return "\n".join(lines)
+
+
+def sample_probabilities(people, method="gibbs", samples=SAMPLES,
+                         chains=CHAINS, workers=None, seed=None):
+    """
+    Estimates the probability distributions of the gene and trait of each
+    person given the known traits, in the shape `enumerate_probabilities`
+    returns, from `samples` samples split between `chains` independent
+    chains. Returns the estimates and a `ConvergenceReport`.
+
+    `method` is "gibbs" for `gibbs_chains` or "weighting" for
+    `weighting_chains`. The chains are split between a pool of `workers`
+    processes (by default one per CPU; with 0, all run in this process).
+    Results are repeatable for a given `seed` and number of workers.
+    """
+    if method not in ("gibbs", "weighting"):
+        raise ValueError(f"unknown sampling method: {method}")
+    run = gibbs_chains if method == "gibbs" else weighting_chains
+    names = list(people)
+    seed = np.random.SeedSequence(seed).entropy
+
+    if workers == 0:
+        results = run(people, names, samples // chains, chains, (seed, 0))
+    else:
+        workers = min(workers or multiprocessing.cpu_count(), chains)
+        jobs = [
+            (people, names, samples // chains,
+             chains // workers + (job < chains % workers), (seed, job))
+            for job in range(workers)
+        ]
+        with multiprocessing.Pool(workers) as pool:
+            results = [
+                chain for chains in pool.starmap(run, jobs)
+                for chain in chains
+            ]
+    return combine_chains(names, results)
+
+
+def combine_chains(names, results):
+    """
+    Combines the sums of each chain, as returned by `weighting_chains` and
+    `gibbs_chains`, into estimates and a `ConvergenceReport`.
+
+    Each chain returns (log scale, weight, squared weight, gene weights,
+    trait weights): its total weight, and the total squared weight, both
+    times exp(-log scale); the weight of each person having each number of
+    copies as an array with a row per person; and the expected weight of
+    each person having the trait.
+    """
+    scale = max(chain[0] for chain in results)
+    factors = [math.exp(chain[0] - scale) for chain in results]
+    total = sum(f * chain[1] for f, chain in zip(factors, results))
+    genes = sum(f * chain[3] for f, chain in zip(factors, results)) / total
+    traits = sum(f * chain[4] for f, chain in zip(factors, results)) / total
+
+    # R-hat of each indicator from the means and effective sizes of chains
+    effective = np.array([
+        chain[1] ** 2 / chain[2] if chain[2] else 0 for chain in results
+    ])
+    means = np.array([
+        chain[3] / chain[1] for chain in results if chain[1]
+    ])
+    r_hat = potential_scale_reduction(means, effective[effective > 0])
+
+    genes, traits, r_hat = genes.tolist(), traits.tolist(), r_hat.tolist()
+    probabilities = {
+        name: {
+            "gene": {copies: genes[i][copies] for copies in (2, 1, 0)},
+            "trait": {True: traits[i], False: 1 - traits[i]},
+        }
+        for i, name in enumerate(names)
+    }
+    return probabilities, ConvergenceReport(
+        names, dict(zip(names, r_hat)), float(effective.sum())
+    )
+
+
+def potential_scale_reduction(means, sizes):
+    """
+    Returns the R-hat of each person, the largest over their numbers of
+    copies, from the chains' means of the indicators of each (an array of
+    chain, person, copies) and the chains' numbers of samples. R-hat is
+    NaN where there are too few chains or samples to tell.
+    """
+    chains = len(means)
+    if chains < 2 or sizes.min() < 2:
+        return np.full(means.shape[1] if chains else 0, np.nan)
+    n = sizes.min()
+    between = n * means.var(axis=0, ddof=1)
+    within = (means * (1 - means)).mean(axis=0) * n / (n - 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r_hat = np.sqrt(((n - 1) / n * within + between / n) / within)
+    r_hat[(within == 0) & (between == 0)] = 1
+    r_hat[(within == 0) & (between > 0)] = np.inf
+    return r_hat.max(axis=1)
+
+
+def family_order(people, names):
+    """
+    Returns the numbers of the people of `names` ordered so that everyone
+    comes after their parents.
+    """
+    number = {name: i for i, name in enumerate(names)}
+    children = [[] for _ in names]
+    waiting = [0] * len(names)
+    for i, name in enumerate(names):
+        for parent in {people[name]["mother"], people[name]["father"]}:
+            if parent is not None:
+                children[number[parent]].append(i)
+                waiting[i] += 1
+    order = [i for i in range(len(names)) if waiting[i] == 0]
+    for i in order:
+        for child in children[i]:
+            waiting[child] -= 1
+            if waiting[child] == 0:
+                order.append(child)
+    if len(order) != len(names):
+        raise ValueError("a person is their own ancestor")
+    return order
+
+
+class ForwardSampler():
+    """
+    Draws genes parents first, each given the person's parents and their
+    own trait if it is known, for many samples at once. Every sample is
+    weighted by the probability of the known traits given the parents,
+    which makes the weighted samples those of likelihood weighting.
+    """
+
+    def __init__(self, people, names):
+        self.n = len(names)
+        self.mothers, self.fathers, self.logs, self.have_trait = log_tables(
+            people, names
+        )
+        self.order = family_order(people, names)
+
+        # table[person, copies, parents' copies (mother * 3 + father)]
+        table = np.exp(self.logs).reshape(self.n, 3, 9)
+        weights = table.sum(axis=1)
+        with np.errstate(divide="ignore"):
+            self.log_weights = np.log(weights)
+        cumulative = table.cumsum(axis=1) / weights[:, None, :]
+        self.first, self.second = cumulative[:, 0], cumulative[:, 1]
+
+    def draw(self, generator, copies):
+        """
+        Fills the rows of `copies` (a row per person, plus a row of zeros
+        for missing parents, and a column per sample) with new genes, and
+        returns the log weight of each sample.
+        """
+        log_weights = np.zeros(copies.shape[1])
+        for i in self.order:
+            parents = copies[self.mothers[i]] * 3 + copies[self.fathers[i]]
+            u = generator.random(copies.shape[1])
+            copies[i] = ((u >= self.first[i, parents]).astype(np.int8)
+                         + (u >= self.second[i, parents]))
+            log_weights += self.log_weights[i, parents]
+        return log_weights
+
+
+def weighting_chains(people, names, samples, chains, seed):
+    """
+    Runs `chains` likelihood weighting chains of `samples` samples each,
+    drawn `BATCH` at a time, and returns their sums for `combine_chains`.
+    """
+    generator = np.random.default_rng(seed)
+    sampler = ForwardSampler(people, names)
+    n = sampler.n
+    results = []
+    for _ in range(chains):
+        scale, total, squares = -np.inf, 0.0, 0.0
+        genes, traits = np.zeros((n, 3)), np.zeros(n)
+        for start in range(0, samples, BATCH):
+            copies = np.zeros((n + 1, min(BATCH, samples - start)), np.int8)
+            log_weights = sampler.draw(generator, copies)
+
+            # Keep the sums relative to the largest weight so far
+            largest = log_weights.max()
+            if largest > scale:
+                factor = math.exp(scale - largest)
+                total *= factor
+                squares *= factor ** 2
+                genes *= factor
+                traits *= factor
+                scale = largest
+            weights = np.exp(log_weights - scale)
+            total += weights.sum()
+            squares += (weights ** 2).sum()
+            add_weights(genes, traits, weights, copies[:n],
+                        sampler.have_trait)
+        results.append((scale, total, squares, genes, traits))
+    return results
+
+
+def add_weights(genes, traits, weights, copies, have_trait):
+    """
+    Adds the `weights` of the samples `copies` (a row per person, and a
+    column per sample) to the weight of each person having each number of
+    copies and to their expected weight of having the trait.
+    """
+    for value in range(3):
+        genes[:, value] += (copies == value) @ weights
+    rows = np.arange(len(copies))[:, None]
+    traits += have_trait[rows, copies] @ weights
+
+
+def gibbs_chains(people, names, samples, chains, seed, burn_in=None,
+                 lanes=LANES, batches=SWEEP_BATCHES):
+    """
+    Runs `chains` Gibbs sampling chains side by side, and returns their
+    sums for `combine_chains`, each sample weighing 1. Each chain's squared
+    weight is that of independent samples as many as its effective number
+    of samples, from `batch_means_size` over `batches` batches of sweeps.
+
+    Each chain is made of `lanes` independent walkers, each starting from
+    a forward draw, which take enough sweeps together for `samples`
+    samples after `burn_in` sweeps (by default a tenth as many). A sweep
+    redraws every person's gene given the genes of their parents, their
+    children and their children's other parents, and their own trait if
+    it is known. People who are none of these to each other are redrawn
+    together, one `colour_groups` group at a time.
+    """
+    generator = np.random.default_rng(seed)
+    sampler = ForwardSampler(people, names)
+    n, mothers, fathers = sampler.n, sampler.mothers, sampler.fathers
+    sweeps = -(-samples // lanes)
+    if burn_in is None:
+        burn_in = sweeps // 10
+
+    # A column per walker, the walkers of each chain next to each other
+    walkers = chains * lanes
+    copies = np.zeros((n + 1, walkers), np.int8)
+    sampler.draw(generator, copies)
+    tables = np.exp(sampler.logs)
+    groups = [
+        group_arrays(group, mothers, fathers, tables)
+        for group in colour_groups(mothers, fathers, n)
+    ]
+
+    genes, traits = np.zeros((n, 3, walkers)), np.zeros((n, walkers))
+    rows = np.arange(n)[:, None]
+
+    # The gene sums of each chain at the end of each batch of sweeps
+    batches = max(1, min(batches, sweeps))
+    ends = np.zeros((batches, n, 3, chains))
+    for sweep in range(burn_in + sweeps):
+        for (group, table, parents, starts, children, child_table,
+             is_mother, is_father) in groups:
+            # Probability of each copies of each person in the group, up
+            # to a factor, as the product of their own table and those of
+            # their children
+            own = copies[mothers[group]] * 3 + copies[fathers[group]]
+            child_copies = copies[children] * 9
+            child_mothers = copies[mothers[children]] * 3
+            child_fathers = copies[fathers[children]]
+            p = []
+            for value in range(3):
+                p.append(np.take_along_axis(table, value * 9 + own, 1))
+                if len(children):
+                    entries = child_copies + np.where(
+                        is_mother, value * 3, child_mothers
+                    ) + np.where(is_father, value, child_fathers)
+                    p[value][parents] *= np.multiply.reduceat(
+                        np.take_along_axis(child_table, entries, 1), starts,
+                        axis=0
+                    )
+
+            first, second = p[0], p[0] + p[1]
+            u = generator.random(own.shape) * (second + p[2])
+            copies[group] = (u >= first).astype(np.int8) + (u >= second)
+        if sweep >= burn_in:
+            for value in range(3):
+                genes[:, value] += copies[:n] == value
+            traits += sampler.have_trait[rows, copies[:n]]
+            done = sweep - burn_in + 1
+            batch = done * batches // sweeps
+            if batch > (done - 1) * batches // sweeps:
+                ends[batch - 1] = genes.reshape(n, 3, chains, lanes).sum(3)
+
+    # Sum each chain's walkers
+    genes = genes.reshape(n, 3, chains, lanes).sum(axis=3)
+    traits = traits.reshape(n, chains, lanes).sum(axis=2)
+    samples = sweeps * lanes
+    sizes = np.diff((np.arange(batches + 1) * sweeps) // batches) * lanes
+    means = np.diff(ends, axis=0, prepend=0) / sizes[:, None, None, None]
+    results = []
+    for chain in range(chains):
+        effective = batch_means_size(means[..., chain], samples)
+        results.append((
+            0.0, samples, samples ** 2 / effective, genes[:, :, chain],
+            traits[:, chain]
+        ))
+    return results
+
+
+def batch_means_size(means, samples):
+    """
+    Returns the effective number of samples of a chain of `samples`
+    samples, from the means of the indicators of each person's copies over
+    each of its batches of successive samples (an array of batch, person,
+    copies), or just `samples` if there are too few batches to tell.
+
+    The more alike successive samples are, the more the batch means
+    spread: the chain is worth as many independent samples as would give
+    its overall means the variance the spread of the batch means implies,
+    taken over all the indicators together, and at most `samples`.
+    """
+    batches = len(means)
+    if batches < 2:
+        return samples
+    p = means.mean(axis=0)
+    spread = means.var(axis=0, ddof=1).sum()
+    if spread == 0:
+        return samples
+    return min(samples, batches * (p * (1 - p)).sum() / spread)
+
+
+def colour_groups(mothers, fathers, n):
+    """
+    Returns the numbers of the `n` people split into arrays of people who
+    are not each other's parent, child or co-parent, so that each group's
+    genes are independent of each other given everyone else's.
+    """
+    neighbours = [set() for _ in range(n)]
+    for child in range(n):
+        parents = {int(mothers[child]), int(fathers[child])} - {n}
+        for parent in parents:
+            neighbours[child].add(parent)
+            neighbours[parent].add(child)
+            neighbours[parent].update(parents - {parent})
+
+    colours = []
+    for person in range(n):
+        taken = {colours[other] for other in neighbours[person]
+                 if other < person}
+        colours.append(next(c for c in itertools.count() if c not in taken))
+    groups = {}
+    for person, colour in enumerate(colours):
+        groups.setdefault(colour, []).append(person)
+    return [np.array(group) for colour, group in sorted(groups.items())]
+
+
+def group_arrays(group, mothers, fathers, tables):
+    """
+    Returns the arrays `gibbs_chains` uses to redraw a group of people:
+
+    * the group, and the gene tables of its people, flattened as by
+      `log_tables`;
+    * the positions in the group of the people with children, and for
+      each of them where their children start in the following arrays;
+    * for each (person with children, child) pair, in order of the
+      person's position, the child, the child's flattened table, and
+      whether the person is the child's mother and whether they are its
+      father (both for a parent listed twice).
+    """
+    position = {int(person): i for i, person in enumerate(group)}
+    pairs = []
+    for child in range(len(mothers)):
+        for parent in {int(mothers[child]), int(fathers[child])}:
+            if parent in position:
+                pairs.append((position[parent], child,
+                              parent == mothers[child],
+                              parent == fathers[child]))
+    pairs.sort()
+    local = np.array([pair[0] for pair in pairs], dtype=int)
+    children = np.array([pair[1] for pair in pairs], dtype=int)
+    parents, starts = np.unique(local, return_index=True)
+    return (
+        group, tables[group], parents, starts, children, tables[children],
+        np.array([pair[2] for pair in pairs], dtype=bool)[:, None],
+        np.array([pair[3] for pair in pairs], dtype=bool)[:, None],
+    )
@@ -0,0 +1,258 @@
+import csv
+import json
+
+import numpy as np
+import pytest
+
+import batch
+from benchmark import random_family
+from elimination import (
+    EliminationPlan, cluster_tree, eliminate_probabilities, elimination_order,
+    family_shape, person_factor
+)
+from heredity import (
+    PROBS, enumerate_probabilities, gene_masks, joint_probability, load_data,
+    normalize, powerset, submasks, update
+)
+from sampling import (
+    batch_means_size, colour_groups, sample_probabilities
+)
+from vectorized import log_tables, vectorized_probabilities
+
+
+def family(*rows):
+    """Builds a `load_data` dictionary from (name, mother, father, trait)."""
+    return {
+        name: {"name": name, "mother": mother, "father": father,
+               "trait": trait}
+        for name, mother, father, trait in rows
+    }
+
+
+FAMILIES = [
+    # The three-person family of the distribution code
+    family(("Harry", "Lily", "James", None), ("James", None, None, True),
+           ("Lily", None, None, False)),
+    # Two generations sharing grandparents, with unknown traits
+    family(("A", None, None, True), ("B", None, None, None),
+           ("C", "A", "B", None), ("D", "A", "B", False),
+           ("E", None, None, None), ("F", "C", "E", True)),
+    # A single known parent, and a parent listed twice
+    family(("M", None, None, True), ("K", "M", None, None),
+           ("L", "K", "K", None)),
+]
+
+
+def assert_same(probabilities, expected):
+    assert probabilities.keys() == expected.keys()
+    for person in expected:
+        for field in expected[person]:
+            assert list(probabilities[person][field]) == \
+                list(expected[person][field])
+            for value, p in expected[person][field].items():
+                assert probabilities[person][field][value] == \
+                    pytest.approx(p, abs=1e-9)
+
+
+def sum_joint_probabilities(people):
+    """The distribution code's loop over every subset of people."""
+    probabilities = {
+        person: {"gene": {2: 0, 1: 0, 0: 0}, "trait": {True: 0, False: 0}}
+        for person in people
+    }
+    names = set(people)
+    for have_trait in powerset(names):
+        if any(people[person]["trait"] is not None and
+               people[person]["trait"] != (person in have_trait)
+               for person in names):
+            continue
+        for one_gene in powerset(names):
+            for two_genes in powerset(names - one_gene):
+                p = joint_probability(people, one_gene, two_genes, have_trait)
+                update(probabilities, one_gene, two_genes, have_trait, p)
+    normalize(probabilities)
+    return probabilities
+
+
+def test_masks():
+    assert sorted(submasks(0b1010)) == [0b0000, 0b0010, 0b1000, 0b1010]
+    pairs = list(gene_masks(4))
+    assert len(pairs) == len(set(pairs)) == 3 ** 4
+    assert all(one & two == 0 for one, two in pairs)
+
+
+@pytest.mark.parametrize("people", FAMILIES)
+def test_enumerate_matches_joint_probability(people):
+    assert_same(enumerate_probabilities(people),
+                sum_joint_probabilities(people))
+
+
+@pytest.mark.parametrize("people", FAMILIES)
+def test_eliminate_matches_enumerate(people):
+    assert_same(eliminate_probabilities(people, PROBS),
+                enumerate_probabilities(people))
+
+
+@pytest.mark.parametrize("people", FAMILIES + [random_family(8, seed=1)])
+def test_vectorized_matches_enumerate(people):
+    expected = enumerate_probabilities(people)
+    assert_same(vectorized_probabilities(people), expected)
+    assert_same(vectorized_probabilities(people, chunk_size=7), expected)
+
+
+@pytest.mark.parametrize("method", ["gibbs", "weighting"])
+@pytest.mark.parametrize("workers", [0, 2])
+def test_sample_probabilities(method, workers):
+    people = random_family(20, seed=3)
+    expected = eliminate_probabilities(people, PROBS)
+    probabilities, report = sample_probabilities(
+        people, method, 40000, chains=4, workers=workers, seed=0
+    )
+    assert probabilities.keys() == expected.keys()
+    for person in people:
+        for field in expected[person]:
+            for value, p in expected[person][field].items():
+                assert probabilities[person][field][value] == \
+                    pytest.approx(p, abs=0.03)
+    assert report.converged(1.05)
+    assert 1000 < report.effective_samples <= 40000
+    assert report.worst in people
+
+    # The same seed gives the same estimates
+    again, _ = sample_probabilities(
+        people, method, 40000, chains=4, workers=workers, seed=0
+    )
+    assert again == probabilities
+
+
+def test_batch_means_size():
+    # Batch means as spread as independent batches of 100 samples
+    rng = np.random.default_rng(0)
+    p = np.array([[0.2, 0.3, 0.5]])
+    means = rng.multinomial(100, p[0], size=(400, 1)) / 100
+    assert batch_means_size(means, 40000) == pytest.approx(40000, rel=0.15)
+
+    # Ten times the spread is worth a tenth of the samples
+    spread = p + (means - p) * 10 ** 0.5
+    assert batch_means_size(spread, 40000) == pytest.approx(4000, rel=0.15)
+
+    assert batch_means_size(np.tile(p, (5, 1, 1)), 40000) == 40000
+    assert batch_means_size(means[:1], 40000) == 40000
+
+
+def test_colour_groups():
+    people = random_family(40, seed=4)
+    names = list(people)
+    mothers, fathers, logs, have_trait = log_tables(people, names)
+    groups = colour_groups(mothers, fathers, len(names))
+    assert sorted(p for group in groups for p in group) == list(range(40))
+    for group in groups:
+        members = set(group.tolist())
+        for child in range(40):
+            family = {child, int(mothers[child]), int(fathers[child])} - {40}
+            assert len(family & members) <= 1
+
+
+def test_load_data(tmp_path):
+    path = tmp_path / "family.csv"
+    path.write_text("name,mother,father,trait\n"
+                    "Harry,Lily,James,\nJames,,,1\nLily,,,0\n")
+    people = load_data(str(path))
+    assert people == FAMILIES[0]
+    assert_same(eliminate_probabilities(people, PROBS),
+                enumerate_probabilities(people))
+
+
+def test_eliminate_large_family():
+    # A 200-generation line of couples, each with two children
+    rows = [("0a", None, None, True), ("0b", None, None, None)]
+    for generation in range(1, 200):
+        mother, father = f"{generation - 1}a", f"{generation - 1}b"
+        rows.append((f"{generation}a", mother, father, None))
+        rows.append((f"{generation}b", None, None, generation % 7 == 0))
+        rows.append((f"{generation}c", mother, father, generation % 3 == 0))
+    people = family(*rows)
+
+    probabilities = eliminate_probabilities(people, PROBS)
+    for person in people:
+        assert sum(probabilities[person]["gene"].values()) == \
+            pytest.approx(1)
+
+    # The elimination order keeps every cluster small on a family tree
+    factors = [person_factor(people, person, PROBS) for person in people]
+    order = elimination_order([f.variables for f in factors])
+    assert sorted(order) == sorted(people)
+    scopes = [f.variables for f in factors]
+    assert max(len(c.scope) for c in cluster_tree(scopes, order)) <= 3
+
+
+def write_family(path, people):
+    with open(path, "w", newline="") as f:
+        f.write("name,mother,father,trait\n")
+        for name, person in people.items():
+            trait = {True: "1", False: "0", None: ""}[person["trait"]]
+            f.write(f"{name},{person['mother'] or ''},"
+                    f"{person['father'] or ''},{trait}\n")
+
+
+def test_plan_is_shared_by_shape():
+    people = random_family(6, seed=5)
+    names = list(people)
+    plan = EliminationPlan(family_shape(people, names))
+
+    # The same shape under other names and traits
+    renamed = {f"x{name}": dict(person, name=f"x{name}") for name, person
+               in people.items()}
+    for person in renamed.values():
+        for parent in ("mother", "father"):
+            if person[parent] is not None:
+                person[parent] = f"x{person[parent]}"
+        person["trait"] = None if person["trait"] else True
+    assert family_shape(renamed, list(renamed)) == plan.shape
+    for family in (people, renamed):
+        assert_same(plan.probabilities(family, list(family), PROBS),
+                    enumerate_probabilities(family))
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_batch(tmp_path, workers):
+    families = [FAMILIES[0], random_family(8, seed=6), FAMILIES[0]]
+    for i, people in enumerate(families):
+        write_family(tmp_path / f"{i}.csv", people)
+    (tmp_path / "bad.csv").write_text("name,mother,father,trait\nA,B,C,\n")
+    (tmp_path / "notes.txt").write_text("not a family")
+
+    batch.plans.clear()
+    batch.results.clear()
+    lines = tmp_path / "out.json"
+    with open(lines, "w") as f:
+        assert batch.run(str(tmp_path), f, "json", workers=workers) == 4
+    answers = [json.loads(line) for line in lines.read_text().splitlines()]
+    assert [a["family"] for a in answers] == ["0.csv", "1.csv", "2.csv",
+                                              "bad.csv"]
+    assert "KeyError" in answers[3]["error"]
+    for answer, people in zip(answers, families):
+        expected = eliminate_probabilities(people, PROBS)
+        for person, probabilities in answer["people"].items():
+            for copies in (0, 1, 2):
+                assert probabilities["gene"][str(copies)] == pytest.approx(
+                    expected[person]["gene"][copies]
+                )
+            assert probabilities["trait"]["true"] == pytest.approx(
+                expected[person]["trait"][True]
+            )
+    assert answers[2]["people"] == answers[0]["people"]
+    if workers == 0:
+        assert len(batch.plans) == 2
+
+    table = tmp_path / "out.csv"
+    with open(table, "w", newline="") as f:
+        batch.run(str(tmp_path), f, "csv", workers=workers)
+    with open(table, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 3 + 8 + 3 + 1
+    assert rows[0]["family"] == "0.csv"
+    assert float(rows[0]["gene_1"]) == pytest.approx(
+        answers[0]["people"][rows[0]["person"]]["gene"]["1"]
+    )
+    assert rows[-1]["error"]
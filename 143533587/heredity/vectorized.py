@@ -0,0 +1,123 @@
+import numpy as np
+
+from heredity import person_tables
+
+CHUNK = 1 << 16
+
+
+def copies_array(n, start, stop):
+    """
+    Returns the copies of the gene of `n` people in the gene assignments
+    numbered `start` to `stop` - 1, as an array with a row per assignment
+    and a column per person. Assignment numbers are read in base 3, the
+    i-th digit being the copies of the i-th person.
+    """
+    numbers = np.arange(start, stop, dtype=np.int64)
+    return (numbers[:, None] // 3 ** np.arange(n, dtype=np.int64)) % 3
+
+
+def log_tables(people, names):
+    """
+    Returns the tables of `person_tables` as arrays for
+    `joint_log_probabilities`: the mother and father numbers of each
+    person, the log of each person's gene table flattened to 27 entries
+    (copies, mother copies, father copies), and the probability of each
+    person having the trait given their copies (1 or 0 if known).
+    """
+    genes, traits = person_tables(people, names)
+    mothers = np.array([mother for mother, father, table in genes], dtype=int)
+    fathers = np.array([father for mother, father, table in genes], dtype=int)
+    with np.errstate(divide="ignore"):
+        logs = np.log(np.array([table for mother, father, table in genes],
+                               dtype=float).reshape(len(names), 27))
+    have_trait = np.array([
+        [traits[copies][1] if people[name]["trait"] is None
+         else float(people[name]["trait"]) for copies in range(3)]
+        for name in names
+    ])
+    return mothers, fathers, logs, have_trait
+
+
+def joint_log_probabilities(tables, copies):
+    """
+    Returns the log of the joint probability of each row of `copies` (as
+    made by `copies_array`) and the known traits, using the arrays of
+    `log_tables`. The traits that are not known are summed over.
+    """
+    mothers, fathers, logs, have_trait = tables
+    n = copies.shape[1]
+
+    # A missing parent is numbered n, and has no copies
+    padded = np.zeros((len(copies), n + 1), dtype=copies.dtype)
+    padded[:, :n] = copies
+    entries = copies * 9 + padded[:, mothers] * 3 + padded[:, fathers]
+    return logs[np.arange(n), entries].sum(axis=1)
+
+
+def vectorized_probabilities(people, chunk_size=CHUNK):
+    """
+    Returns the same probability distributions as `enumerate_probabilities`
+    by computing the joint probabilities of `chunk_size` gene assignments
+    at a time with NumPy.
+
+    Joint probabilities are summed in log space, relative to the largest
+    seen so far, so that large families do not underflow. Rather than
+    enumerating the traits that are not known, each gene assignment
+    contributes the probability of each such trait given its genes.
+    """
+    names = list(people)
+    n = len(names)
+    tables = log_tables(people, names)
+    have_trait = tables[3]
+
+    # Sums of the joint probabilities, times exp(-shift)
+    shift = -np.inf
+    total = 0.0
+    gene_totals = np.zeros((n, 3))
+    trait_totals = np.zeros(n)
+
+    for start in range(0, 3 ** n, chunk_size):
+        copies = copies_array(n, start, min(start + chunk_size, 3 ** n))
+        log_p = joint_log_probabilities(tables, copies)
+        largest = log_p.max()
+        if largest == -np.inf:
+            continue
+        if largest > shift:
+            scale = np.exp(shift - largest)
+            total *= scale
+            gene_totals *= scale
+            trait_totals *= scale
+            shift = largest
+        weights = np.exp(log_p - shift)
+        total += weights.sum()
+        update_totals(gene_totals, trait_totals, weights, copies, have_trait)
+
+    return normalize_totals(names, total, gene_totals, trait_totals)
+
+
+def update_totals(gene_totals, trait_totals, weights, copies, have_trait):
+    """
+    Adds the `weights` of the gene assignments `copies` to the sums of the
+    weights by person and copies, and of the weights times the probability
+    of each person having the trait.
+    """
+    n = copies.shape[1]
+    for value in range(3):
+        gene_totals[:, value] += weights @ (copies == value)
+    trait_totals += weights @ have_trait[np.arange(n), copies]
+
+
+def normalize_totals(names, total, gene_totals, trait_totals):
+    """
+    Returns the sums of `update_totals` divided by the total weight, as a
+    dictionary in the shape `enumerate_probabilities` returns.
+    """
+    genes = (gene_totals / total).tolist()
+    traits = (trait_totals / total).tolist()
+    return {
+        name: {
+            "gene": {copies: genes[i][copies] for copies in (2, 1, 0)},
+            "trait": {True: traits[i], False: 1 - traits[i]},
+        }
+        for i, name in enumerate(names)
+    }
@@ -0,0 +1,103 @@
+import argparse
+import random
+import time
+
+from logic import *
+from vectorized import vectorized_check
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark entailment checking on random knights and "
+                    "knaves puzzles."
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+",
+        default=[3, 5, 7, 9, 12, 50, 100, 200]
+    )
+    parser.add_argument(
+        "--model-check-limit", type=int, default=9,
+        help="largest puzzle to run model_check on"
+    )
+    parser.add_argument(
+        "--vectorize-limit", type=int, default=12,
+        help="largest puzzle to run vectorized_check on"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"  {'people':>7}{'method':>13}{'seconds':>10}{'entailed':>10}")
+    for size in args.sizes:
+        knowledge, symbols = random_puzzle(size, args.seed)
+        methods = [("dpll_check", one_at_a_time(dpll_check))]
+        if size <= args.model_check_limit:
+            methods.append(("model_check", one_at_a_time(model_check)))
+            methods.append(("check_many", check_many))
+        if size <= args.vectorize_limit:
+            methods.append(("vectorized", vectorized_check))
+        for name, check in methods:
+            start = time.perf_counter()
+            entailed = sum(check(knowledge, symbols))
+            seconds = time.perf_counter() - start
+            print(f"  {size:>7}{name:>13}{seconds:>10.3f}{entailed:>10}")
+
+
+def check_many(knowledge, queries):
+    """Checks a list of queries with `model_check_many`."""
+    entailed, models = model_check_many(knowledge, queries)
+    return entailed
+
+
+def one_at_a_time(check):
+    """
+    Returns a function that checks a list of queries with `check`, which
+    takes one query at a time.
+    """
+    return lambda knowledge, queries: [
+        check(knowledge, query) for query in queries
+    ]
+
+
+def random_puzzle(size, seed=0):
+    """
+    Returns the knowledge base of a puzzle of `size` people, each a knight
+    or a knave, who each say one thing about one or two others, and the
+    list of its symbols (a knight and a knave symbol per person).
+
+    The statements are made true or false to suit a hidden random choice
+    of knights and knaves, so the puzzle always has a solution.
+    """
+    generator = random.Random(seed)
+    knights = [Symbol(f"{i} is a Knight") for i in range(size)]
+    knaves = [Symbol(f"{i} is a Knave") for i in range(size)]
+    hidden = [generator.random() < 0.5 for i in range(size)]
+
+    knowledge = And()
+    for i in range(size):
+        knowledge.add(Or(knights[i], knaves[i]))
+        knowledge.add(Not(And(knights[i], knaves[i])))
+    for i in range(size):
+        others = [j for j in range(size) if j != i] or [i]
+        a, b = (generator.choice(others) for _ in range(2))
+        kind = generator.randrange(4)
+        if kind == 0:
+            statement = knaves[a]
+            true = not hidden[a]
+        elif kind == 1:
+            statement = Or(knights[a], knights[b])
+            true = hidden[a] or hidden[b]
+        elif kind == 2:
+            statement = And(knaves[a], knights[b])
+            true = not hidden[a] and hidden[b]
+        else:
+            statement = Biconditional(knights[a], knights[b])
+            true = hidden[a] == hidden[b]
+        if true != hidden[i]:
+            statement = Not(statement)
+        knowledge.add(Implication(knights[i], statement))
+        knowledge.add(Implication(knaves[i], Not(statement)))
+    return knowledge, knights + knaves
+
+
+if __name__ == "__main__":
+    main()
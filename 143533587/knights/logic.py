@@ -1,10 +1,35 @@
 import itertools
+import weakref
+
+# Sentences that cannot change, by class and parts, for as long as they are
+# in use, so that equal ones are made once and shared. Every part of a
+# sentence is one of these, so only an outermost And or Or can change
+interned = weakref.WeakValueDictionary()
 
 
 class Sentence():
 
-    def evaluate(self, model):
-        """Evaluates the logical sentence."""
+    # Every sentence has the names of its symbols, once they are asked
+    # for, its hash if it cannot change (else None), and whether it has
+    # been made more than once, and so may be part of several sentences
+    __slots__ = ("_symbols", "_hash", "_shared", "__weakref__")
+
+    def evaluate(self, model, memo=None):
+        """
+        Evaluates the logical sentence. Values of shared subsentences are
+        kept in `memo`, by id, so that they are evaluated once per model.
+        """
+        if memo is None:
+            memo = {}
+        if not self._shared:
+            return self.value(model, memo)
+        value = memo.get(id(self))
+        if value is None:
+            value = memo[id(self)] = self.value(model, memo)
+        return value
+
+    def value(self, model, memo):
+        """Evaluates the logical sentence, for `evaluate`."""
         raise Exception("nothing to evaluate")
 
     def formula(self):
@@ -13,7 +38,67 @@ class Sentence():
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(self.symbol_names())
+
+    def symbol_names(self):
+        """
+        Returns a frozenset of the names of all symbols in the logical
+        sentence, which is kept for next time.
+        """
+        if self._symbols is None:
+            parts = self.parts()
+            if len(parts) == 1:
+                self._symbols = parts[0].symbol_names()
+            else:
+                self._symbols = frozenset().union(
+                    *[part.symbol_names() for part in parts]
+                )
+        return self._symbols
+
+    def parts(self):
+        """Returns the sentences the logical sentence is made of."""
+        return ()
+
+    def frozen(self):
+        """
+        Makes the logical sentence unable to change, and returns it or an
+        equal sentence shared with all other equal sentences.
+        """
+        return self
+
+    def compile(self, symbols):
+        """
+        Returns a function evaluating the logical sentence in a model given
+        as an integer, in which bit i is the value of the i-th of `symbols`
+        (a sequence of symbol names).
+        """
+        bits = {name: 1 << i for i, name in enumerate(symbols)}
+        try:
+            return eval(f"lambda model: {self.expression(bits)}")
+        except (SyntaxError, RecursionError, MemoryError):
+
+            # Too deeply nested for Python to compile, so walk the tree
+            return lambda model: self.evaluate(
+                {name: model & bit != 0 for name, bit in bits.items()}
+            )
+
+    def expression(self, bits):
+        """
+        Returns a Python expression evaluating the logical sentence in an
+        integer `model`, with the bit of each symbol's name in `bits`.
+        """
+        raise Exception("nothing to compile")
+
+    @classmethod
+    def lookup(cls, key):
+        """
+        Returns the sentence interned under `key`, now marked as shared, or
+        None if there is none.
+        """
+        sentence = interned.get(key)
+        if sentence is not None:
+            sentence._shared = True
+        return sentence
 
     @classmethod
     def validate(cls, sentence):
@@ -43,20 +128,32 @@ class Sentence():
 
 
 class Symbol(Sentence):
-
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ("name",)
+
+    def __new__(cls, name):
+        symbol = Sentence.lookup((cls, name))
+        if symbol is None:
+            symbol = super().__new__(cls)
+            symbol.name = name
+            symbol._symbols = frozenset([name])
+            symbol._shared = False
+            symbol._hash = hash(("symbol", name))
+            interned[(cls, name)] = symbol
+        return symbol
+
+    def __getnewargs__(self):
+        return (self.name,)
 
     def __eq__(self, other):
         return isinstance(other, Symbol) and self.name == other.name
 
     def __hash__(self):
-        return hash(("symbol", self.name))
+        return self._hash
 
     def __repr__(self):
         return self.name
 
-    def evaluate(self, model):
+    def evaluate(self, model, memo=None):
         try:
             return bool(model[self.name])
         except KeyError:
@@ -65,44 +162,72 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def expression(self, bits):
+        try:
+            return f"(model & {bits[self.name]} != 0)"
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
 
 
 class Not(Sentence):
-    def __init__(self, operand):
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
         Sentence.validate(operand)
-        self.operand = operand
+        operand = operand.frozen()
+        sentence = Sentence.lookup((cls, operand))
+        if sentence is None:
+            sentence = super().__new__(cls)
+            sentence.operand = operand
+            sentence._symbols = None
+            sentence._shared = False
+            sentence._hash = hash(("not", hash(operand)))
+            interned[(cls, operand)] = sentence
+        return sentence
+
+    def __getnewargs__(self):
+        return (self.operand,)
 
     def __eq__(self, other):
         return isinstance(other, Not) and self.operand == other.operand
 
     def __hash__(self):
-        return hash(("not", hash(self.operand)))
+        return self._hash
 
     def __repr__(self):
         return f"Not({self.operand})"
 
-    def evaluate(self, model):
-        return not self.operand.evaluate(model)
+    def value(self, model, memo):
+        return not self.operand.evaluate(model, memo)
+
+    def parts(self):
+        return (self.operand,)
 
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def expression(self, bits):
+        return f"(not {self.operand.expression(bits)})"
 
 
 class And(Sentence):
+    __slots__ = ("conjuncts", "_frozen")
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
+        self.conjuncts = [conjunct.frozen() for conjunct in conjuncts]
+        self._symbols = None
+        self._frozen = False
+        self._shared = False
+        self._hash = None
 
     def __eq__(self, other):
         return isinstance(other, And) and self.conjuncts == other.conjuncts
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(
             ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
         )
@@ -114,11 +239,34 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
+        if self._frozen:
+            raise TypeError(
+                "cannot add to a sentence that is part of another sentence"
+            )
         Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
-
-    def evaluate(self, model):
-        return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
+        self.conjuncts.append(conjunct.frozen())
+        self._symbols = None
+
+    def frozen(self):
+        if self._frozen:
+            return self
+
+        # Frozen in place, so that the sentence it is now part of cannot
+        # be changed through it without an error; its parts already are
+        self._frozen = True
+        self._hash = hash(self)
+        key = (And, tuple(self.conjuncts))
+        sentence = Sentence.lookup(key)
+        if sentence is None:
+            sentence = interned[key] = self
+        return sentence
+
+    def value(self, model, memo):
+        return all(conjunct.evaluate(model, memo)
+                   for conjunct in self.conjuncts)
+
+    def parts(self):
+        return self.conjuncts
 
     def formula(self):
         if len(self.conjuncts) == 1:
@@ -126,20 +274,32 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def expression(self, bits):
+        if not self.conjuncts:
+            return "True"
+        return "(" + " and ".join(
+            [conjunct.expression(bits) for conjunct in self.conjuncts]
+        ) + ")"
 
 
 class Or(Sentence):
+    __slots__ = ("disjuncts", "_frozen")
+
     def __init__(self, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+        self.disjuncts = [disjunct.frozen() for disjunct in disjuncts]
+        self._symbols = None
+        self._frozen = False
+        self._shared = False
+        self._hash = None
 
     def __eq__(self, other):
         return isinstance(other, Or) and self.disjuncts == other.disjuncts
 
     def __hash__(self):
+        if self._hash is not None:
+            return self._hash
         return hash(
             ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
         )
@@ -148,8 +308,26 @@ class Or(Sentence):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
         return f"Or({disjuncts})"
 
-    def evaluate(self, model):
-        return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
+    def frozen(self):
+        if self._frozen:
+            return self
+
+        # Frozen in place, so that the sentence it is now part of cannot
+        # be changed through it without an error; its parts already are
+        self._frozen = True
+        self._hash = hash(self)
+        key = (Or, tuple(self.disjuncts))
+        sentence = Sentence.lookup(key)
+        if sentence is None:
+            sentence = interned[key] = self
+        return sentence
+
+    def value(self, model, memo):
+        return any(disjunct.evaluate(model, memo)
+                   for disjunct in self.disjuncts)
+
+    def parts(self):
+        return self.disjuncts
 
     def formula(self):
         if len(self.disjuncts) == 1:
@@ -157,16 +335,33 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def expression(self, bits):
+        if not self.disjuncts:
+            return "False"
+        return "(" + " or ".join(
+            [disjunct.expression(bits) for disjunct in self.disjuncts]
+        ) + ")"
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
+        key = (cls, antecedent.frozen(), consequent.frozen())
+        sentence = Sentence.lookup(key)
+        if sentence is None:
+            sentence = super().__new__(cls)
+            sentence.antecedent, sentence.consequent = key[1:]
+            sentence._symbols = None
+            sentence._shared = False
+            sentence._hash = hash(("implies", hash(key[1]), hash(key[2])))
+            interned[key] = sentence
+        return sentence
+
+    def __getnewargs__(self):
+        return (self.antecedent, self.consequent)
 
     def __eq__(self, other):
         return (isinstance(other, Implication)
@@ -174,30 +369,50 @@ class Implication(Sentence):
                 and self.consequent == other.consequent)
 
     def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        return self._hash
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
 
-    def evaluate(self, model):
-        return ((not self.antecedent.evaluate(model))
-                or self.consequent.evaluate(model))
+    def value(self, model, memo):
+        return ((not self.antecedent.evaluate(model, memo))
+                or self.consequent.evaluate(model, memo))
+
+    def parts(self):
+        return (self.antecedent, self.consequent)
 
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def expression(self, bits):
+        antecedent = self.antecedent.expression(bits)
+        consequent = self.consequent.expression(bits)
+        return f"(not {antecedent} or {consequent})"
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
+        key = (cls, left.frozen(), right.frozen())
+        sentence = Sentence.lookup(key)
+        if sentence is None:
+            sentence = super().__new__(cls)
+            sentence.left, sentence.right = key[1:]
+            sentence._symbols = None
+            sentence._shared = False
+            sentence._hash = hash(
+                ("biconditional", hash(key[1]), hash(key[2]))
+            )
+            interned[key] = sentence
+        return sentence
+
+    def __getnewargs__(self):
+        return (self.left, self.right)
 
     def __eq__(self, other):
         return (isinstance(other, Biconditional)
@@ -205,59 +420,355 @@ class Biconditional(Sentence):
                 and self.right == other.right)
 
     def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+        return self._hash
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
-    def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+    def value(self, model, memo):
+        return ((self.left.evaluate(model, memo)
+                 and self.right.evaluate(model, memo))
+                or (not self.left.evaluate(model, memo)
+                    and not self.right.evaluate(model, memo)))
+
+    def parts(self):
+        return (self.left, self.right)
 
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+    def expression(self, bits):
+        left = self.left.expression(bits)
+        right = self.right.expression(bits)
+        return f"({left} == {right})"
 
 
 def model_check(knowledge, query):
     """Checks if knowledge base entails query."""
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
+    # Get all symbols in both knowledge and query
+    symbols = sorted(knowledge.symbol_names() | query.symbol_names())
+
+    # Number each model by the bits of its symbols' values, and check query
+    # in each where knowledge base is true (compiled on its own, as putting
+    # it in another sentence would stop it being added to)
+    holds = knowledge.compile(symbols)
+    return all(map(
+        query.compile(symbols), filter(holds, range(1 << len(symbols)))
+    ))
+
+
+def model_check_many(knowledge, queries):
+    """
+    Checks if knowledge base entails each of `queries`, enumerating the
+    models once. Returns a list of whether each query is entailed, and the
+    set of models (of the symbols in knowledge base and queries) in which
+    knowledge base is true, each as a frozenset of the names of the symbols
+    true in it.
+    """
+    symbols = sorted(knowledge.symbol_names().union(
+        *[query.symbol_names() for query in queries]
+    ))
+
+    # Models are numbered by the bits of their symbols' values, as in
+    # model_check, and queries only checked in those of knowledge base
+    models = list(filter(
+        knowledge.compile(symbols), range(1 << len(symbols))
+    ))
+    entailed = [all(map(query.compile(symbols), models)) for query in queries]
+    return entailed, {
+        frozenset(name for i, name in enumerate(symbols) if model >> i & 1)
+        for model in models
+    }
+
+
+def to_cnf(sentence):
+    """
+    Returns a sentence equivalent to `sentence` in conjunctive normal form:
+    an And of Ors of symbols and negated symbols. Implications and
+    biconditionals are rewritten and Ors distributed over Ands, so the
+    result can be exponentially larger; `CNF` avoids that for solving.
+    """
+    clauses = []
+    for clause in cnf_clauses(sentence, True):
+        literals = list(dict.fromkeys(clause))
+        negated = {literal.operand for literal in literals
+                   if isinstance(literal, Not)}
+        if not negated.intersection(literals):
+            clauses.append(Or(*literals))
+    return And(*clauses)
+
+
+def cnf_clauses(sentence, positive):
+    """
+    Returns the clauses of `sentence` (of its negation if not `positive`)
+    in conjunctive normal form, as lists of symbols and negated symbols.
+    """
+    if isinstance(sentence, Symbol):
+        return [[sentence if positive else Not(sentence)]]
+    if isinstance(sentence, Not):
+        return cnf_clauses(sentence.operand, not positive)
+    if isinstance(sentence, Implication):
+        return cnf_clauses(
+            Or(Not(sentence.antecedent), sentence.consequent), positive
+        )
+    if isinstance(sentence, Biconditional):
+        return cnf_clauses(And(
+            Implication(sentence.left, sentence.right),
+            Implication(sentence.right, sentence.left)
+        ), positive)
+
+    # An And, or a negated Or, is the union of its parts' clauses; an Or,
+    # or a negated And, takes one clause from each part in every way
+    if isinstance(sentence, And):
+        parts, union = sentence.conjuncts, positive
+    elif isinstance(sentence, Or):
+        parts, union = sentence.disjuncts, not positive
+    else:
+        raise TypeError("must be a logical sentence")
+    part_clauses = [cnf_clauses(part, positive) for part in parts]
+    if union:
+        return [clause for clauses in part_clauses for clause in clauses]
+    return [
+        [literal for clause in choice for literal in clause]
+        for choice in itertools.product(*part_clauses)
+    ]
+
+
+class CNF():
+    """
+    Clauses equisatisfiable with the sentences added to them, as lists of
+    integer literals: n for the n-th variable, -n for its negation.
+
+    Symbols get the first variable numbers as they are seen. Compound
+    subsentences get variables of their own, defined by clauses, so the
+    clauses grow linearly with the sentences (the Tseitin encoding).
+    Equal subsentences share one variable.
+    """
+
+    def __init__(self):
+        self.variables = {}
+        self.names = [None]
+        self.gates = {}
+        self.clauses = []
+
+    @property
+    def num_variables(self):
+        return len(self.names) - 1
+
+    def variable(self, name):
+        """Returns the variable number of the symbol named `name`."""
+        if name not in self.variables:
+            self.variables[name] = len(self.names)
+            self.names.append(name)
+        return self.variables[name]
+
+    def new_variable(self):
+        """Returns the number of a new variable that is not a symbol."""
+        self.names.append(None)
+        return len(self.names) - 1
+
+    def add(self, sentence):
+        """Adds clauses that are satisfiable only where `sentence` holds."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append(
+                [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            )
         else:
+            self.clauses.append([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """
+        Returns a literal that is true exactly where `sentence` is, adding
+        the clauses that define it.
+        """
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.gates:
+            return self.gates[sentence]
+
+        if isinstance(sentence, And):
+            parts = [self.literal(c) for c in sentence.conjuncts]
+            gate = self.new_variable()
+            self.clauses.extend([-gate, part] for part in parts)
+            self.clauses.append([gate] + [-part for part in parts])
+        elif isinstance(sentence, Or):
+            parts = [self.literal(d) for d in sentence.disjuncts]
+            gate = self.new_variable()
+            self.clauses.extend([gate, -part] for part in parts)
+            self.clauses.append([-gate] + parts)
+        elif isinstance(sentence, Implication):
+            gate = self.literal(
+                Or(Not(sentence.antecedent), sentence.consequent)
+            )
+        elif isinstance(sentence, Biconditional):
+            left = self.literal(sentence.left)
+            right = self.literal(sentence.right)
+            gate = self.new_variable()
+            self.clauses.extend([
+                [-gate, -left, right], [-gate, left, -right],
+                [gate, left, right], [gate, -left, -right],
+            ])
+        else:
+            raise TypeError("must be a logical sentence")
+        self.gates[sentence] = gate
+        return gate
+
+    def model(self, values):
+        """
+        Returns the model of the symbols (a dictionary by name) in a
+        solution of `Solver.solve`.
+        """
+        return {name: values[number]
+                for name, number in self.variables.items()}
+
+
+class Solver():
+    """
+    A DPLL satisfiability solver over clauses of integer literals, as made
+    by `CNF`, with unit propagation over two watched literals per clause.
+
+    Each clause of two or more literals is watched by its first two
+    literals, and only looked at again when one of them becomes false,
+    to find another literal to watch or else to make its other watched
+    literal true (or fail, if that is false too). Watches stay valid on
+    backtracking, so undoing an assignment costs nothing.
+    """
+
+    def __init__(self, clauses=(), num_variables=0):
+        self.num_variables = num_variables
+        self.clauses = []
+        self.watches = {}
+        self.units = []
+        self.empty = False
+        self.counts = {}
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def add_clause(self, clause):
+        """Adds a clause, a list of integer literals."""
+        clause = list(dict.fromkeys(clause))
+        if any(-literal in clause for literal in clause):
+            return
+        for literal in clause:
+            self.num_variables = max(self.num_variables, abs(literal))
+            self.counts[literal] = self.counts.get(literal, 0) + 1
+        if not clause:
+            self.empty = True
+        elif len(clause) == 1:
+            self.units.append(clause[0])
+        else:
+            number = len(self.clauses)
+            self.clauses.append(clause)
+            self.watches.setdefault(clause[0], []).append(number)
+            self.watches.setdefault(clause[1], []).append(number)
+
+    def solve(self, assumptions=()):
+        """
+        Returns a list of values (True or False, indexed by variable number
+        from 1) satisfying every clause and the `assumptions` literals, or
+        None if there is none.
+        """
+        if self.empty:
+            return None
+        values = [None] * (self.num_variables + 1)
+        trail = []
+        clauses, watches = self.clauses, self.watches
+
+        def assign(literal):
+            current = values[abs(literal)]
+            if current is None:
+                values[abs(literal)] = literal > 0
+                trail.append(literal)
+                return True
+            return current == (literal > 0)
+
+        def propagate(head):
+            while head < len(trail):
+                false = -trail[head]
+                head += 1
+                watching = watches.get(false, [])
+                i = 0
+                while i < len(watching):
+                    clause = clauses[watching[i]]
+                    if clause[0] == false:
+                        clause[0], clause[1] = clause[1], false
+                    other = clause[0]
+                    value = values[abs(other)]
+                    if value is not None and value == (other > 0):
+                        i += 1
+                        continue
+
+                    # Watch another literal that is not false, if any
+                    for k in range(2, len(clause)):
+                        literal = clause[k]
+                        value = values[abs(literal)]
+                        if value is None or value == (literal > 0):
+                            clause[1], clause[k] = literal, false
+                            watches.setdefault(literal, []).append(
+                                watching[i]
+                            )
+                            watching[i] = watching[-1]
+                            watching.pop()
+                            break
+                    else:
+                        if not assign(other):
+                            return False
+                        i += 1
+            return True
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
-
-    # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+        for literal in itertools.chain(self.units, assumptions):
+            if not assign(literal):
+                return None
+        if not propagate(0):
+            return None
 
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+        # Branch on the most used variables first, on their commoner sign
+        order = sorted(
+            range(1, self.num_variables + 1),
+            key=lambda v: -(self.counts.get(v, 0) + self.counts.get(-v, 0))
+        )
+        decisions = []
+        while True:
+            variable = next((v for v in order if values[v] is None), None)
+            if variable is None:
+                return values
+            literal = variable
+            if self.counts.get(-variable, 0) > self.counts.get(variable, 0):
+                literal = -variable
+            decisions.append((len(trail), literal, False))
+            assign(literal)
+            head = len(trail) - 1
+            while not propagate(head):
+                # Undo to the last decision not yet tried both ways
+                while decisions and decisions[-1][2]:
+                    decisions.pop()
+                if not decisions:
+                    return None
+                size, literal, _ = decisions.pop()
+                for undone in trail[size:]:
+                    values[abs(undone)] = None
+                del trail[size:]
+                decisions.append((size, -literal, True))
+                assign(-literal)
+                head = size
+
+
+def dpll_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, like `model_check`, by showing
+    that the knowledge base and the negated query cannot both hold, with a
+    `Solver` over their `CNF` clauses.
+    """
+    encoding = CNF()
+    encoding.add(knowledge)
+    negated = -encoding.literal(query)
+    solver = Solver(encoding.clauses, encoding.num_variables)
+    return solver.solve([negated]) is None
@@ -1,3 +1,5 @@
+import multiprocessing
+
 from logic import *
 
 AKnight = Symbol("A is a Knight")
@@ -9,6 +11,10 @@ BKnave = Symbol("B is a Knave")
 CKnight = Symbol("C is a Knight")
 CKnave = Symbol("C is a Knave")
 
+# Puzzles with fewer symbols than this are solved in this process, as they
+# take less time to check than starting a pool of processes would
+POOL_SYMBOLS = 16
+
 # Puzzle 0
 # A says "I am both a knight and a knave."
 knowledge0 = And(
@@ -60,7 +66,7 @@ knowledge3 = And(
 )
 
 
-def main():
+def main(workers=None):
     symbols = [AKnight, AKnave, BKnight, BKnave, CKnight, CKnave]
     puzzles = [
         ("Puzzle 0", knowledge0),
@@ -68,15 +74,41 @@ def main():
         ("Puzzle 2", knowledge2),
         ("Puzzle 3", knowledge3)
     ]
-    for puzzle, knowledge in puzzles:
+
+    # Solve the puzzles, each checking all the symbols in one pass over the
+    # models, in a pool of `workers` processes (by default one per CPU) if
+    # any is large enough to be worth it
+    jobs = [(knowledge, symbols) for puzzle, knowledge in puzzles]
+    names = {symbol.name for symbol in symbols}
+    if workers == 0 or all(
+        len(knowledge.symbol_names() | names) < POOL_SYMBOLS
+        for knowledge, symbols in jobs
+    ):
+        answers = list(map(solve, jobs))
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            answers = pool.map(solve, jobs)
+    for (puzzle, knowledge), entailed in zip(puzzles, answers):
         print(puzzle)
-        if len(knowledge.conjuncts) == 0:
+        if entailed is None:
             print("    Not yet implemented.")
         else:
-            for symbol in symbols:
-                if model_check(knowledge, symbol):
+            for symbol, known in zip(symbols, entailed):
+                if known:
                     print(f"    {symbol}")
 
 
+def solve(job):
+    """
+    Returns whether a (knowledge, symbols) puzzle's knowledge base entails
+    each symbol, or None if it has no knowledge yet.
+    """
+    knowledge, symbols = job
+    if len(knowledge.conjuncts) == 0:
+        return None
+    entailed, models = model_check_many(knowledge, symbols)
+    return entailed
+
+
 if __name__ == "__main__":
     main()
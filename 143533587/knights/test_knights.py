@@ -0,0 +1,235 @@
+import itertools
+import pickle
+
+import pytest
+
+import puzzle
+from benchmark import random_puzzle
+from logic import (
+    And, Biconditional, CNF, Implication, Not, Or, Solver, Symbol,
+    dpll_check, model_check, model_check_many, to_cnf
+)
+from vectorized import symbol_columns, vectorized_check
+
+A, B, C = Symbol("A"), Symbol("B"), Symbol("C")
+SENTENCES = [
+    And(A, Not(B)),
+    Or(A, And(B, C)),
+    Implication(Or(A, B), C),
+    Biconditional(A, Not(Biconditional(B, C))),
+    Not(And(Or(A, Not(C)), Implication(B, A))),
+]
+PUZZLES = [puzzle.knowledge0, puzzle.knowledge1, puzzle.knowledge2,
+           puzzle.knowledge3]
+PUZZLE_SYMBOLS = [puzzle.AKnight, puzzle.AKnave, puzzle.BKnight,
+                  puzzle.BKnave, puzzle.CKnight, puzzle.CKnave]
+
+
+def models(symbols):
+    for values in itertools.product([False, True], repeat=len(symbols)):
+        yield {symbol.name: value for symbol, value in zip(symbols, values)}
+
+
+@pytest.mark.parametrize("sentence", SENTENCES)
+def test_to_cnf_is_equivalent(sentence):
+    cnf = to_cnf(sentence)
+    for clause in cnf.conjuncts:
+        assert isinstance(clause, Or)
+        for literal in clause.disjuncts:
+            assert isinstance(literal, Symbol) or (
+                isinstance(literal, Not)
+                and isinstance(literal.operand, Symbol)
+            )
+    for model in models([A, B, C]):
+        assert cnf.evaluate(model) == sentence.evaluate(model)
+
+
+@pytest.mark.parametrize("sentence", SENTENCES)
+def test_compile_matches_evaluate(sentence):
+    symbols = ["C", "A", "B"]
+    compiled = sentence.compile(symbols)
+    for number in range(8):
+        model = {name: bool(number >> i & 1) for i, name in enumerate(symbols)}
+        assert compiled(number) == sentence.evaluate(model)
+
+
+def test_symbols_are_kept_up_to_date():
+    knowledge = And()
+    assert knowledge.symbols() == set()
+    knowledge.add(Or(A, Not(B)))
+    assert knowledge.symbols() == {"A", "B"}
+    knowledge.add(Implication(C, A))
+    assert knowledge.symbols() == {"A", "B", "C"}
+    assert model_check(knowledge, Implication(C, A))
+    assert not model_check(knowledge, A)
+    knowledge.add(A)
+    assert model_check(knowledge, A)
+
+    # Only the outermost sentence can change, so no symbols are missed
+    inner = And(A)
+    outer = And(inner)
+    assert model_check(outer, A)
+    with pytest.raises(TypeError):
+        inner.add(B)
+    outer.add(B)
+    assert model_check(outer, B)
+
+
+@pytest.mark.parametrize("sentence", SENTENCES)
+def test_cnf_models_satisfy_sentence(sentence):
+    encoding = CNF()
+    encoding.add(sentence)
+    solver = Solver(encoding.clauses, encoding.num_variables)
+    satisfiable = any(sentence.evaluate(model) for model in models([A, B, C]))
+    values = solver.solve()
+    assert (values is not None) == satisfiable
+    if values is not None:
+        model = dict.fromkeys("ABC", False)
+        model.update(encoding.model(values))
+        assert sentence.evaluate(model)
+
+
+def test_solver_finds_unsatisfiable_clauses():
+    clauses = [[1, 2], [-1, 2], [1, -2], [-1, -2]]
+    assert Solver(clauses).solve() is None
+    assert Solver(clauses[:3]).solve()[1:] == [True, True]
+    assert Solver([[1, 2, 3]]).solve([-1, -2]) == [None, False, False, True]
+    assert Solver([[]]).solve() is None
+
+
+@pytest.mark.parametrize("knowledge", PUZZLES)
+def test_dpll_check_matches_model_check(knowledge):
+    for symbol in PUZZLE_SYMBOLS:
+        assert dpll_check(knowledge, symbol) == model_check(knowledge, symbol)
+
+
+@pytest.mark.parametrize("size", [2, 4, 6])
+def test_dpll_check_matches_model_check_on_random_puzzles(size):
+    knowledge, symbols = random_puzzle(size, seed=size)
+    for symbol in symbols:
+        assert dpll_check(knowledge, symbol) == model_check(knowledge, symbol)
+        assert (dpll_check(knowledge, Not(symbol))
+                == model_check(knowledge, Not(symbol)))
+
+
+def test_dpll_check_solves_large_puzzle():
+    knowledge, symbols = random_puzzle(60)
+    known = [symbol for symbol in symbols if dpll_check(knowledge, symbol)]
+    assert known
+    assert not dpll_check(knowledge, Not(knowledge))
+
+
+def test_symbol_columns_number_models_by_bits():
+    columns = symbol_columns(3, 2, 6)
+    assert columns.tolist() == [
+        [False, True, False, True],
+        [True, True, False, False],
+        [False, False, True, True],
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1 << 16])
+def test_vectorized_check_matches_model_check(chunk_size):
+    for size in range(1, 6):
+        knowledge, symbols = random_puzzle(size, seed=size)
+        queries = symbols + [Not(symbol) for symbol in symbols]
+        queries.append(Or(symbols[0], And()))
+        assert vectorized_check(knowledge, queries, chunk_size) == [
+            model_check(knowledge, query) for query in queries
+        ]
+    for knowledge in PUZZLES:
+        assert vectorized_check(knowledge, PUZZLE_SYMBOLS) == [
+            model_check(knowledge, symbol) for symbol in PUZZLE_SYMBOLS
+        ]
+
+
+def test_sentences_that_cannot_change_are_shared():
+    assert Symbol("A") is A
+    assert Not(And(A, B)) is Not(And(A, B))
+    assert Implication(A, Or(B, C)) is Implication(A, Or(B, C))
+    assert Biconditional(A, B) is not Biconditional(B, A)
+    assert pickle.loads(pickle.dumps(Not(And(A, B)))) is Not(And(A, B))
+
+    # And and Or can still be added to, until they are part of another
+    # sentence, which they would otherwise change behind its back
+    conjunction = And(A, B)
+    assert conjunction is not And(A, B)
+    conjunction.add(C)
+    negation = Not(conjunction)
+    assert negation.operand == And(A, B, C)
+    assert hash(negation.operand) == hash(And(A, B, C))
+    with pytest.raises(TypeError):
+        conjunction.add(C)
+    knowledge = And()
+    Implication(A, knowledge)
+    with pytest.raises(TypeError):
+        knowledge.add(B)
+
+    # Equal parts of And and Or are shared too
+    first = And(Or(A, B), Not(C))
+    second = Or(Or(A, B), C)
+    second_and = And(Not(C))
+    assert first.conjuncts[0] is second.disjuncts[0]
+    assert first.conjuncts[1] is second_and.conjuncts[0]
+    assert And(And(A, B)).conjuncts[0] is And(And(A, B)).conjuncts[0]
+
+
+def test_evaluate_keeps_values_of_shared_sentences():
+    knowledge = And(Implication(A, Not(And(B, C))), Or(Not(And(B, C)), C))
+    memo = {}
+    for model in models([A, B, C]):
+        memo.clear()
+        value = knowledge.evaluate(model, memo)
+        assert value == (not model["A"] or not (model["B"] and model["C"]))
+        assert id(Not(And(B, C))) in memo
+
+
+def test_evaluate_shares_values_without_a_memo(monkeypatch):
+    knowledge = And(Implication(A, Not(And(B, C))), Or(Not(And(B, C)), C))
+    evaluated = []
+    value = And.value
+
+    def counted(self, model, memo):
+        evaluated.append(self)
+        return value(self, model, memo)
+
+    monkeypatch.setattr(And, "value", counted)
+    for model in models([A, B, C]):
+        evaluated.clear()
+        knowledge.evaluate(model)
+        assert evaluated.count(And(B, C)) == 1
+
+
+def test_model_check_many_matches_model_check():
+    for knowledge in PUZZLES:
+        entailed, found = model_check_many(knowledge, PUZZLE_SYMBOLS)
+        assert entailed == [
+            model_check(knowledge, symbol) for symbol in PUZZLE_SYMBOLS
+        ]
+        names = sorted(symbol.name for symbol in PUZZLE_SYMBOLS)
+        symbols = [Symbol(name) for name in names]
+        assert found == {
+            frozenset(name for name in names if model[name])
+            for model in models(symbols) if knowledge.evaluate(model)
+        }
+    entailed, found = model_check_many(And(A, Or(B, C)), [A, B, Or(B, C)])
+    assert entailed == [True, False, True]
+    assert found == {
+        frozenset("AB"), frozenset("AC"), frozenset("ABC")
+    }
+
+
+def test_puzzle_solve():
+    assert puzzle.solve((And(), PUZZLE_SYMBOLS)) is None
+    assert puzzle.solve((puzzle.knowledge3, PUZZLE_SYMBOLS)) == [
+        True, False, False, True, True, False
+    ]
+
+
+def test_puzzle_main_solves_small_puzzles_in_process(monkeypatch, capsys):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("started a pool for small puzzles")
+
+    monkeypatch.setattr(puzzle.multiprocessing, "Pool", no_pool)
+    puzzle.main()
+    assert "C is a Knight" in capsys.readouterr().out
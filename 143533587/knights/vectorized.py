@@ -0,0 +1,91 @@
+import numpy as np
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+CHUNK = 1 << 16
+
+
+def symbol_columns(n, start, stop):
+    """
+    Returns the values of `n` symbols in the models numbered `start` to
+    `stop` - 1, as a boolean array with a row per symbol and a column per
+    model. Bit i of a model's number is the value of the i-th symbol.
+    """
+    numbers = np.arange(start, stop, dtype=np.int64)
+    return (numbers >> np.arange(n, dtype=np.int64)[:, None]) & 1 == 1
+
+
+def evaluate_columns(sentence, rows, columns, memo):
+    """
+    Returns the value of `sentence` in every model of `columns` (as made by
+    `symbol_columns`), as a boolean array, where `rows` gives the row of
+    each symbol's name. Values of subsentences are kept in `memo`, by id,
+    so that a subsentence used more than once is only evaluated once.
+    """
+    key = id(sentence)
+    if key in memo:
+        return memo[key]
+    if isinstance(sentence, Symbol):
+        values = columns[rows[sentence.name]]
+    elif isinstance(sentence, Not):
+        values = ~evaluate_columns(sentence.operand, rows, columns, memo)
+    elif isinstance(sentence, (And, Or)):
+        if isinstance(sentence, And):
+            parts, combine = sentence.conjuncts, np.logical_and
+        else:
+            parts, combine = sentence.disjuncts, np.logical_or
+        values = np.full(columns.shape[1], combine is np.logical_and)
+        for part in parts:
+            values = combine(
+                values, evaluate_columns(part, rows, columns, memo)
+            )
+    elif isinstance(sentence, Implication):
+        values = (~evaluate_columns(sentence.antecedent, rows, columns, memo)
+                  | evaluate_columns(sentence.consequent, rows, columns, memo))
+    elif isinstance(sentence, Biconditional):
+        values = (evaluate_columns(sentence.left, rows, columns, memo)
+                  == evaluate_columns(sentence.right, rows, columns, memo))
+    else:
+        raise TypeError("must be a logical sentence")
+    memo[key] = values
+    return values
+
+
+def vectorized_check(knowledge, queries, chunk_size=CHUNK):
+    """
+    Returns a list of whether knowledge base entails each of `queries`,
+    like `model_check` for each, by evaluating them in every model at once
+    with NumPy, `chunk_size` models at a time.
+
+    The queries are only evaluated in the models where knowledge base is
+    true, and checking stops as soon as none of them can be entailed.
+    Every model is visited, so this suits up to about 25 symbols.
+    """
+    symbols = sorted(knowledge.symbols().union(
+        *[query.symbols() for query in queries]
+    ))
+    rows = {name: i for i, name in enumerate(symbols)}
+    entailed = [True] * len(queries)
+    for start in range(0, 2 ** len(symbols), chunk_size):
+        if not any(entailed):
+            break
+        columns = symbol_columns(
+            len(symbols), start, min(start + chunk_size, 2 ** len(symbols))
+        )
+        memo = {}
+        true = evaluate_columns(knowledge, rows, columns, memo)
+        if not true.any():
+            continue
+        columns = columns[:, true]
+        memo = {}
+        for i, query in enumerate(queries):
+            if entailed[i]:
+                entailed[i] = bool(
+                    evaluate_columns(query, rows, columns, memo).all()
+                )
+    return entailed
+
+
+def vectorized_model_check(knowledge, query):
+    """Checks if knowledge base entails query, with `vectorized_check`."""
+    return vectorized_check(knowledge, [query])[0]